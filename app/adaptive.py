@@ -0,0 +1,234 @@
+from dataclasses import asdict, dataclass, replace
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.config import TimingConfig
+
+
+@dataclass(frozen=True)
+class TuningParams:
+    match_confirm_frames: int
+    card_poll_interval: float
+    card_poll_fast_interval: float
+    partial_match_grace: float
+
+    @classmethod
+    def from_timing(cls, timing: TimingConfig) -> "TuningParams":
+        return cls(
+            match_confirm_frames=timing.match_confirm_frames,
+            card_poll_interval=timing.card_poll_interval,
+            card_poll_fast_interval=timing.card_poll_fast_interval,
+            partial_match_grace=timing.partial_match_grace,
+        )
+
+
+@dataclass(frozen=True)
+class TuningBounds:
+    min_confirm_frames: int = 1
+    max_confirm_frames: int = 4
+    min_poll_interval: float = 0.003
+    max_poll_interval: float = 0.016
+    min_fast_interval: float = 0.002
+    max_fast_interval: float = 0.008
+    min_grace: float = 0.04
+    max_grace: float = 0.2
+
+    def clamp(self, params: TuningParams, confirm_floor: int) -> TuningParams:
+        fast = min(self.max_fast_interval, max(self.min_fast_interval, params.card_poll_fast_interval))
+        return TuningParams(
+            match_confirm_frames=min(self.max_confirm_frames, max(confirm_floor, params.match_confirm_frames)),
+            card_poll_interval=min(self.max_poll_interval, max(self.min_poll_interval, fast, params.card_poll_interval)),
+            card_poll_fast_interval=fast,
+            partial_match_grace=min(self.max_grace, max(self.min_grace, params.partial_match_grace)),
+        )
+
+
+@dataclass
+class _Window:
+    draws: int = 0
+    no_confirm: int = 0
+
+    def reset(self) -> None:
+        self.draws = 0
+        self.no_confirm = 0
+
+
+class AdaptiveController:
+    # Per-window AIMD: clean windows step toward faster polling and fewer confirm frames;
+    # a wrong lock raises confirm frames immediately and pins that level as the new floor.
+    # The floor starts at the initial confirm frames: a clean window only says no wrong lock was seen
+    # yet, and dropping a confirm frame trades a few ms for wrong cards on noisy transitions.
+    # Every tightening step is a probe: it stays only if the next window confirms at least min_gain_us
+    # sooner, since faster polling always costs more grabs per draw.
+    def __init__(
+        self,
+        initial: TuningParams,
+        bounds: TuningBounds = TuningBounds(),
+        window: int = 20,
+        speedup: float = 0.85,
+        max_no_confirm_rate: float = 0.05,
+        cooldown_windows: int = 3,
+        load_slack_us: int = 2000,
+        min_gain_us: int = 1000,
+        probe_hold_windows: int = 8,
+        max_probe_hold_windows: int = 64,
+        confirm_floor: Optional[int] = None,
+        on_change: Optional[Callable[["AdaptiveController"], None]] = None,
+    ):
+        self._bounds = bounds
+        self._window_size = max(1, window)
+        self._speedup = speedup
+        self._max_no_confirm_rate = max_no_confirm_rate
+        self._cooldown_windows = cooldown_windows
+        self._load_slack_us = load_slack_us
+        self._min_gain_us = min_gain_us
+        self._probe_hold_windows = max(1, probe_hold_windows)
+        self._max_probe_hold_windows = max(self._probe_hold_windows, max_probe_hold_windows)
+        if confirm_floor is None:
+            confirm_floor = initial.match_confirm_frames
+        self._confirm_floor = max(bounds.min_confirm_frames, confirm_floor)
+        self._params = bounds.clamp(initial, self._confirm_floor)
+        self._on_change = on_change
+        self._window = _Window()
+        self._cooldown = 0
+        # The params before the last tightening step and the median confirm delay they gave.
+        self._probe: Optional[Tuple[TuningParams, int]] = None
+        self._hold = 0
+        self._hold_windows = self._probe_hold_windows
+        self._confirm_delays_us: List[int] = []
+        self.adjustments = 0
+        self.wrong_locks = 0
+        self.rejected_steps = 0
+
+    @property
+    def params(self) -> TuningParams:
+        return self._params
+
+    @property
+    def confirm_floor(self) -> int:
+        return self._confirm_floor
+
+    def observe(self, result: dict, wrong_lock: Optional[bool] = None) -> None:
+        window = self._window
+        window.draws += 1
+        if result.get("fail_reason") == "timeout_no_confirm":
+            window.no_confirm += 1
+        if wrong_lock:
+            self.wrong_locks += 1
+            # Safety first: do not wait for the window to close before backing off.
+            self._back_off()
+            window.reset()
+            return
+
+        lock_us = result.get("lock_latency_us")
+        first_match_us = result.get("first_match_latency_us")
+        if result.get("success") and lock_us is not None and first_match_us is not None:
+            self._confirm_delays_us.append(max(0, lock_us - first_match_us))
+
+        if window.draws >= self._window_size:
+            self._close_window()
+
+    def _back_off(self) -> None:
+        params = self._params
+        self._confirm_floor = min(self._bounds.max_confirm_frames, params.match_confirm_frames + 1)
+        self._cooldown = self._cooldown_windows
+        self._probe = None
+        self._set(replace(params, match_confirm_frames=self._confirm_floor))
+
+    def _close_window(self) -> None:
+        window = self._window
+        params = self._params
+        delay_us = self.median_confirm_delay_us()
+        if window.no_confirm / window.draws > self._max_no_confirm_rate:
+            # Candidates keep slipping away between confirmations: confirm faster and wait a bit longer.
+            self._probe = None
+            self._set(
+                replace(
+                    params,
+                    card_poll_fast_interval=params.card_poll_fast_interval * self._speedup,
+                    partial_match_grace=params.partial_match_grace * 1.5,
+                )
+            )
+        elif self._cooldown > 0:
+            self._cooldown -= 1
+        elif self._probe is not None:
+            self._judge_probe(delay_us)
+        elif self._hold > 0:
+            self._hold -= 1
+        elif self._overloaded(params):
+            # Confirmations already arrive much later than the fast interval asks for; polling faster won't help.
+            pass
+        elif delay_us is not None:
+            self._set(
+                TuningParams(
+                    match_confirm_frames=params.match_confirm_frames - 1,
+                    card_poll_interval=params.card_poll_interval * self._speedup,
+                    card_poll_fast_interval=params.card_poll_fast_interval * self._speedup,
+                    partial_match_grace=params.partial_match_grace * self._speedup,
+                )
+            )
+            if self._params != params:
+                self._probe = (params, delay_us)
+        window.reset()
+        self._confirm_delays_us.clear()
+
+    def _judge_probe(self, delay_us: Optional[int]) -> None:
+        if delay_us is None:
+            return
+        previous, baseline_us = self._probe
+        self._probe = None
+        if baseline_us - delay_us >= self._min_gain_us:
+            self._hold_windows = self._probe_hold_windows
+            return
+        # The extra grabs bought no faster confirmation: step back, and wait longer before each new try.
+        self.rejected_steps += 1
+        self._set(previous)
+        self._hold = self._hold_windows
+        self._hold_windows = min(self._max_probe_hold_windows, self._hold_windows * 2)
+
+    def _overloaded(self, params: TuningParams) -> bool:
+        delay_us = self.median_confirm_delay_us()
+        if delay_us is None:
+            return False
+        expected_us = max(1, params.match_confirm_frames - 1) * params.card_poll_fast_interval * 1_000_000
+        return delay_us > 2 * expected_us + self._load_slack_us
+
+    def _set(self, params: TuningParams) -> None:
+        params = self._bounds.clamp(params, self._confirm_floor)
+        if params == self._params:
+            return
+        self._params = params
+        self.adjustments += 1
+        if self._on_change is not None:
+            self._on_change(self)
+
+    def median_confirm_delay_us(self) -> Optional[int]:
+        delays = sorted(self._confirm_delays_us)
+        return delays[len(delays) // 2] if delays else None
+
+    def to_dict(self) -> Dict[str, object]:
+        data = asdict(self._params)
+        data["confirm_floor"] = self._confirm_floor
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict], fallback: TuningParams, **kwargs) -> "AdaptiveController":
+        if not data:
+            return cls(fallback, **kwargs)
+        initial = TuningParams(
+            match_confirm_frames=int(data.get("match_confirm_frames", fallback.match_confirm_frames)),
+            card_poll_interval=float(data.get("card_poll_interval", fallback.card_poll_interval)),
+            card_poll_fast_interval=float(data.get("card_poll_fast_interval", fallback.card_poll_fast_interval)),
+            partial_match_grace=float(data.get("partial_match_grace", fallback.partial_match_grace)),
+        )
+        # A stored floor may predate the configured confirm frames; never go below either.
+        floor = max(int(data.get("confirm_floor") or 0), fallback.match_confirm_frames)
+        return cls(initial, confirm_floor=floor, **kwargs)
+
+    def format_stats(self) -> str:
+        p = self._params
+        return (
+            f"confirm_frames={p.match_confirm_frames} (floor {self._confirm_floor}) "
+            f"poll={p.card_poll_interval * 1000:.1f}ms fast={p.card_poll_fast_interval * 1000:.1f}ms "
+            f"grace={p.partial_match_grace * 1000:.0f}ms adjustments={self.adjustments} "
+            f"rejected_steps={self.rejected_steps} wrong_locks={self.wrong_locks}"
+        )
@@ -0,0 +1,60 @@
+import importlib
+import sys
+from typing import Dict, List, Optional
+
+# kind -> name -> "module:attribute". Nothing is imported until a backend is actually requested,
+# so the platform-neutral core never pulls in ctypes.windll, pywin32, psutil or pynput.
+_REGISTRY: Dict[str, Dict[str, str]] = {
+    "capture": {
+        "gdi": "app.capture:GdiFrameSource",
+        "synthetic": "app.capture:SyntheticFrameSource",
+    },
+    "focus": {
+        "winevent": "app.focus:WinEventFocusSource",
+        "polling": "app.focus:PollingFocusSource",
+        "scripted": "app.focus:ScriptedFocusSource",
+    },
+    "injection": {
+        "sendinput": "app.injection:SendInputInjector",
+        "recording": "app.injection:RecordingInjector",
+    },
+    "input": {
+        "pynput": "app.input_backend:PynputBackend",
+        "scripted": "app.input_backend:ScriptedInputBackend",
+    },
+}
+
+_DEFAULTS = {
+    "win32": {"capture": "gdi", "focus": "winevent", "injection": "sendinput", "input": "pynput"},
+    "other": {"capture": "synthetic", "focus": "scripted", "injection": "recording", "input": "scripted"},
+}
+
+
+def register_backend(kind: str, name: str, target: str) -> None:
+    if ":" not in target:
+        raise ValueError(f"backend target must be 'module:attribute', got {target!r}")
+    _REGISTRY.setdefault(kind, {})[name] = target
+
+
+def backend_names(kind: str) -> List[str]:
+    return sorted(_REGISTRY.get(kind, {}))
+
+
+def default_backend(kind: str, platform: Optional[str] = None) -> str:
+    platform = platform or sys.platform
+    defaults = _DEFAULTS["win32" if platform == "win32" else "other"]
+    return defaults[kind]
+
+
+def load_backend(kind: str, name: Optional[str] = None):
+    name = name or default_backend(kind)
+    try:
+        target = _REGISTRY[kind][name]
+    except KeyError:
+        raise ValueError(f"unknown {kind} backend: {name} (available: {', '.join(backend_names(kind))})") from None
+    module_name, _, attribute = target.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def create_backend(kind: str, name: Optional[str] = None, **kwargs):
+    return load_backend(kind, name)(**kwargs)
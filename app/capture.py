@@ -0,0 +1,303 @@
+import atexit
+import threading
+from ctypes import (
+    POINTER,
+    Structure,
+    addressof,
+    byref,
+    c_char,
+    c_int32,
+    c_long,
+    c_uint16,
+    c_uint32,
+    c_void_p,
+    memmove,
+    sizeof,
+)
+from typing import Callable, Dict, Optional, Tuple
+
+BYTES_PER_PIXEL = 4
+SRCCOPY = 0x00CC0020
+CAPTUREBLT = 0x40000000
+DIB_RGB_COLORS = 0
+BI_RGB = 0
+
+
+# Patches are stored BGRA, top-down, matching a 32bpp GDI DIB so a grab is a single memmove.
+class PatchBuffer:
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.left = 0
+        self.top = 0
+        self.data = bytearray(width * height * BYTES_PER_PIXEL)
+        self._view = (c_char * len(self.data)).from_buffer(self.data)
+        self.address = addressof(self._view)
+
+    def move_to(self, left: int, top: int) -> None:
+        self.left = left
+        self.top = top
+
+    def rgb_at(self, x: int, y: int) -> Tuple[int, int, int]:
+        i = (y * self.width + x) * BYTES_PER_PIXEL
+        data = self.data
+        return data[i + 2], data[i + 1], data[i]
+
+
+class FrameSource:
+    def grab(self, patch: PatchBuffer) -> bool:
+        raise NotImplementedError
+
+    def get_pixel(self, px: int, py: int) -> Tuple[int, int, int]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class BITMAPINFOHEADER(Structure):
+    _fields_ = [
+        ("biSize", c_uint32),
+        ("biWidth", c_long),
+        ("biHeight", c_long),
+        ("biPlanes", c_uint16),
+        ("biBitCount", c_uint16),
+        ("biCompression", c_uint32),
+        ("biSizeImage", c_uint32),
+        ("biXPelsPerMeter", c_long),
+        ("biYPelsPerMeter", c_long),
+        ("biClrUsed", c_uint32),
+        ("biClrImportant", c_uint32),
+    ]
+
+
+class BITMAPINFO(Structure):
+    _fields_ = [("bmiHeader", BITMAPINFOHEADER), ("bmiColors", c_uint32 * 3)]
+
+
+class _GdiSurface:
+    def __init__(self, hdc, bitmap, old_bitmap, bits: int):
+        self.hdc = hdc
+        self.bitmap = bitmap
+        self.old_bitmap = old_bitmap
+        self.bits = bits
+
+
+class GdiFrameSource(FrameSource):
+    def __init__(self):
+        from ctypes import windll
+
+        self._gdi32 = windll.gdi32
+        self._user32 = windll.user32
+        self._gdi32.CreateDIBSection.restype = c_void_p
+        self._gdi32.CreateDIBSection.argtypes = [
+            c_void_p,
+            POINTER(BITMAPINFO),
+            c_uint32,
+            POINTER(c_void_p),
+            c_void_p,
+            c_uint32,
+        ]
+        self._gdi32.CreateCompatibleDC.restype = c_void_p
+        self._gdi32.CreateCompatibleDC.argtypes = [c_void_p]
+        self._gdi32.SelectObject.restype = c_void_p
+        self._gdi32.SelectObject.argtypes = [c_void_p, c_void_p]
+        self._gdi32.DeleteObject.argtypes = [c_void_p]
+        self._gdi32.DeleteDC.argtypes = [c_void_p]
+        self._gdi32.BitBlt.argtypes = [c_void_p, c_int32, c_int32, c_int32, c_int32, c_void_p, c_int32, c_int32, c_uint32]
+        self._user32.GetDC.restype = c_void_p
+        self._user32.GetDC.argtypes = [c_void_p]
+        self._user32.ReleaseDC.argtypes = [c_void_p, c_void_p]
+        self._gdi32.GetPixel.restype = c_uint32
+        self._gdi32.GetPixel.argtypes = [c_void_p, c_int32, c_int32]
+        self._lock = threading.Lock()
+        self._hdc_by_tid: Dict[int, int] = {}
+        self._surface_by_key: Dict[Tuple[int, int, int], _GdiSurface] = {}
+        atexit.register(self.close)
+
+    def close(self) -> None:
+        with self._lock:
+            for surface in self._surface_by_key.values():
+                try:
+                    self._gdi32.SelectObject(surface.hdc, surface.old_bitmap)
+                    self._gdi32.DeleteObject(surface.bitmap)
+                    self._gdi32.DeleteDC(surface.hdc)
+                except Exception:
+                    pass
+            self._surface_by_key.clear()
+            for hdc in self._hdc_by_tid.values():
+                try:
+                    self._user32.ReleaseDC(None, hdc)
+                except Exception:
+                    pass
+            self._hdc_by_tid.clear()
+
+    def _get_screen_dc(self):
+        tid = threading.get_ident()
+        hdc = self._hdc_by_tid.get(tid)
+        if hdc is None:
+            with self._lock:
+                hdc = self._user32.GetDC(None)
+                self._hdc_by_tid[tid] = hdc
+        return hdc
+
+    def _get_surface(self, width: int, height: int) -> _GdiSurface:
+        key = (threading.get_ident(), width, height)
+        surface = self._surface_by_key.get(key)
+        if surface is not None:
+            return surface
+
+        screen_dc = self._get_screen_dc()
+        info = BITMAPINFO()
+        info.bmiHeader.biSize = sizeof(BITMAPINFOHEADER)
+        info.bmiHeader.biWidth = width
+        info.bmiHeader.biHeight = -height  # negative height = top-down rows
+        info.bmiHeader.biPlanes = 1
+        info.bmiHeader.biBitCount = 32
+        info.bmiHeader.biCompression = BI_RGB
+
+        bits = c_void_p()
+        mem_dc = self._gdi32.CreateCompatibleDC(screen_dc)
+        bitmap = self._gdi32.CreateDIBSection(screen_dc, byref(info), DIB_RGB_COLORS, byref(bits), None, 0)
+        if not mem_dc or not bitmap or not bits.value:
+            raise OSError("CreateDIBSection failed")
+        old_bitmap = self._gdi32.SelectObject(mem_dc, bitmap)
+
+        surface = _GdiSurface(mem_dc, bitmap, old_bitmap, bits.value)
+        with self._lock:
+            self._surface_by_key[key] = surface
+        return surface
+
+    def grab(self, patch: PatchBuffer) -> bool:
+        surface = self._get_surface(patch.width, patch.height)
+        ok = self._gdi32.BitBlt(
+            surface.hdc,
+            0,
+            0,
+            patch.width,
+            patch.height,
+            self._get_screen_dc(),
+            patch.left,
+            patch.top,
+            SRCCOPY | CAPTUREBLT,
+        )
+        if not ok:
+            return self._grab_per_pixel(patch)
+        memmove(patch.address, surface.bits, len(patch.data))
+        return True
+
+    def _grab_per_pixel(self, patch: PatchBuffer) -> bool:
+        data = patch.data
+        i = 0
+        for y in range(patch.top, patch.top + patch.height):
+            for x in range(patch.left, patch.left + patch.width):
+                r, g, b = self.get_pixel(x, y)
+                data[i] = b
+                data[i + 1] = g
+                data[i + 2] = r
+                i += BYTES_PER_PIXEL
+        return True
+
+    def get_pixel(self, px: int, py: int) -> Tuple[int, int, int]:
+        pixel = self._gdi32.GetPixel(self._get_screen_dc(), px, py)
+        if pixel == 0xFFFFFFFF:
+            hdc = self._user32.GetDC(None)
+            try:
+                pixel = self._gdi32.GetPixel(hdc, px, py)
+            finally:
+                self._user32.ReleaseDC(None, hdc)
+        r = pixel & 0x0000FF
+        g = (pixel & 0x00FF00) >> 8
+        b = (pixel >> 16) & 0xFF
+        return r, g, b
+
+
+PixelFunc = Callable[[int, int], Tuple[int, int, int]]
+
+
+class SyntheticFrameSource(FrameSource):
+    # Holds a full BGRA frame like the GDI surface, so a grab copies whole patch rows by slice.
+    # Pixels outside the frame read as the fill colour; a pixel_func replaces the frame entirely.
+    def __init__(
+        self,
+        width: int = 1920,
+        height: int = 1080,
+        fill: Tuple[int, int, int] = (0, 0, 0),
+        pixel_func: Optional[PixelFunc] = None,
+    ):
+        self.width = width
+        self.height = height
+        self.grab_count = 0
+        self._pixel_func = pixel_func
+        self._stride = width * BYTES_PER_PIXEL
+        self.set_fill(fill)
+
+    def set_pixel_func(self, pixel_func: Optional[PixelFunc]) -> None:
+        self._pixel_func = pixel_func
+
+    def set_fill(self, rgb: Tuple[int, int, int]) -> None:
+        self._fill = rgb
+        r, g, b = rgb
+        self._frame = bytearray(bytes((b, g, r, 0)) * (self.width * self.height))
+
+    def _offset(self, px: int, py: int) -> Optional[int]:
+        if 0 <= px < self.width and 0 <= py < self.height:
+            return py * self._stride + px * BYTES_PER_PIXEL
+        return None
+
+    def set_pixel(self, px: int, py: int, rgb: Tuple[int, int, int]) -> None:
+        i = self._offset(px, py)
+        if i is not None:
+            r, g, b = rgb
+            self._frame[i : i + 3] = bytes((b, g, r))
+
+    def fill_rect(self, left: int, top: int, width: int, height: int, rgb: Tuple[int, int, int]) -> None:
+        x0, x1 = max(0, left), min(self.width, left + width)
+        if x0 >= x1:
+            return
+        r, g, b = rgb
+        row = bytes((b, g, r, 0)) * (x1 - x0)
+        for y in range(max(0, top), min(self.height, top + height)):
+            i = y * self._stride + x0 * BYTES_PER_PIXEL
+            self._frame[i : i + len(row)] = row
+
+    def get_pixel(self, px: int, py: int) -> Tuple[int, int, int]:
+        if self._pixel_func is not None:
+            return self._pixel_func(px, py)
+        i = self._offset(px, py)
+        if i is None:
+            return self._fill
+        frame = self._frame
+        return frame[i + 2], frame[i + 1], frame[i]
+
+    def grab(self, patch: PatchBuffer) -> bool:
+        self.grab_count += 1
+        inside = (
+            patch.left >= 0
+            and patch.top >= 0
+            and patch.left + patch.width <= self.width
+            and patch.top + patch.height <= self.height
+        )
+        if self._pixel_func is not None or not inside:
+            return self._grab_per_pixel(patch)
+        frame = self._frame
+        data = patch.data
+        row = patch.width * BYTES_PER_PIXEL
+        src = patch.top * self._stride + patch.left * BYTES_PER_PIXEL
+        for dst in range(0, len(data), row):
+            data[dst : dst + row] = frame[src : src + row]
+            src += self._stride
+        return True
+
+    def _grab_per_pixel(self, patch: PatchBuffer) -> bool:
+        data = patch.data
+        i = 0
+        for y in range(patch.top, patch.top + patch.height):
+            for x in range(patch.left, patch.left + patch.width):
+                r, g, b = self.get_pixel(x, y)
+                data[i] = b
+                data[i + 1] = g
+                data[i + 2] = r
+                data[i + 3] = 0
+                i += BYTES_PER_PIXEL
+        return True
@@ -0,0 +1,40 @@
+import zlib
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class ChangeGate:
+    # Remembers the last decision per call site keyed by the CRC of the captured pixels; an unchanged
+    # patch at the same point reuses that decision instead of classifying (or double-sampling) again.
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Hashable, object]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(data) -> int:
+        return zlib.crc32(data)
+
+    def get(self, slot: str, key: Hashable, default=None):
+        entry = self._entries.get(slot)
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return default
+
+    def put(self, slot: str, key: Hashable, value) -> None:
+        self._entries[slot] = (key, value)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def hit_rate(self) -> Optional[float]:
+        total = self.hits + self.misses
+        return self.hits / total if total else None
+
+    def format_stats(self) -> str:
+        rate = self.hit_rate()
+        return (
+            f"hits={self.hits} misses={self.misses} "
+            f"hit_rate={'n/a' if rate is None else f'{rate * 100:.1f}%'}"
+        )
@@ -1,9 +1,28 @@
-import atexit
-import threading
 import time
-from ctypes import windll
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
+from app.backends import create_backend
+from app.capture import FrameSource, PatchBuffer
+from app.change_gate import ChangeGate
+from app.color_lut import CARD_COLORS, COLORS_BY_MASK, TARGET_BITS, ColorLut, build_lut
 from app.config import ColorThresholds
+from app.perf import StageTimers
+from app.roi import RoiLayout, RoiVote
+from app.trace import untraced
+from app.vector_classifier import HAS_NUMPY, classify_patch
+
+
+@dataclass(frozen=True)
+class DetectorParams:
+    # Everything a profile change replaces. The detector swaps the whole object in one assignment and
+    # each poll reads it once, so a hot reload can never pair a new LUT with an old patch size.
+    generation: int
+    thresholds: ColorThresholds
+    lut: ColorLut
+    radius: int
+    patch: PatchBuffer
+    roi: Optional[RoiLayout]
 
 
 class ColorDetector:
@@ -13,123 +32,316 @@ class ColorDetector:
         double_sample_gap: float,
         sample_radius_px: int = 1,
         sample_min_hits: int = 2,
+        frame_source: Optional[FrameSource] = None,
+        lut: Optional[ColorLut] = None,
+        sleep: Callable[[float], object] = time.sleep,
+        regions: Optional[Sequence] = None,
+        change_gate: Optional[ChangeGate] = None,
+        stages: Optional[StageTimers] = None,
+        clock: Callable[[], float] = time.perf_counter,
     ):
-        self._thresholds = thresholds
         self._double_sample_gap = double_sample_gap
-        self._sample_radius_px = max(0, int(sample_radius_px))
+        self._sleep = sleep
+        self._clock = clock
         self._sample_min_hits = max(1, int(sample_min_hits))
-        self._gdi32 = windll.gdi32
-        self._user32 = windll.user32
-        self._hdc_lock = threading.Lock()
-        self._hdc_by_tid = {}
-        atexit.register(self._release_all_cached_hdc)
-
-    def _release_all_cached_hdc(self):
-        with self._hdc_lock:
-            for hdc in self._hdc_by_tid.values():
-                try:
-                    self._user32.ReleaseDC(None, hdc)
-                except Exception:
-                    pass
-            self._hdc_by_tid.clear()
-
-    def _get_cached_hdc(self):
-        tid = threading.get_ident()
-        with self._hdc_lock:
-            hdc = self._hdc_by_tid.get(tid)
-            if hdc is None:
-                hdc = self._user32.GetDC(None)
-                self._hdc_by_tid[tid] = hdc
-            return hdc
+        if lut is None or lut.thresholds != thresholds:
+            lut = build_lut(thresholds)
+        if frame_source is None:
+            frame_source = create_backend("capture")
+        self._frame_source = frame_source
+        radius = max(0, int(sample_radius_px))
+        side = 2 * radius + 1
+        roi = RoiLayout(regions, radius) if regions else None
+        self._params = DetectorParams(0, thresholds, lut, radius, PatchBuffer(side, side), roi)
+        self._gate = change_gate
+        self._stages = stages
+
+    @property
+    def frame_source(self) -> FrameSource:
+        return self._frame_source
+
+    @property
+    def thresholds(self) -> ColorThresholds:
+        return self._params.thresholds
+
+    @property
+    def sample_radius_px(self) -> int:
+        return self._params.radius
+
+    @property
+    def has_regions(self) -> bool:
+        return self._params.roi is not None
+
+    @property
+    def change_gate(self) -> Optional[ChangeGate]:
+        return self._gate
+
+    @property
+    def params(self) -> DetectorParams:
+        return self._params
+
+    def apply_profile(self, thresholds: ColorThresholds, sample_radius_px: int, lut: Optional[ColorLut] = None) -> None:
+        if lut is None or lut.thresholds != thresholds:
+            lut = build_lut(thresholds)
+        current = self._params
+        radius = max(0, int(sample_radius_px))
+        side = 2 * radius + 1
+        patch = current.patch if current.patch.width == side else PatchBuffer(side, side)
+        roi = current.roi
+        if roi is not None and roi.radius != radius:
+            roi = RoiLayout(roi.regions, radius)
+        self._params = DetectorParams(current.generation + 1, thresholds, lut, radius, patch, roi)
+        # Gate keys carry the generation, so a decision still being stored from the old params can never
+        # be returned for the new ones; clearing only frees the stale entries.
+        if self._gate is not None:
+            self._gate.clear()
+
+    def prewarm(self, px: int, py: int) -> None:
+        # Creates this thread's capture surfaces and runs each classifier once. The stage timers, the
+        # change gate and the trace are bypassed so warm-up never shows up as a poll or a cache hit.
+        params = self._params
+        patch = params.patch
+        patch.move_to(px - params.radius, py - params.radius)
+        with untraced():
+            self._frame_source.grab(patch)
+            self._classify_hits(params, patch.data)
+            for color in TARGET_BITS:
+                self._count_target_hits(params, patch.data, color)
+            if params.roi is not None:
+                roi_patch = params.roi.move_to(px, py)
+                self._frame_source.grab(roi_patch)
+                self._vote(params, roi_patch.data)
 
     def get_rgb(self, px: int, py: int):
-        hdc = self._user32.GetDC(None)
-        try:
-            pixel = self._gdi32.GetPixel(hdc, px, py)
-        finally:
-            self._user32.ReleaseDC(None, hdc)
-
-        r = pixel & 0x0000FF
-        g = (pixel & 0x00FF00) >> 8
-        b = pixel >> 16
-        return r, g, b
-
-    def get_rgb_fast(self, px: int, py: int):
-        hdc = self._get_cached_hdc()
-        pixel = self._gdi32.GetPixel(hdc, px, py)
-        if pixel == -1:
-            return self.get_rgb(px, py)
-        r = pixel & 0x0000FF
-        g = (pixel & 0x00FF00) >> 8
-        b = pixel >> 16
-        return r, g, b
+        return self._frame_source.get_pixel(px, py)
+
+    def _capture(self, params: DetectorParams, px: int, py: int) -> PatchBuffer:
+        patch = params.patch
+        patch.move_to(px - params.radius, py - params.radius)
+        self._grab(patch)
+        return patch
+
+    def _grab(self, patch: PatchBuffer) -> None:
+        stages = self._stages
+        if stages is None:
+            self._frame_source.grab(patch)
+            return
+        start = stages.clock()
+        self._frame_source.grab(patch)
+        stages.record("capture", start)
+
+    def _classify(self, classify, *args):
+        stages = self._stages
+        if stages is None:
+            return classify(*args)
+        start = stages.clock()
+        result = classify(*args)
+        stages.record("classify", start)
+        return result
 
     def is_yellow(self, r: int, g: int, b: int) -> bool:
-        t = self._thresholds
+        t = self._params.thresholds
         return r >= t.yellow_min_r and g >= t.yellow_min_g and b <= t.yellow_max_b
 
     def is_blue(self, r: int, g: int, b: int) -> bool:
-        t = self._thresholds
+        t = self._params.thresholds
         return r <= t.blue_max_r and g <= t.blue_max_g and b >= t.blue_min_b
 
     def is_red(self, r: int, g: int, b: int) -> bool:
-        t = self._thresholds
+        t = self._params.thresholds
         return r >= t.red_min_r and g <= t.red_max_g and b <= t.red_max_b
 
     def color_matches_target(self, r: int, g: int, b: int, target_color: str) -> bool:
-        if target_color == "黄":
-            return self.is_yellow(r, g, b)
-        if target_color == "蓝":
-            return self.is_blue(r, g, b)
-        if target_color == "红":
-            return self.is_red(r, g, b)
-        return False
+        return self._params.lut.matches(r, g, b, target_color)
 
     def match_target(self, px: int, py: int, target_color: str) -> bool:
         r1, g1, b1 = self.get_rgb(px, py)
         if not self.color_matches_target(r1, g1, b1, target_color):
             return False
 
-        time.sleep(self._double_sample_gap)
+        self._sleep(self._double_sample_gap)
         r2, g2, b2 = self.get_rgb(px, py)
         return self.color_matches_target(r2, g2, b2, target_color)
 
     def match_target_fast(self, px: int, py: int, target_color: str) -> bool:
-        hits_1 = self._match_hits_fast(px, py, target_color)
-        if hits_1 < self._sample_min_hits:
-            return False
+        return self._match_target(px, py, target_color, False)[0]
+
+    def match_target_observed(self, px: int, py: int, target_color: str) -> Tuple[bool, Optional[str]]:
+        # Same decision as match_target_fast, plus the dominant card colour of its first sample, so the
+        # phase tracker learns from the capture that decides the lock instead of taking one of its own.
+        return self._match_target(px, py, target_color, True)
+
+    def _match_target(
+        self, px: int, py: int, target_color: str, observe: bool
+    ) -> Tuple[bool, Optional[str]]:
+        params = self._params
+        gate = self._gate
+        min_hits = self._sample_min_hits
+        if gate is None:
+            data = self._capture(params, px, py).data
+            observed = None
+            if observe:
+                hits, observed = self._classify(self._classify_hits, params, data)
+                hits_1 = hits.get(target_color, 0)
+            else:
+                hits_1 = self._classify(self._count_target_hits, params, data, target_color)
+            if hits_1 < min_hits:
+                return False, observed
+            return self._second_sample(params, px, py, target_color), observed
+
+        # The slot holds False (no match), True (first sample matched) or the time a confirmation sample
+        # with these exact pixels matched. In the last case that capture and this one are two matching
+        # samples at least a gap apart, which is what the sleep and second grab would establish.
+        captured_at = self._clock()
+        data = self._capture(params, px, py).data
+        digest = gate.digest(data)
+        hits = observed = None
+        if observe:
+            hits, observed = self._gated_hits(params, gate, (params.generation, px, py, digest), data)
+        key = (params.generation, px, py, target_color, digest)
+        seen = gate.get("match", key)
+        if seen is None:
+            if hits is not None:
+                seen = hits.get(target_color, 0) >= min_hits
+            else:
+                seen = self._classify(self._count_target_hits, params, data, target_color) >= min_hits
+            gate.put("match", key, seen)
+        if seen is False:
+            return False, observed
+        if seen is not True and captured_at - seen >= self._double_sample_gap:
+            return True, observed
 
-        time.sleep(self._double_sample_gap)
-        hits_2 = self._match_hits_fast(px, py, target_color)
+        confirmed = self._second_sample(params, px, py, target_color)
+        confirmed_at = self._clock()
+        key = (params.generation, px, py, target_color, gate.digest(params.patch.data))
+        # A failed confirmation is stored under its own pixels only, never under the first sample's.
+        gate.put("match", key, confirmed_at if confirmed else False)
+        return confirmed, observed
+
+    def confirm_regions(self, px: int, py: int, target_color: str, min_confidence: float) -> bool:
+        self._confirm_gap()
+        vote = self.vote_regions(px, py)
+        return vote.color == target_color and vote.confidence >= min_confidence
+
+    def _second_sample(self, params: DetectorParams, px: int, py: int, target_color: str) -> bool:
+        self._confirm_gap()
+        hits_2 = self._match_hits_fast(px, py, target_color, params)
         return hits_2 >= self._sample_min_hits
 
-    def _match_hits_fast(self, px: int, py: int, target_color: str) -> int:
-        # Always test center first, then the surrounding neighborhood.
-        points = [(px, py)]
-        radius = self._sample_radius_px
-        if radius > 0:
-            for dy in range(-radius, radius + 1):
-                for dx in range(-radius, radius + 1):
-                    if dx == 0 and dy == 0:
-                        continue
-                    points.append((px + dx, py + dy))
+    def _confirm_gap(self) -> None:
+        stages = self._stages
+        if stages is None:
+            self._sleep(self._double_sample_gap)
+            return
+        start = stages.clock()
+        self._sleep(self._double_sample_gap)
+        stages.record("confirm_gap", start)
+
+    def sample_card_hits(self, px: int, py: int) -> Tuple[Dict[str, int], Optional[str]]:
+        params = self._params
+        data = self._capture(params, px, py).data
+        gate = self._gate
+        if gate is None:
+            return self._classify(self._classify_hits, params, data)
+
+        return self._gated_hits(params, gate, (params.generation, px, py, gate.digest(data)), data)
+
+    def _gated_hits(self, params: DetectorParams, gate: ChangeGate, key, data) -> Tuple[Dict[str, int], Optional[str]]:
+        result = gate.get("hits", key)
+        if result is None:
+            result = self._classify(self._classify_hits, params, data)
+            gate.put("hits", key, result)
+        return result
+
+    def _classify_hits(self, params: DetectorParams, data) -> Tuple[Dict[str, int], Optional[str]]:
+        hits = dict.fromkeys(TARGET_BITS, 0)
+        for value in params.lut.masks(data):
+            for color in COLORS_BY_MASK[value]:
+                hits[color] += 1
+
+        dominant = None
+        dominant_hits = self._sample_min_hits - 1
+        for color, count in hits.items():
+            if count > dominant_hits:
+                dominant = color
+                dominant_hits = count
+        return hits, dominant
+
+    def vote_regions(self, px: int, py: int) -> RoiVote:
+        params = self._params
+        patch = params.roi.move_to(px, py)
+        self._grab(patch)
+        data = patch.data
+        gate = self._gate
+        if gate is None:
+            return self._classify(self._vote, params, data)
 
+        key = (params.generation, px, py, gate.digest(data))
+        vote = gate.get("vote", key)
+        if vote is None:
+            vote = self._classify(self._vote, params, data)
+            gate.put("vote", key, vote)
+        return vote
+
+    def _vote(self, params: DetectorParams, data) -> RoiVote:
+        roi = params.roi
+        masks = params.lut.masks
+        scores = dict.fromkeys(TARGET_BITS, 0.0)
+        for offsets, weight in zip(roi.offsets, roi.weights):
+            mask_counts = [0] * 16
+            for value in masks(data, offsets):
+                mask_counts[value] += 1
+            # Each region contributes its weight split by the fraction of its pixels in each color.
+            scale = weight / len(offsets)
+            for color, bit in TARGET_BITS.items():
+                count = sum(n for mask, n in enumerate(mask_counts) if mask & bit)
+                if count:
+                    scores[color] += count * scale
+
+        best = max(scores, key=scores.__getitem__)
+        if scores[best] <= 0.0:
+            return RoiVote(None, 0.0, scores)
+        return RoiVote(best, scores[best] / roi.total_weight, scores)
+
+    def _match_hits_fast(
+        self, px: int, py: int, target_color: str, params: Optional[DetectorParams] = None
+    ) -> int:
+        if target_color not in TARGET_BITS:
+            return 0
+        if params is None:
+            params = self._params
+        return self._classify(self._count_target_hits, params, self._capture(params, px, py).data, target_color)
+
+    def pixel_masks(self, data) -> List[int]:
+        return list(self._params.lut.masks(data))
+
+    def _count_target_hits(self, params: DetectorParams, data, target_color: str) -> int:
+        target_bit = TARGET_BITS.get(target_color, 0)
+        if not target_bit:
+            return 0
+
+        min_hits = self._sample_min_hits
         hits = 0
-        for sx, sy in points:
-            r, g, b = self.get_rgb_fast(sx, sy)
-            if self.color_matches_target(r, g, b, target_color):
+        for value in params.lut.masks(data):
+            if value & target_bit:
                 hits += 1
-                if hits >= self._sample_min_hits:
+                if hits >= min_hits:
                     return hits
         return hits
 
+    def count_patch_colors(self, px: int, py: int) -> Dict[str, int]:
+        # Offline inspection of one patch (vectorized when numpy is installed); polls never call it.
+        params = self._params
+        patch = self._capture(params, px, py)
+        if HAS_NUMPY:
+            return classify_patch(patch, params.thresholds).counts
+
+        counts = dict.fromkeys(CARD_COLORS, 0)
+        for value in params.lut.masks(patch.data):
+            for color in CARD_COLORS:
+                if value & TARGET_BITS[color]:
+                    counts[color] += 1
+        return counts
+
     def get_color_name(self, r: int, g: int, b: int) -> str:
-        if self.is_yellow(r, g, b):
-            return "黄"
-        if self.is_blue(r, g, b):
-            return "蓝"
-        if self.is_red(r, g, b):
-            return "红"
-        if abs(r - g) <= 12 and abs(g - b) <= 12:
-            return "灰"
-        return "未知"
+        return self._params.lut.color_name(r, g, b)
@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import struct
+from dataclasses import asdict
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, Optional
+
+from app.capture import BYTES_PER_PIXEL
+from app.config import ColorThresholds
+
+LUT_FORMAT_VERSION = 2
+# Bump whenever box_range_mask, its helpers or the class bits and GRAY_TOLERANCE change meaning,
+# so a table cached by an older classifier with the same thresholds is rebuilt.
+CLASSIFIER_VERSION = 1
+DEFAULT_LUT_BITS = 5
+
+LUT_MAGIC = b"TFLUT\0"
+# magic, format version, bits, full thresholds_key (hex sha1), sha1 of the table that follows.
+LUT_HEADER = struct.Struct("<6sHB40s20s")
+
+YELLOW_BIT = 0x01
+BLUE_BIT = 0x02
+RED_BIT = 0x04
+GRAY_BIT = 0x08
+AMBIGUOUS = 0x80
+
+CARD_COLORS = ("黄", "蓝", "红")
+TARGET_BITS = {"黄": YELLOW_BIT, "蓝": BLUE_BIT, "红": RED_BIT}
+GRAY_TOLERANCE = 12
+
+
+def _name_for_mask(mask: int) -> str:
+    if mask & YELLOW_BIT:
+        return "黄"
+    if mask & BLUE_BIT:
+        return "蓝"
+    if mask & RED_BIT:
+        return "红"
+    if mask & GRAY_BIT:
+        return "灰"
+    return "未知"
+
+
+NAME_BY_MASK = tuple(_name_for_mask(mask) for mask in range(16))
+# Card colours whose bit is set in each class mask, in TARGET_BITS order.
+COLORS_BY_MASK = tuple(tuple(color for color, bit in TARGET_BITS.items() if mask & bit) for mask in range(16))
+
+# Returns the class mask shared by every pixel in the box, or AMBIGUOUS if the box straddles a boundary.
+RangeClassifier = Callable[[ColorThresholds, int, int, int, int, int, int], int]
+
+
+def exact_mask(t: ColorThresholds, r: int, g: int, b: int) -> int:
+    mask = 0
+    if r >= t.yellow_min_r and g >= t.yellow_min_g and b <= t.yellow_max_b:
+        mask |= YELLOW_BIT
+    if r <= t.blue_max_r and g <= t.blue_max_g and b >= t.blue_min_b:
+        mask |= BLUE_BIT
+    if r >= t.red_min_r and g <= t.red_max_g and b <= t.red_max_b:
+        mask |= RED_BIT
+    if abs(r - g) <= GRAY_TOLERANCE and abs(g - b) <= GRAY_TOLERANCE:
+        mask |= GRAY_BIT
+    return mask
+
+
+def _at_least(lo: int, hi: int, bound: int) -> Optional[bool]:
+    if lo >= bound:
+        return True
+    if hi < bound:
+        return False
+    return None
+
+
+def _at_most(lo: int, hi: int, bound: int) -> Optional[bool]:
+    if hi <= bound:
+        return True
+    if lo > bound:
+        return False
+    return None
+
+
+def _all_of(*tests: Optional[bool]) -> Optional[bool]:
+    if any(test is False for test in tests):
+        return False
+    if all(test is True for test in tests):
+        return True
+    return None
+
+
+def _within(lo: int, hi: int, tolerance: int) -> Optional[bool]:
+    return _all_of(_at_least(lo, hi, -tolerance), _at_most(lo, hi, tolerance))
+
+
+def box_range_mask(t: ColorThresholds, rlo: int, rhi: int, glo: int, ghi: int, blo: int, bhi: int) -> int:
+    tests = (
+        (YELLOW_BIT, _all_of(_at_least(rlo, rhi, t.yellow_min_r), _at_least(glo, ghi, t.yellow_min_g), _at_most(blo, bhi, t.yellow_max_b))),
+        (BLUE_BIT, _all_of(_at_most(rlo, rhi, t.blue_max_r), _at_most(glo, ghi, t.blue_max_g), _at_least(blo, bhi, t.blue_min_b))),
+        (RED_BIT, _all_of(_at_least(rlo, rhi, t.red_min_r), _at_most(glo, ghi, t.red_max_g), _at_most(blo, bhi, t.red_max_b))),
+        (GRAY_BIT, _all_of(_within(rlo - ghi, rhi - glo, GRAY_TOLERANCE), _within(glo - bhi, ghi - blo, GRAY_TOLERANCE))),
+    )
+    mask = 0
+    for bit, test in tests:
+        if test is None:
+            return AMBIGUOUS
+        if test:
+            mask |= bit
+    return mask
+
+
+@lru_cache(maxsize=8)
+def build_table(
+    thresholds: ColorThresholds,
+    bits: int = DEFAULT_LUT_BITS,
+    classify_range: RangeClassifier = box_range_mask,
+) -> bytes:
+    levels = 1 << bits
+    step = 1 << (8 - bits)
+    table = bytearray(levels * levels * levels)
+    i = 0
+    for qr in range(levels):
+        rlo = qr * step
+        for qg in range(levels):
+            glo = qg * step
+            for qb in range(levels):
+                blo = qb * step
+                table[i] = classify_range(thresholds, rlo, rlo + step - 1, glo, glo + step - 1, blo, blo + step - 1)
+                i += 1
+    return bytes(table)
+
+
+def thresholds_key(thresholds: ColorThresholds, bits: int = DEFAULT_LUT_BITS) -> str:
+    payload = json.dumps(
+        {
+            "version": LUT_FORMAT_VERSION,
+            "bits": bits,
+            "thresholds": asdict(thresholds),
+            "classifier": CLASSIFIER_VERSION,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class ColorLut:
+    def __init__(self, thresholds: ColorThresholds, table: bytes, bits: int = DEFAULT_LUT_BITS):
+        levels = 1 << bits
+        if len(table) != levels * levels * levels:
+            raise ValueError(f"lookup table size {len(table)} does not match bits={bits}")
+        self.thresholds = thresholds
+        self.table = table
+        self.bits = bits
+        self.shift = 8 - bits
+
+    def index(self, r: int, g: int, b: int) -> int:
+        shift = self.shift
+        bits = self.bits
+        return (((r >> shift) << bits | (g >> shift)) << bits) | (b >> shift)
+
+    def mask(self, r: int, g: int, b: int) -> int:
+        value = self.table[self.index(r, g, b)]
+        if value == AMBIGUOUS:
+            return exact_mask(self.thresholds, r, g, b)
+        return value
+
+    def masks(self, data, offsets: Optional[Iterable[int]] = None) -> Iterator[int]:
+        # Class masks of the BGRA pixels in data, or of the pixels starting at the given byte offsets.
+        thresholds = self.thresholds
+        table = self.table
+        shift = self.shift
+        bits = self.bits
+        if offsets is None:
+            offsets = range(0, len(data), BYTES_PER_PIXEL)
+        for i in offsets:
+            b, g, r = data[i], data[i + 1], data[i + 2]
+            value = table[(((r >> shift) << bits | (g >> shift)) << bits) | (b >> shift)]
+            if value == AMBIGUOUS:
+                value = exact_mask(thresholds, r, g, b)
+            yield value
+
+    def matches(self, r: int, g: int, b: int, target_color: str) -> bool:
+        return bool(self.mask(r, g, b) & TARGET_BITS.get(target_color, 0))
+
+    def color_name(self, r: int, g: int, b: int) -> str:
+        return NAME_BY_MASK[self.mask(r, g, b)]
+
+    def ambiguous_ratio(self) -> float:
+        return self.table.count(AMBIGUOUS) / len(self.table)
+
+
+def build_lut(thresholds: ColorThresholds, bits: int = DEFAULT_LUT_BITS) -> ColorLut:
+    return ColorLut(thresholds, build_table(thresholds, bits), bits)
+
+
+def lut_cache_path(cache_dir: str, thresholds: ColorThresholds, bits: int = DEFAULT_LUT_BITS) -> str:
+    return os.path.join(cache_dir, f"color_lut_{thresholds_key(thresholds, bits)[:16]}.bin")
+
+
+def encode_lut_file(lut: ColorLut) -> bytes:
+    key = thresholds_key(lut.thresholds, lut.bits).encode("ascii")
+    header = LUT_HEADER.pack(LUT_MAGIC, LUT_FORMAT_VERSION, lut.bits, key, hashlib.sha1(lut.table).digest())
+    return header + lut.table
+
+
+def decode_lut_file(data: bytes, thresholds: ColorThresholds, bits: int = DEFAULT_LUT_BITS) -> ColorLut:
+    if len(data) < LUT_HEADER.size:
+        raise ValueError("lookup table file is truncated")
+    magic, version, file_bits, key, digest = LUT_HEADER.unpack_from(data)
+    if magic != LUT_MAGIC or version != LUT_FORMAT_VERSION:
+        raise ValueError(f"unsupported lookup table file: {magic!r} v{version}")
+    if file_bits != bits or key != thresholds_key(thresholds, bits).encode("ascii"):
+        raise ValueError("lookup table file was built for other thresholds or another classifier")
+    table = data[LUT_HEADER.size :]
+    if hashlib.sha1(table).digest() != digest:
+        raise ValueError("lookup table checksum mismatch")
+    return ColorLut(thresholds, table, bits)
+
+
+def load_or_build_lut(
+    thresholds: ColorThresholds,
+    cache_dir: Optional[str],
+    bits: int = DEFAULT_LUT_BITS,
+    log: Callable[[str], None] = print,
+) -> ColorLut:
+    if not cache_dir:
+        return build_lut(thresholds, bits)
+
+    path = lut_cache_path(cache_dir, thresholds, bits)
+    try:
+        with open(path, "rb") as f:
+            return decode_lut_file(f.read(), thresholds, bits)
+    except (OSError, ValueError):
+        pass
+
+    lut = build_lut(thresholds, bits)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(encode_lut_file(lut))
+        os.replace(tmp_path, path)
+    except OSError as exc:
+        log(f"写入颜色查找表缓存失败：{exc}")
+    return lut
@@ -1,12 +1,16 @@
 import os
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
+from typing import Tuple
+
+from app.backends import backend_names
 
 
 @dataclass(frozen=True)
 class TimingConfig:
+    window_focus_hook: bool = True
     window_poll_active_interval: float = 0.012
     window_poll_inactive_interval: float = 0.09
-    window_pid_cache_ttl: float = 0.2
+    process_cache_size: int = 64
     card_poll_interval: float = 0.008
     card_poll_fast_interval: float = 0.004
     animation_grace: float = 0.0
@@ -15,7 +19,32 @@ class TimingConfig:
     partial_match_grace: float = 0.08
     focus_recovery_window: float = 0.05
     double_sample_gap: float = 0.0015
+    poll_strategy: str = "hybrid"
+    poll_spin_threshold: float = 0.0015
     sample_radius_px: int = 1
+    phase_tracking_enabled: bool = False
+    phase_min_confidence: float = 0.6
+    phase_sparse_interval: float = 0.03
+    # Seconds from the W press to the game locking the card; 0 disables pre-emptive locking.
+    # Keep it at or below the measured delay: capped at one frame (MAX_PHASE_LOCK_LEAD in the selector).
+    phase_lock_lead: float = 0.0
+    phase_preempt_confidence: float = 0.6
+    lock_verify_delay: float = 0.05
+    multi_roi_enabled: bool = False
+    # (dx, dy, weight) around the clicked point: centre plus the four quadrants of the W icon.
+    roi_regions: Tuple[Tuple[int, int, float], ...] = (
+        (0, 0, 2.0),
+        (-8, -8, 1.0),
+        (8, -8, 1.0),
+        (-8, 8, 1.0),
+        (8, 8, 1.0),
+    )
+    roi_min_confidence: float = 0.5
+    roi_commit_confidence: float = 0.85
+    change_gate_enabled: bool = True
+    calibration_frames: int = 8
+    calibration_frame_interval: float = 0.016
+    calibration_radius_px: int = 6
     sample_min_hits: int = 2
     r_double_press_gap: float = 8.0
 
@@ -38,27 +67,139 @@ class ColorThresholds:
 @dataclass(frozen=True)
 class AppConfig:
     coordinate_file: str = "color_coordinates.txt"
+    profile_file: str = "tf_profiles.json"
+    calibration_mode: bool = False
+    cache_dir: str = ".tf_cache"
+    trace_file: str = ""
+    adaptive_tuning: bool = False
     target_process_name: str = "League of Legends.exe"
     debug_enabled: bool = False
     log_throttle_sec: float = 0.2
+    # Console lines go through a bounded queue drained by a writer thread; see app.log_sink.
+    log_file: str = ""
+    log_queue_capacity: int = 4096
+    log_drop_policy: str = "drop_newest"
     perf_stats_enabled: bool = False
     perf_stats_report_every: int = 200
-    input_backend: str = "pynput"
+    stage_timing: bool = False
+    # Loopback Prometheus endpoint (0 disables) and rotating JSONL file for live telemetry.
+    telemetry_port: int = 0
+    telemetry_file: str = ""
+    telemetry_interval: float = 1.0
+    telemetry_max_bytes: int = 5_000_000
+    telemetry_backups: int = 3
+    # Backend names from app.backends; empty picks the platform default.
+    input_backend: str = ""
+    capture_backend: str = ""
+    focus_backend: str = ""
+    injection_backend: str = ""
+    threaded_injection: bool = False
+    realtime_mode: bool = False
+    realtime_process_priority: str = "high"
+    realtime_thread_priority: str = "highest"
+    # Core for the selector worker; negative counts from the last core.
+    realtime_cpu: int = -1
+    realtime_timer_ms: int = 1
+    realtime_probe_seconds: float = 0.5
     timing: TimingConfig = field(default_factory=TimingConfig)
     colors: ColorThresholds = field(default_factory=ColorThresholds)
 
 
+def _parse_roi_regions(spec: str) -> Tuple[Tuple[int, int, float], ...]:
+    # "dx,dy[,weight];dx,dy[,weight];..."
+    regions = []
+    for part in spec.split(";"):
+        values = [v.strip() for v in part.split(",") if v.strip()]
+        if not values:
+            continue
+        if len(values) not in (2, 3):
+            raise ValueError(f"invalid sample region: {part!r}")
+        regions.append((int(values[0]), int(values[1]), float(values[2]) if len(values) == 3 else 1.0))
+    if not regions:
+        raise ValueError("no sample regions given")
+    return tuple(regions)
+
+
+def _backend_from_env(kind: str, var: str) -> str:
+    name = os.getenv(var, "").strip().lower()
+    if name and name not in backend_names(kind):
+        print(f"未知{kind}后端: {name}，使用平台默认后端")
+        return ""
+    return name
+
+
 def load_config() -> AppConfig:
-    backend = os.getenv("TF_INPUT_BACKEND", "pynput").strip().lower()
-    if backend != "pynput":
-        if backend == "legacy":
-            print("TF_INPUT_BACKEND=legacy 已弃用，自动回退到 pynput")
-        else:
-            print(f"未知输入后端: {backend}，自动回退到 pynput")
+    backend = os.getenv("TF_INPUT_BACKEND", "").strip().lower()
+    if backend == "legacy":
+        print("TF_INPUT_BACKEND=legacy 已弃用，自动回退到 pynput")
         backend = "pynput"
+    elif backend and backend not in backend_names("input"):
+        print(f"未知输入后端: {backend}，使用平台默认后端")
+        backend = ""
+
+    poll_strategy = os.getenv("TF_POLL_STRATEGY", "hybrid").strip().lower()
+    if poll_strategy not in ("sleep", "hybrid", "spin"):
+        print(f"未知轮询策略: {poll_strategy}，自动回退到 hybrid")
+        poll_strategy = "hybrid"
 
     perf_stats_enabled = os.getenv("TF_PERF_STATS", "0").strip() in ("1", "true", "TRUE", "yes", "on")
+    stage_timing = os.getenv("TF_STAGE_TIMING", "0").strip() in ("1", "true", "TRUE", "yes", "on")
+    calibration_mode = os.getenv("TF_CALIBRATE", "0").strip() in ("1", "true", "TRUE", "yes", "on")
+    threaded_injection = os.getenv("TF_THREADED_INJECTION", "0").strip() in ("1", "true", "TRUE", "yes", "on")
+    trace_file = os.getenv("TF_TRACE_FILE", "").strip()
+    adaptive_tuning = os.getenv("TF_ADAPTIVE", "0").strip() in ("1", "true", "TRUE", "yes", "on")
+    phase_tracking_enabled = os.getenv("TF_PHASE_TRACKING", "0").strip() in ("1", "true", "TRUE", "yes", "on")
+    multi_roi_enabled = os.getenv("TF_MULTI_ROI", "0").strip() in ("1", "true", "TRUE", "yes", "on")
+    realtime_mode = os.getenv("TF_REALTIME", "0").strip() in ("1", "true", "TRUE", "yes", "on")
+    realtime_cpu = -1
+    cpu_spec = os.getenv("TF_REALTIME_CPU", "").strip()
+    if cpu_spec:
+        try:
+            realtime_cpu = int(cpu_spec)
+        except ValueError:
+            print(f"TF_REALTIME_CPU 无效: {cpu_spec}，使用最后一个核心")
+    telemetry_port = 0
+    port_spec = os.getenv("TF_TELEMETRY_PORT", "").strip()
+    if port_spec:
+        try:
+            telemetry_port = int(port_spec)
+        except ValueError:
+            print(f"TF_TELEMETRY_PORT 无效: {port_spec}，不启用遥测端口")
+    telemetry_file = os.getenv("TF_TELEMETRY_FILE", "").strip()
+    log_file = os.getenv("TF_LOG_FILE", "").strip()
+    log_drop_policy = os.getenv("TF_LOG_DROP_POLICY", "drop_newest").strip().lower()
+    if log_drop_policy not in ("drop_newest", "drop_oldest"):
+        print(f"未知日志丢弃策略: {log_drop_policy}，自动回退到 drop_newest")
+        log_drop_policy = "drop_newest"
+    change_gate_enabled = os.getenv("TF_CHANGE_GATE", "1").strip() in ("1", "true", "TRUE", "yes", "on")
+    timing = TimingConfig(
+        poll_strategy=poll_strategy,
+        phase_tracking_enabled=phase_tracking_enabled,
+        multi_roi_enabled=multi_roi_enabled,
+        change_gate_enabled=change_gate_enabled,
+    )
+    roi_spec = os.getenv("TF_ROI_REGIONS", "").strip()
+    if roi_spec:
+        try:
+            timing = replace(timing, roi_regions=_parse_roi_regions(roi_spec))
+        except ValueError as exc:
+            print(f"TF_ROI_REGIONS 无效（{exc}），使用默认取样区域")
     return AppConfig(
         input_backend=backend,
+        capture_backend=_backend_from_env("capture", "TF_CAPTURE_BACKEND"),
+        focus_backend=_backend_from_env("focus", "TF_FOCUS_BACKEND"),
+        injection_backend=_backend_from_env("injection", "TF_INJECTION_BACKEND"),
         perf_stats_enabled=perf_stats_enabled,
+        stage_timing=stage_timing,
+        telemetry_port=telemetry_port,
+        telemetry_file=telemetry_file,
+        log_file=log_file,
+        log_drop_policy=log_drop_policy,
+        threaded_injection=threaded_injection,
+        calibration_mode=calibration_mode,
+        trace_file=trace_file,
+        adaptive_tuning=adaptive_tuning,
+        realtime_mode=realtime_mode,
+        realtime_cpu=realtime_cpu,
+        timing=timing,
     )
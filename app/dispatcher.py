@@ -0,0 +1,115 @@
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+from app.perf import LatencyHistogram
+
+_STOP = object()
+PERCENTILES = (0.5, 0.99)
+
+
+class InputDispatcher:
+    # Hook callbacks only timestamp the event and enqueue it; SharedState, the window guard and SendInput
+    # are all touched on the dispatcher thread, so a slow handler can never stall the system-wide hook.
+    def __init__(
+        self,
+        on_key_down: Callable[[object, Optional[float]], object],
+        on_key_up: Callable[[object, Optional[float]], object],
+        on_middle_click: Callable[[object, Optional[float]], object],
+        clock: Callable[[], float] = time.perf_counter,
+        log: Callable[[str], None] = print,
+    ):
+        self._on_key_down = on_key_down
+        self._on_key_up = on_key_up
+        self._on_middle_click = on_middle_click
+        self._clock = clock
+        self._log = log
+        # SimpleQueue.put is a C call that never blocks and takes no Python-level lock.
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        # Keyboard and mouse hooks run on separate listener threads, so each gets its own histogram.
+        self.key_hook_latency = LatencyHistogram()
+        self.mouse_hook_latency = LatencyHistogram()
+        self.dispatch_delay = LatencyHistogram()
+        self.dispatched = 0
+        self.errors = 0
+
+    @property
+    def thread(self) -> Optional[threading.Thread]:
+        return self._thread
+
+    def on_key_down(self, event) -> bool:
+        return self._push(self._on_key_down, event, self.key_hook_latency)
+
+    def on_key_up(self, event) -> bool:
+        return self._push(self._on_key_up, event, self.key_hook_latency)
+
+    def on_middle_click(self, event) -> bool:
+        return self._push(self._on_middle_click, event, self.mouse_hook_latency)
+
+    def _push(self, handler, event, histogram: LatencyHistogram) -> bool:
+        clock = self._clock
+        ts = clock()
+        # Keystroke events are shared immutable objects, so the stamp rides next to the event in the queue.
+        self._queue.put((handler, event, ts))
+        histogram.record((clock() - ts) * 1_000_000)
+        return True
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._loop, name="input-dispatch", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._queue.put(_STOP)
+        if self._thread is not None:
+            self._thread.join(timeout=0.5)
+
+    def _loop(self) -> None:
+        get = self._queue.get
+        while True:
+            item = get()
+            if item is _STOP:
+                break
+            self._dispatch(item)
+
+    def run_pending(self) -> int:
+        handled = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return handled
+            if item is _STOP:
+                return handled
+            self._dispatch(item)
+            handled += 1
+
+    def _dispatch(self, item) -> None:
+        handler, event, ts = item
+        self.dispatch_delay.record((self._clock() - ts) * 1_000_000)
+        try:
+            handler(event, ts)
+        except Exception as exc:
+            self.errors += 1
+            self._log(f"输入事件处理失败：{exc}")
+        self.dispatched += 1
+
+    def hook_latency(self) -> LatencyHistogram:
+        merged = self.key_hook_latency.empty_copy()
+        merged.merge(self.key_hook_latency)
+        merged.merge(self.mouse_hook_latency)
+        return merged
+
+    def format_stats(self) -> str:
+        hook = self.hook_latency()
+
+        def us(value):
+            return "n/a" if value is None else f"{value}us"
+
+        hook_p50, hook_p99 = hook.percentiles(PERCENTILES)
+        delay_p50, delay_p99 = self.dispatch_delay.percentiles(PERCENTILES)
+        return (
+            f"hook p50={us(hook_p50)} p99={us(hook_p99)} max={us(hook.max_value if hook.count else None)} "
+            f"dispatch p50={us(delay_p50)} p99={us(delay_p99)} events={self.dispatched} errors={self.errors}"
+        )
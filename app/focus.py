@@ -0,0 +1,216 @@
+import threading
+from typing import Callable, Optional, Tuple
+
+EVENT_SYSTEM_FOREGROUND = 0x0003
+WINEVENT_OUTOFCONTEXT = 0x0000
+WM_QUIT = 0x0012
+
+# Called with the pid owning the new foreground window and the window handle, or None for both when there is none.
+# The return value tells polling sources whether the target is active, which picks the poll interval.
+FocusCallback = Callable[[Optional[int], Optional[int]], Optional[bool]]
+ForegroundWindow = Tuple[Optional[int], Optional[int]]
+
+
+def window_pid(hwnd) -> Optional[int]:
+    import win32process
+
+    if not hwnd:
+        return None
+    _, pid = win32process.GetWindowThreadProcessId(hwnd)
+    return pid or None
+
+
+def foreground_window() -> ForegroundWindow:
+    import win32gui
+
+    hwnd = win32gui.GetForegroundWindow()
+    return window_pid(hwnd), hwnd or None
+
+
+def find_window(is_target: Callable[[int, int], bool]):
+    # First visible top-level window, in z-order, whose (pid, hwnd) passes is_target.
+    import win32gui
+
+    found = []
+
+    def visit(hwnd, _extra):
+        if not found and win32gui.IsWindowVisible(hwnd):
+            pid = window_pid(hwnd)
+            if pid and is_target(pid, hwnd):
+                found.append(hwnd)
+        return True
+
+    win32gui.EnumWindows(visit, None)
+    return found[0] if found else None
+
+
+class FocusSource:
+    # Event-driven sources report every change themselves, so callers need no polling safety net.
+    event_driven = False
+    _thread: Optional[threading.Thread] = None
+
+    @property
+    def thread(self) -> Optional[threading.Thread]:
+        return self._thread
+
+    def start(self, on_change: FocusCallback) -> None:
+        raise NotImplementedError
+
+    def current_window(self) -> ForegroundWindow:
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        pass
+
+
+class WinEventFocusSource(FocusSource):
+    event_driven = True
+
+    def __init__(
+        self,
+        get_window: Callable[[], ForegroundWindow] = foreground_window,
+        pid_of: Callable[[object], Optional[int]] = window_pid,
+        log: Callable[[str], None] = print,
+    ):
+        self._get_window = get_window
+        self._pid_of = pid_of
+        self._log = log
+        self._on_change: Optional[FocusCallback] = None
+        self._thread: Optional[threading.Thread] = None
+        self._thread_id = 0
+        self._ready = threading.Event()
+        self._error: Optional[str] = None
+        self._proc = None
+
+    def current_window(self) -> ForegroundWindow:
+        return self._get_window()
+
+    def start(self, on_change: FocusCallback) -> None:
+        self._on_change = on_change
+        # The hook is owned by the thread that installs it and only fires while that thread pumps messages.
+        self._thread = threading.Thread(target=self._run, name="focus-hook", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(1.0):
+            raise OSError("前台窗口钩子启动超时")
+        if self._error is not None:
+            raise OSError(self._error)
+
+    def _run(self) -> None:
+        try:
+            import ctypes
+            from ctypes import windll, wintypes
+        except ImportError as exc:
+            self._error = str(exc)
+            self._ready.set()
+            return
+
+        user32 = windll.user32
+        win_event_proc = ctypes.WINFUNCTYPE(
+            None,
+            wintypes.HANDLE,
+            wintypes.DWORD,
+            wintypes.HWND,
+            wintypes.LONG,
+            wintypes.LONG,
+            wintypes.DWORD,
+            wintypes.DWORD,
+        )
+
+        def callback(_hook, _event, hwnd, _id_object, _id_child, _thread, _time):
+            try:
+                self._on_change(self._pid_of(hwnd), hwnd or None)
+            except Exception as exc:
+                self._log(f"处理前台窗口事件失败：{exc}")
+
+        # Keep a reference for as long as the hook exists, otherwise ctypes frees the thunk.
+        self._proc = win_event_proc(callback)
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+        user32.SetWinEventHook.argtypes = (
+            wintypes.DWORD,
+            wintypes.DWORD,
+            wintypes.HMODULE,
+            win_event_proc,
+            wintypes.DWORD,
+            wintypes.DWORD,
+            wintypes.DWORD,
+        )
+        hook = user32.SetWinEventHook(
+            EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND, None, self._proc, 0, 0, WINEVENT_OUTOFCONTEXT
+        )
+        if not hook:
+            self._error = f"SetWinEventHook 失败（错误码 {windll.kernel32.GetLastError()}）"
+            self._ready.set()
+            return
+
+        self._thread_id = windll.kernel32.GetCurrentThreadId()
+        self._ready.set()
+        self._on_change(*self._get_window())
+
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        user32.UnhookWinEvent(hook)
+
+    def stop(self) -> None:
+        if self._thread is None or not self._thread_id:
+            return
+        from ctypes import windll
+
+        windll.user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+        self._thread.join(timeout=0.5)
+
+
+class PollingFocusSource(FocusSource):
+    def __init__(
+        self,
+        active_interval: float,
+        inactive_interval: float,
+        get_window: Callable[[], ForegroundWindow] = foreground_window,
+    ):
+        self._active_interval = active_interval
+        self._inactive_interval = inactive_interval
+        self._get_window = get_window
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def current_window(self) -> ForegroundWindow:
+        return self._get_window()
+
+    def start(self, on_change: FocusCallback) -> None:
+        def loop():
+            last = self._get_window()
+            active = on_change(*last)
+            while not self._stop_event.wait(self._active_interval if active else self._inactive_interval):
+                window = self._get_window()
+                if window != last:
+                    last = window
+                    active = on_change(*window)
+
+        self._thread = threading.Thread(target=loop, name="focus-poll", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=0.5)
+
+
+class ScriptedFocusSource(FocusSource):
+    event_driven = True
+
+    def __init__(self, pid: Optional[int] = None, hwnd: Optional[int] = None):
+        self._window = (pid, hwnd)
+        self._on_change: Optional[FocusCallback] = None
+
+    def current_window(self) -> ForegroundWindow:
+        return self._window
+
+    def start(self, on_change: FocusCallback) -> None:
+        self._on_change = on_change
+        on_change(*self._window)
+
+    def emit(self, pid: Optional[int], hwnd: Optional[int] = None) -> None:
+        self._window = (pid, hwnd)
+        if self._on_change is not None:
+            self._on_change(pid, hwnd)
@@ -0,0 +1,147 @@
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.backends import create_backend
+from app.perf import LatencyHistogram
+
+W_SCANCODE = 0x11
+KEYEVENTF_SCANCODE = 0x0008
+KEYEVENTF_KEYUP = 0x0002
+INPUT_KEYBOARD = 1
+
+SentCallback = Callable[[float], None]
+
+
+class KeyInjector:
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self._clock = clock
+        self.latency = LatencyHistogram()
+
+    def tap(self, scancode: int, decision_ts: Optional[float] = None, on_sent: Optional[SentCallback] = None) -> None:
+        sent_ts = self._send_tap(scancode)
+        self._after_send(decision_ts, sent_ts, on_sent)
+
+    def _send_tap(self, scancode: int) -> float:
+        raise NotImplementedError
+
+    def prewarm(self, scancode: int) -> None:
+        pass
+
+    def _after_send(self, decision_ts: Optional[float], sent_ts: float, on_sent: Optional[SentCallback]) -> None:
+        if decision_ts is not None:
+            self.latency.record(max(0, round((sent_ts - decision_ts) * 1_000_000)))
+        if on_sent is not None:
+            on_sent(sent_ts)
+
+    def close(self) -> None:
+        pass
+
+    def format_stats(self) -> str:
+        p50, p99 = self.latency.percentiles((0.5, 0.99))
+        return f"decision_to_send n={self.latency.count} p50={p50}us p99={p99}us max={self.latency.max_value}us"
+
+
+class SendInputInjector(KeyInjector):
+    # Down+up packets are built once per scancode and sent with a single SendInput call.
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        super().__init__(clock)
+        from ctypes import c_ulong, pointer, sizeof, windll
+
+        from app.win_input import Input, InputI, KeyBdInput
+
+        self._input_cls = Input
+        self._input_i_cls = InputI
+        self._key_cls = KeyBdInput
+        self._pointer = pointer
+        self._extra = c_ulong(0)
+        self._extra_ptr = pointer(self._extra)
+        self._input_size = sizeof(Input)
+        self._send_input = windll.user32.SendInput
+        self._packets: Dict[int, Tuple[object, object]] = {}
+
+    def _packet(self, scancode: int):
+        cached = self._packets.get(scancode)
+        if cached is not None:
+            return cached
+
+        down = self._input_i_cls()
+        down.ki = self._key_cls(0, scancode, KEYEVENTF_SCANCODE, 0, self._extra_ptr)
+        up = self._input_i_cls()
+        up.ki = self._key_cls(0, scancode, KEYEVENTF_SCANCODE | KEYEVENTF_KEYUP, 0, self._extra_ptr)
+        packet = (self._input_cls * 2)((INPUT_KEYBOARD, down), (INPUT_KEYBOARD, up))
+        cached = (packet, self._pointer(packet))
+        self._packets[scancode] = cached
+        return cached
+
+    def prewarm(self, scancode: int) -> None:
+        self._packet(scancode)
+
+    def _send_tap(self, scancode: int) -> float:
+        _, packet_ptr = self._packet(scancode)
+        self._send_input(2, packet_ptr, self._input_size)
+        return self._clock()
+
+
+class RecordingInjector(KeyInjector):
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        super().__init__(clock)
+        self.taps: List[Tuple[int, float]] = []
+
+    def _send_tap(self, scancode: int) -> float:
+        sent_ts = self._clock()
+        self.taps.append((scancode, sent_ts))
+        return sent_ts
+
+
+class ThreadedInjector(KeyInjector):
+    def __init__(
+        self,
+        inner: KeyInjector,
+        clock: Callable[[], float] = time.perf_counter,
+        log: Callable[[str], None] = print,
+    ):
+        super().__init__(clock)
+        self._inner = inner
+        self._log = log
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._loop, name="key-injector", daemon=True)
+        self._thread.start()
+
+    def tap(self, scancode: int, decision_ts: Optional[float] = None, on_sent: Optional[SentCallback] = None) -> None:
+        self._queue.put((scancode, decision_ts, on_sent))
+
+    def prewarm(self, scancode: int) -> None:
+        self._inner.prewarm(scancode)
+
+    def _loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            scancode, decision_ts, on_sent = item
+            try:
+                sent_ts = self._inner._send_tap(scancode)
+                self._after_send(decision_ts, sent_ts, on_sent)
+            except Exception as exc:
+                self._log(f"发送按键失败：{exc}")
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=0.5)
+        self._inner.close()
+
+
+def build_injector(
+    threaded: bool = False,
+    inner: Optional[KeyInjector] = None,
+    backend: str = "",
+    log: Callable[[str], None] = print,
+) -> KeyInjector:
+    if inner is None:
+        inner = create_backend("injection", backend or None)
+    injector = inner
+    if threaded:
+        return ThreadedInjector(injector, log=log)
+    return injector
@@ -1,9 +1,7 @@
 import platform
 import threading
 from dataclasses import dataclass
-from typing import Callable, Optional, Tuple
-
-from pynput import keyboard, mouse
+from typing import Callable, Dict, List, Optional, Tuple
 
 KeyCallback = Callable[["InputEvent"], bool]
 MouseCallback = Callable[["InputEvent"], bool]
@@ -14,7 +12,7 @@ WM_KEYDOWN = 0x0100
 WM_SYSKEYDOWN = 0x0104
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class InputEvent:
     type: str
     key: Optional[str] = None
@@ -30,6 +28,34 @@ class InputEvent:
         return self.position
 
 
+KEY_VKS = {"Return": 0x0D, "Lcontrol": 0xA2, "Rcontrol": 0xA3}
+VK_KEY_NAMES = {vk: chr(vk) for vk in range(65, 91)}
+VK_KEY_NAMES.update({vk: name for name, vk in KEY_VKS.items()})
+# pynput Key attribute -> key name; resolved against the pynput module once per backend.
+SPECIAL_KEYS = {"enter": "Return", "ctrl_l": "Lcontrol", "ctrl_r": "Rcontrol"}
+
+
+def _interned_events(event_type: str) -> Tuple[Dict[str, InputEvent], Dict[str, InputEvent]]:
+    return tuple(
+        {name: InputEvent(event_type, name, is_injected=injected) for name in VK_KEY_NAMES.values()}
+        for injected in (False, True)
+    )
+
+
+# One immutable event object per (type, key, injected) so a keystroke allocates nothing on the hook thread.
+# The press time is not part of the event; InputDispatcher queues it next to the event and hands it to the handler.
+KEY_DOWN_EVENTS = _interned_events("key_down")
+KEY_UP_EVENTS = _interned_events("key_up")
+
+
+def key_event(event_type: str, key_name: str, is_injected: bool = False) -> InputEvent:
+    table = KEY_DOWN_EVENTS if event_type == "key_down" else KEY_UP_EVENTS
+    event = table[is_injected].get(key_name)
+    if event is None:
+        return InputEvent(event_type, key_name, is_injected=is_injected)
+    return event
+
+
 class InputBackend:
     def start(self):
         raise NotImplementedError
@@ -46,53 +72,47 @@ class PynputBackend(InputBackend):
         on_middle_click: MouseCallback,
         should_suppress_key: Optional[SuppressCallback] = None,
         debug: bool = False,
+        on_started: Optional[Callable[[List[threading.Thread]], None]] = None,
+        log: Callable[[str], None] = print,
     ):
         self.on_key_down = on_key_down
         self.on_key_up = on_key_up
         self.on_middle_click = on_middle_click
         self.should_suppress_key = should_suppress_key or (lambda _key, _inj: False)
         self.debug = debug
-
+        self.on_started = on_started
+        self._log = log
+        # Imported here so the module (and the scripted backend) load on machines without pynput.
+        from pynput import keyboard, mouse
+
+        self._keyboard = keyboard
+        self._mouse = mouse
+        self._key_code = keyboard.KeyCode
+        self._special_keys = {getattr(keyboard.Key, attr): name for attr, name in SPECIAL_KEYS.items()}
         self._keyboard_listener = None
         self._mouse_listener = None
         self._stop_event = threading.Event()
         self._is_windows = platform.system().lower().startswith("win")
-        self._vk_injected = {}
-
-    def _normalize_key(self, key) -> Optional[str]:
-        if isinstance(key, keyboard.KeyCode):
-            if key.char:
-                return key.char.upper()
-            return None
-
-        mapping = {
-            keyboard.Key.enter: "Return",
-            keyboard.Key.ctrl_l: "Lcontrol",
-            keyboard.Key.ctrl_r: "Rcontrol",
-        }
-        return mapping.get(key)
-
-    def _vk_from_key(self, key) -> Optional[int]:
-        if isinstance(key, keyboard.KeyCode):
-            return key.vk
-        vk_map = {
-            keyboard.Key.ctrl_l: 0xA2,
-            keyboard.Key.ctrl_r: 0xA3,
-            keyboard.Key.enter: 0x0D,
-        }
-        return vk_map.get(key)
+        # Injected flag per virtual-key code, written by the win32 filter and consumed by the next event.
+        self._vk_injected = bytearray(256)
 
     def _build_key_event(self, event_type: str, key) -> Optional[InputEvent]:
-        key_name = self._normalize_key(key)
-        if key_name is None:
-            return None
+        if isinstance(key, self._key_code):
+            if not key.char:
+                return None
+            key_name = key.char.upper()
+            vk = key.vk
+        else:
+            key_name = self._special_keys.get(key)
+            if key_name is None:
+                return None
+            vk = KEY_VKS[key_name]
 
-        vk = self._vk_from_key(key)
         is_injected = False
-        if vk is not None:
-            is_injected = self._vk_injected.pop(vk, False)
-
-        return InputEvent(type=event_type, key=key_name, is_injected=is_injected)
+        if vk is not None and 0 <= vk < 256:
+            is_injected = self._vk_injected[vk] == 1
+            self._vk_injected[vk] = 0
+        return key_event(event_type, key_name, is_injected)
 
     def _on_press(self, key):
         event = self._build_key_event("key_down", key)
@@ -107,7 +127,7 @@ class PynputBackend(InputBackend):
         self.on_key_up(event)
 
     def _on_click(self, x, y, button, pressed):
-        if button == mouse.Button.middle and pressed:
+        if button == self._mouse.Button.middle and pressed:
             self.on_middle_click(InputEvent(type="mouse_middle_down", position=(x, y)))
 
     def _win32_event_filter(self, msg, data):
@@ -117,32 +137,24 @@ class PynputBackend(InputBackend):
 
         vk = data.vkCode
         is_injected = bool(data.flags & LLKHF_INJECTED)
-        self._vk_injected[vk] = is_injected
+        if 0 <= vk < 256:
+            self._vk_injected[vk] = is_injected
 
         if is_injected:
             return
 
-        key_name = None
-        if 65 <= vk <= 90:
-            key_name = chr(vk)
-        elif vk == 0x0D:
-            key_name = "Return"
-        elif vk == 0xA2:
-            key_name = "Lcontrol"
-        elif vk == 0xA3:
-            key_name = "Rcontrol"
-
-        if not key_name:
+        key_name = VK_KEY_NAMES.get(vk)
+        if key_name is None:
             return
 
         if self.should_suppress_key(key_name, is_injected):
             self._keyboard_listener.suppress_event()
             if self.debug:
-                print(f"[input] suppress vk={vk} key={key_name}")
+                self._log(f"[input] suppress vk={vk} key={key_name}")
 
     def start(self):
         if self.debug:
-            print("[input] backend=pynput keymap=E/W/A/R/Return/Lcontrol/Rcontrol")
+            self._log("[input] backend=pynput keymap=E/W/A/R/Return/Lcontrol/Rcontrol")
 
         keyboard_kwargs = {
             "on_press": self._on_press,
@@ -152,10 +164,12 @@ class PynputBackend(InputBackend):
         if self._is_windows:
             keyboard_kwargs["win32_event_filter"] = self._win32_event_filter
 
-        self._keyboard_listener = keyboard.Listener(**keyboard_kwargs)
-        self._mouse_listener = mouse.Listener(on_click=self._on_click)
+        self._keyboard_listener = self._keyboard.Listener(**keyboard_kwargs)
+        self._mouse_listener = self._mouse.Listener(on_click=self._on_click)
         self._keyboard_listener.start()
         self._mouse_listener.start()
+        if self.on_started is not None:
+            self.on_started([self._keyboard_listener, self._mouse_listener])
 
         self._stop_event.wait()
         self._keyboard_listener.join()
@@ -167,3 +181,39 @@ class PynputBackend(InputBackend):
             self._keyboard_listener.stop()
         if self._mouse_listener is not None:
             self._mouse_listener.stop()
+
+
+class ScriptedInputBackend(InputBackend):
+    # Headless stand-in for the hook listeners: tests and Linux runs feed events through press/release/click.
+    def __init__(
+        self,
+        on_key_down: KeyCallback,
+        on_key_up: KeyCallback,
+        on_middle_click: MouseCallback,
+        should_suppress_key: Optional[SuppressCallback] = None,
+        debug: bool = False,
+        on_started: Optional[Callable[[List[threading.Thread]], None]] = None,
+        log: Callable[[str], None] = print,
+    ):
+        self.on_key_down = on_key_down
+        self.on_key_up = on_key_up
+        self.on_middle_click = on_middle_click
+        self.on_started = on_started
+        self._stop_event = threading.Event()
+
+    def press(self, key: str, is_injected: bool = False) -> None:
+        self.on_key_down(key_event("key_down", key, is_injected))
+
+    def release(self, key: str) -> None:
+        self.on_key_up(key_event("key_up", key))
+
+    def click(self, x: int, y: int) -> None:
+        self.on_middle_click(InputEvent(type="mouse_middle_down", position=(x, y)))
+
+    def start(self):
+        if self.on_started is not None:
+            self.on_started([])
+        self._stop_event.wait()
+
+    def stop(self):
+        self._stop_event.set()
@@ -1,11 +1,17 @@
 import os
 import time
-from typing import Callable
+from dataclasses import replace
+from typing import Callable, Optional
 
+from app.capture import PatchBuffer
 from app.color_detector import ColorDetector
+from app.color_lut import load_or_build_lut
 from app.config import AppConfig
+from app.point_calibration import PointCalibrator, PointReport
+from app.profiles import DisplayKey, Profile, ProfileStore, ThresholdCalibrator
 from app.selector import Selector
 from app.state import SharedState
+from app.trace import untraced
 from app.window_guard import WindowGuard
 
 
@@ -17,14 +23,41 @@ class InputHandlers:
         selector: Selector,
         window_guard: WindowGuard,
         color_detector: ColorDetector,
+        profile_store: Optional[ProfileStore] = None,
+        display_key: Optional[DisplayKey] = None,
+        point_calibrator: Optional[PointCalibrator] = None,
+        log: Callable[[str], None] = print,
     ):
         self._config = config
         self._state = state
         self._selector = selector
         self._window_guard = window_guard
         self._color_detector = color_detector
+        self._profile_store = profile_store
+        self._display_key = display_key
+        self._calibrator = ThresholdCalibrator() if config.calibration_mode else None
+        # The dispatcher thread grabs into its own buffer; the detector's patch belongs to the selector.
+        self._calibration_patch: Optional[PatchBuffer] = None
+        self._point_calibrator = point_calibrator
+        self._log = log
+
+    def _current_profile(self) -> Profile:
+        x, y = self._state.get_xy()
+        return Profile(
+            x=x,
+            y=y,
+            sample_radius_px=self._color_detector.sample_radius_px,
+            colors=self._color_detector.thresholds,
+        )
 
     def load_coordinates(self):
+        if self._profile_store is not None and self._display_key is not None:
+            profile = self._profile_store.get(self._display_key)
+            if profile is not None:
+                self._state.set_xy(profile.x, profile.y)
+                self._log(f"已从配置档案加载取色坐标：{profile.x}, {profile.y}（{self._display_key}）")
+                return
+
         path = self._config.coordinate_file
         if os.path.exists(path):
             try:
@@ -33,34 +66,89 @@ class InputHandlers:
                 if len(data) == 2:
                     x, y = int(data[0]), int(data[1])
                     self._state.set_xy(x, y)
-                    print(f"已从文件加载取色坐标：{x}, {y}")
+                    self._log(f"已从文件加载取色坐标：{x}, {y}")
                     return
-                print("坐标文件格式错误，使用默认坐标")
+                self._log("坐标文件格式错误，使用默认坐标")
             except Exception as exc:
-                print(f"加载坐标时发生错误：{exc}，使用默认坐标")
+                self._log(f"加载坐标时发生错误：{exc}，使用默认坐标")
         else:
-            print("未找到坐标文件，使用默认坐标")
+            self._log("未找到坐标文件，使用默认坐标")
 
-    def save_coordinates(self):
+    def save_coordinates(self, calibration: Optional[dict] = None):
         try:
             x, y = self._state.get_xy()
-            with open(self._config.coordinate_file, "w", encoding="utf-8") as f:
+            if self._profile_store is not None and self._display_key is not None:
+                changes = {"x": x, "y": y}
+                if calibration is not None:
+                    changes["calibration"] = calibration
+                self._profile_store.update_profile(self._display_key, self._current_profile(), **changes)
+                self._log(f"已将取色坐标保存到配置档案：{x}, {y}（{self._display_key}）")
+                return
+            path = self._config.coordinate_file
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
                 f.write(f"{x},{y}")
-            print(f"已将取色坐标保存到文件：{x}, {y}")
+            os.replace(tmp_path, path)
+            self._log(f"已将取色坐标保存到文件：{x}, {y}")
         except Exception as exc:
-            print(f"保存坐标时发生错误：{exc}")
+            self._log(f"保存坐标时发生错误：{exc}")
+
+    def apply_profile(self, profile: Profile) -> None:
+        self._state.set_xy(profile.x, profile.y)
+        self._color_detector.apply_profile(
+            profile.colors,
+            profile.sample_radius_px,
+            lut=load_or_build_lut(profile.colors, self._config.cache_dir, log=self._log),
+        )
+
+    def on_profiles_changed(self, store: ProfileStore) -> None:
+        if self._display_key is None:
+            return
+        profile = store.get(self._display_key)
+        if profile is not None:
+            self.apply_profile(profile)
+            self._log(f"配置档案已重新加载（{self._display_key}）")
+
+    def _on_calibration_key(self, key: str) -> bool:
+        colors = {"E": "黄", "W": "蓝", "A": "红"}
+        if key in colors:
+            x, y = self._state.get_xy()
+            self._calibrator.add_patch(colors[key], self._capture_calibration_patch(x, y))
+            self._log(f"校准采样 {colors[key]}：{self._calibrator.sample_counts()}")
+        elif key == "Return":
+            thresholds = self._calibrator.fit(self._color_detector.thresholds)
+            profile = replace(self._current_profile(), colors=thresholds)
+            self.apply_profile(profile)
+            if self._profile_store is not None and self._display_key is not None:
+                self._profile_store.save_profile(self._display_key, profile)
+            self._log(f"校准完成，阈值已更新：{thresholds}")
+        return True
+
+    def _capture_calibration_patch(self, x: int, y: int) -> PatchBuffer:
+        radius = self._color_detector.sample_radius_px
+        side = 2 * radius + 1
+        patch = self._calibration_patch
+        if patch is None or patch.width != side:
+            patch = self._calibration_patch = PatchBuffer(side, side)
+        patch.move_to(x - radius, y - radius)
+        with untraced():
+            self._color_detector.frame_source.grab(patch)
+        return patch
 
     def should_allow_action(self) -> bool:
         if self._state.is_paused():
             return False
         return self._window_guard.is_allowed()
 
-    def on_key_down(self, event):
+    def on_key_down(self, event, ts: Optional[float] = None):
         key = event.Key
 
+        if self._calibrator is not None:
+            return self._on_calibration_key(key)
+
         if key == "Return":
             paused_now = self._state.toggle_paused()
-            print("功能已暂停" if paused_now else "功能已恢复")
+            self._log("功能已暂停" if paused_now else "功能已恢复")
             return True
 
         if not self.should_allow_action():
@@ -74,39 +162,50 @@ class InputHandlers:
             return True
 
         if key == "E":
-            self._selector.submit("黄", open_cycle=True)
+            self._selector.submit("黄", open_cycle=True, ts=ts)
         elif key == "W":
             if getattr(event, "is_injected", False):
                 return True
-            self._selector.submit("蓝", open_cycle=False)
+            self._selector.submit("蓝", open_cycle=False, ts=ts)
         elif key == "A":
-            self._selector.submit("红", open_cycle=True)
+            self._selector.submit("红", open_cycle=True, ts=ts)
         elif key == "R":
             now = time.time()
             if self._state.try_handle_r_press(now, self._config.timing.r_double_press_gap):
-                self._selector.submit("黄", open_cycle=True)
+                self._selector.submit("黄", open_cycle=True, ts=ts)
 
         return True
 
-    def on_key_up(self, event):
+    def on_key_up(self, event, ts: Optional[float] = None):
         key = event.Key
         if key in ("Lcontrol", "Rcontrol"):
             self._state.set_ctrl_pressed(False)
         return True
 
-    def on_middle_click(self, event):
+    def on_middle_click(self, event, ts: Optional[float] = None):
         if not self.should_allow_action():
             return True
 
         x, y = event.Position[0], event.Position[1]
         self._state.set_xy(x, y)
+        if self._point_calibrator is not None:
+            self._point_calibrator.submit(x, y)
+            return True
 
         r, g, b = self._color_detector.get_rgb(x, y)
-        print("当前取色坐标：", x, y, "祝您游戏愉快")
-        print("当前颜色：", self._color_detector.get_color_name(r, g, b))
+        self._log(f"当前取色坐标： {x} {y} 祝您游戏愉快")
+        self._log(f"当前颜色： {self._color_detector.get_color_name(r, g, b)}")
         self.save_coordinates()
         return True
 
+    def on_point_report(self, report: PointReport) -> None:
+        if (report.x, report.y) != self._state.get_xy():
+            # A newer middle click moved the point while this burst was sampled.
+            return
+        self._log(f"当前取色坐标： {report.x} {report.y} 祝您游戏愉快")
+        self._log(report.format())
+        self.save_coordinates(calibration=report.to_dict())
+
     def should_suppress_key(self, key_name: str, is_injected: bool) -> bool:
         _ = (key_name, is_injected)
         return False
@@ -0,0 +1,112 @@
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional, TextIO
+
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+DROP_POLICIES = (DROP_NEWEST, DROP_OLDEST)
+
+
+class LogSink:
+    # Producers append a preformatted line to a bounded deque and return; console and file writes
+    # happen in batches on the writer thread, so a blocked console never stalls the selector.
+    def __init__(
+        self,
+        capacity: int = 4096,
+        policy: str = DROP_NEWEST,
+        stream: Optional[TextIO] = None,
+        path: str = "",
+        flush_interval: float = 0.05,
+        wall_clock: Callable[[], float] = time.time,
+    ):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"unknown drop policy: {policy}")
+        self._capacity = max(1, capacity)
+        self._drop_oldest = policy == DROP_OLDEST
+        self._stream = stream
+        self._file = open(path, "a", encoding="utf-8") if path else None
+        self._flush_interval = flush_interval
+        self._wall_clock = wall_clock
+        # With drop-oldest the deque's maxlen evicts the oldest line on append.
+        self._pending: deque = deque(maxlen=self._capacity if self._drop_oldest else None)
+        # Held only for the length check, the append and the drop counter, so producers on several
+        # threads cannot overshoot the capacity or lose a drop; never held across I/O.
+        self._queue_lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._reported_drops = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.max_batch = 0
+        self.errors = 0
+
+    def __call__(self, line: str) -> None:
+        record = (self._wall_clock(), line)
+        with self._queue_lock:
+            pending = self._pending
+            if len(pending) >= self._capacity:
+                self.dropped += 1
+                if not self._drop_oldest:
+                    return
+            pending.append(record)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._loop, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def _loop(self) -> None:
+        while not self._stop_event.wait(self._flush_interval):
+            self.flush()
+
+    def flush(self) -> int:
+        with self._io_lock:
+            with self._queue_lock:
+                records = list(self._pending)
+                self._pending.clear()
+                dropped = self.dropped - self._reported_drops
+                self._reported_drops += dropped
+            if dropped:
+                records.append((self._wall_clock(), f"[log] 日志队列已满，丢弃 {dropped} 条"))
+            if not records:
+                return 0
+            # sys.stdout is looked up per batch so redirection after startup still applies.
+            stream = self._stream or sys.stdout
+            self._write(stream, "".join(f"{line}\n" for _, line in records))
+            if self._file is not None:
+                self._write(self._file, "".join(f"{self._stamp(ts)} {line}\n" for ts, line in records))
+            self.batches += 1
+            self.written += len(records)
+            if len(records) > self.max_batch:
+                self.max_batch = len(records)
+            return len(records)
+
+    def _write(self, stream: TextIO, text: str) -> None:
+        try:
+            stream.write(text)
+            stream.flush()
+        except (OSError, ValueError):
+            self.errors += 1
+
+    @staticmethod
+    def _stamp(ts: float) -> str:
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)) + f".{int(ts * 1000) % 1000:03d}"
+
+    def close(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self.flush()
+        if self._file is not None:
+            with self._io_lock:
+                self._file.close()
+                self._file = None
+
+    def format_stats(self) -> str:
+        return (
+            f"written={self.written} batches={self.batches} max_batch={self.max_batch} "
+            f"queued={len(self._pending)} dropped={self.dropped} errors={self.errors}"
+        )
@@ -0,0 +1,322 @@
+import time
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_SUB_BUCKET_BITS = 6
+DEFAULT_MAX_EXPONENT = 20  # with 6 sub-bucket bits this covers values up to ~2^26 (67 s in microseconds)
+
+
+class LatencyHistogram:
+    # Log-linear (HDR-style) buckets: values below 2^bits are exact, larger ones keep `bits` significant bits.
+    def __init__(self, sub_bucket_bits: int = DEFAULT_SUB_BUCKET_BITS, max_exponent: int = DEFAULT_MAX_EXPONENT):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.max_exponent = max_exponent
+        self._half = 1 << (sub_bucket_bits - 1)
+        self._exact_limit = 1 << sub_bucket_bits
+        self._bucket_count = (max_exponent + 2) * self._half
+        self.counts = array("Q", bytes(8 * self._bucket_count))
+        self.count = 0
+        self.total = 0
+        self.max_value = 0
+
+    def index_for(self, value: int) -> int:
+        if value < self._exact_limit:
+            return value if value > 0 else 0
+        exponent = value.bit_length() - self.sub_bucket_bits
+        if exponent > self.max_exponent:
+            return self._bucket_count - 1
+        return exponent * self._half + (value >> exponent)
+
+    def value_at(self, index: int) -> int:
+        if index < self._exact_limit:
+            return index
+        exponent = index // self._half - 1
+        mantissa = index - exponent * self._half
+        return ((mantissa + 1) << exponent) - 1
+
+    def record(self, value: int) -> int:
+        value = int(value)
+        index = self.index_for(value)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max_value:
+            self.max_value = value
+        return index
+
+    def remove_index(self, index: int, value: int) -> None:
+        self.counts[index] -= 1
+        self.count -= 1
+        self.total -= value
+
+    def reset(self) -> None:
+        self.counts = array("Q", bytes(8 * self._bucket_count))
+        self.count = 0
+        self.total = 0
+        self.max_value = 0
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        counts = self.counts
+        for index, n in enumerate(other.counts):
+            if n:
+                counts[index] += n
+        self.count += other.count
+        self.total += other.total
+        if other.max_value > self.max_value:
+            self.max_value = other.max_value
+
+    def empty_copy(self) -> "LatencyHistogram":
+        return LatencyHistogram(self.sub_bucket_bits, self.max_exponent)
+
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def percentiles(self, fractions: Iterable[float]) -> List[Optional[int]]:
+        fractions = list(fractions)
+        if not self.count:
+            return [None] * len(fractions)
+
+        ranks = [max(1, int(self.count * f + 0.999999)) for f in fractions]
+        order = sorted(range(len(ranks)), key=ranks.__getitem__)
+        results: List[Optional[int]] = [None] * len(ranks)
+        seen = 0
+        pos = 0
+        for index, n in enumerate(self.counts):
+            if not n:
+                continue
+            seen += n
+            while pos < len(order) and ranks[order[pos]] <= seen:
+                results[order[pos]] = min(self.value_at(index), self.max_value)
+                pos += 1
+            if pos == len(order):
+                break
+        return results
+
+    def percentile(self, fraction: float) -> Optional[int]:
+        return self.percentiles((fraction,))[0]
+
+
+class LastNWindow:
+    def __init__(self, size: int, template: LatencyHistogram):
+        self.size = max(1, size)
+        self.histogram = template.empty_copy()
+        self._indexes = array("l", [-1] * self.size)
+        self._values = array("q", [0] * self.size)
+        self._pos = 0
+
+    def record(self, value: int) -> None:
+        pos = self._pos
+        old_index = self._indexes[pos]
+        if old_index >= 0:
+            self.histogram.remove_index(old_index, self._values[pos])
+        self._indexes[pos] = self.histogram.record(value)
+        self._values[pos] = int(value)
+        self._pos = (pos + 1) % self.size
+
+
+class TimeWindow:
+    def __init__(self, span_sec: float, slots: int, template: LatencyHistogram, clock: Callable[[], float]):
+        self.span_sec = span_sec
+        self._slot_sec = span_sec / slots
+        self._clock = clock
+        self._slots = [template.empty_copy() for _ in range(slots)]
+        self._slot_ids = [-1] * slots
+
+    def _slot(self, now: float) -> LatencyHistogram:
+        slot_id = int(now / self._slot_sec)
+        pos = slot_id % len(self._slots)
+        if self._slot_ids[pos] != slot_id:
+            self._slots[pos].reset()
+            self._slot_ids[pos] = slot_id
+        return self._slots[pos]
+
+    def record(self, value: int) -> None:
+        self._slot(self._clock()).record(value)
+
+    def merged(self) -> LatencyHistogram:
+        now_id = int(self._clock() / self._slot_sec)
+        oldest = now_id - len(self._slots) + 1
+        merged = self._slots[0].empty_copy()
+        for slot_id, histogram in zip(self._slot_ids, self._slots):
+            if oldest <= slot_id <= now_id:
+                merged.merge(histogram)
+        return merged
+
+
+class LatencyTracker:
+    def __init__(self, last_n: int, window_sec: float, window_slots: int, clock: Callable[[], float]):
+        self.session = LatencyHistogram()
+        self.last_n = LastNWindow(last_n, self.session)
+        self.recent = TimeWindow(window_sec, window_slots, self.session, clock)
+
+    def record(self, value_us: int) -> None:
+        self.session.record(value_us)
+        self.last_n.record(value_us)
+        self.recent.record(value_us)
+
+    def windows(self) -> Dict[str, LatencyHistogram]:
+        return {"last_n": self.last_n.histogram, "recent": self.recent.merged(), "session": self.session}
+
+
+PERCENTILES = (0.5, 0.95, 0.99)
+METRICS = ("lock", "first_match")
+
+
+def _summarize(histogram: LatencyHistogram) -> Dict[str, Optional[float]]:
+    p50, p95, p99 = histogram.percentiles(PERCENTILES)
+    mean = histogram.mean()
+
+    def ms(value):
+        return None if value is None else round(value / 1000.0, 2)
+
+    return {
+        "count": histogram.count,
+        "sum_ms": round(histogram.total / 1000.0, 3),
+        "avg_ms": ms(mean),
+        "p50_ms": ms(p50),
+        "p95_ms": ms(p95),
+        "p99_ms": ms(p99),
+        "max_ms": ms(histogram.max_value) if histogram.count else None,
+    }
+
+
+class PerfCollector:
+    def __init__(
+        self,
+        last_n: int = 200,
+        window_sec: float = 300.0,
+        window_slots: int = 5,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._clock = clock
+        self._last_n = last_n
+        self._window_sec = window_sec
+        self._window_slots = window_slots
+        self.total = 0
+        self.success = 0
+        self.failures: Dict[str, int] = {}
+        self.failures_by_color: Dict[Tuple[str, str], int] = {}
+        self._trackers: Dict[Tuple[str, str], LatencyTracker] = {}
+        self._recent_outcomes = array("b", [-1] * max(1, last_n))
+        self._recent_pos = 0
+
+    def _tracker(self, metric: str, color: str) -> LatencyTracker:
+        key = (metric, color)
+        tracker = self._trackers.get(key)
+        if tracker is None:
+            tracker = LatencyTracker(self._last_n, self._window_sec, self._window_slots, self._clock)
+            self._trackers[key] = tracker
+        return tracker
+
+    def _record_latency(self, metric: str, color: str, value_us: Optional[int]) -> None:
+        if value_us is None:
+            return
+        self._tracker(metric, "all").record(value_us)
+        self._tracker(metric, color).record(value_us)
+
+    def record(self, result: dict) -> None:
+        color = result.get("req_color") or "?"
+        self.total += 1
+        success = bool(result.get("success"))
+        if success:
+            self.success += 1
+        else:
+            reason = result.get("fail_reason") or "unknown"
+            self.failures[reason] = self.failures.get(reason, 0) + 1
+            key = (color, reason)
+            self.failures_by_color[key] = self.failures_by_color.get(key, 0) + 1
+
+        self._recent_outcomes[self._recent_pos] = 1 if success else 0
+        self._recent_pos = (self._recent_pos + 1) % len(self._recent_outcomes)
+
+        if success:
+            self._record_latency("lock", color, result.get("lock_latency_us"))
+        self._record_latency("first_match", color, result.get("first_match_latency_us"))
+
+    def recent_success_rate(self) -> Optional[float]:
+        outcomes = [o for o in self._recent_outcomes if o >= 0]
+        return sum(outcomes) / len(outcomes) if outcomes else None
+
+    def snapshot(self) -> dict:
+        latency: Dict[str, Dict[str, Dict[str, dict]]] = {}
+        for (metric, color), tracker in sorted(self._trackers.items()):
+            latency.setdefault(metric, {})[color] = {
+                name: _summarize(histogram) for name, histogram in tracker.windows().items()
+            }
+        failures_by_color: Dict[str, Dict[str, int]] = {}
+        for (color, reason), n in sorted(self.failures_by_color.items()):
+            failures_by_color.setdefault(color, {})[reason] = n
+
+        return {
+            "total": self.total,
+            "success": self.success,
+            "success_rate": self.success / self.total if self.total else None,
+            "recent_success_rate": self.recent_success_rate(),
+            "failures": dict(self.failures),
+            "failures_by_color": failures_by_color,
+            "latency": latency,
+        }
+
+    def format_report(self) -> str:
+        snap = self.snapshot()
+        lines = [
+            "[perf] total={total} success_rate={rate:.1f}% recent_success_rate={recent} failures={failures}".format(
+                total=snap["total"],
+                rate=(snap["success_rate"] or 0.0) * 100.0,
+                recent="n/a" if snap["recent_success_rate"] is None else f"{snap['recent_success_rate'] * 100:.1f}%",
+                failures=snap["failures"],
+            )
+        ]
+        for metric in METRICS:
+            for color, windows in snap["latency"].get(metric, {}).items():
+                parts = []
+                for name in ("last_n", "recent", "session"):
+                    s = windows[name]
+                    parts.append(f"{name}(n={s['count']} avg={s['avg_ms']} p50={s['p50_ms']} p95={s['p95_ms']} p99={s['p99_ms']})")
+                lines.append(f"[perf] {metric}[{color}] ms " + " ".join(parts))
+        return "\n".join(lines)
+
+
+STAGES = ("state", "window", "detect", "capture", "classify", "confirm_gap", "click", "wait")
+
+
+class StageTimers:
+    # Per-stage microsecond histograms for the poll loop; callers chain `t = timers.record(stage, t)`.
+    # Producers hold None instead of an instance when disabled, so the off path is a single `is None` test.
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.histograms: Dict[str, LatencyHistogram] = {stage: LatencyHistogram() for stage in STAGES}
+        self.draws = 0
+        self.draw_seconds = 0.0
+
+    def record(self, stage: str, start: float) -> float:
+        now = self.clock()
+        self.histograms[stage].record(round((now - start) * 1_000_000))
+        return now
+
+    def end_draw(self, seconds: float) -> None:
+        self.draws += 1
+        self.draw_seconds += seconds
+
+    @property
+    def polls(self) -> int:
+        return self.histograms["detect"].count
+
+    def polls_per_draw(self) -> Optional[float]:
+        return self.polls / self.draws if self.draws else None
+
+    def poll_rate_hz(self) -> Optional[float]:
+        return self.polls / self.draw_seconds if self.draw_seconds > 0 else None
+
+    def format_stats(self) -> str:
+        parts = []
+        for stage, histogram in self.histograms.items():
+            if not histogram.count:
+                continue
+            p50, p99 = histogram.percentiles((0.5, 0.99))
+            parts.append(f"{stage}(n={histogram.count} p50={p50}us p99={p99}us)")
+        per_draw = self.polls_per_draw()
+        rate = self.poll_rate_hz()
+        parts.append(f"polls_per_draw={'n/a' if per_draw is None else f'{per_draw:.1f}'}")
+        parts.append(f"poll_rate={'n/a' if rate is None else f'{rate:.0f}Hz'}")
+        return " ".join(parts)
@@ -0,0 +1,140 @@
+import math
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from app.color_lut import CARD_COLORS
+
+
+@dataclass(frozen=True)
+class PhasePrediction:
+    expected_start_ts: float
+    window_start_ts: float
+    window_end_ts: float
+    steps: int
+    confidence: float
+
+
+class CardPhaseTracker:
+    def __init__(
+        self,
+        initial_period: float = 0.16,
+        smoothing: float = 0.2,
+        min_samples: int = 3,
+        max_sample_gap: float = 0.0125,
+        colors: Tuple[str, ...] = CARD_COLORS,
+    ):
+        self._colors = colors
+        self._smoothing = smoothing
+        self._min_samples = max(1, min_samples)
+        self._max_sample_gap = max_sample_gap
+        self._period = initial_period
+        self._variance = (initial_period * 0.25) ** 2
+        self._samples = 0
+        self._transitions: Dict[str, Dict[str, int]] = {color: {} for color in colors}
+        self._current: Optional[str] = None
+        self._current_entry_ts = 0.0
+        self._entry_uncertainty = 0.0
+        self._entry_observed = False
+        self._last_observation_ts: Optional[float] = None
+
+    @property
+    def period(self) -> float:
+        return self._period
+
+    @property
+    def period_std(self) -> float:
+        return math.sqrt(self._variance)
+
+    @property
+    def sample_count(self) -> int:
+        return self._samples
+
+    @property
+    def current_color(self) -> Optional[str]:
+        return self._current
+
+    def begin_cycle(self, ts: float) -> None:
+        # Learned period/order survive across draws; only the in-progress segment is reset.
+        self._current = None
+        self._entry_observed = False
+        self._last_observation_ts = ts
+
+    def observe(self, ts: float, color: Optional[str]) -> None:
+        gap = ts - self._last_observation_ts if self._last_observation_ts is not None else 0.0
+        self._last_observation_ts = ts
+        if color is None or color == self._current:
+            return
+
+        previous = self._current
+        if previous is not None:
+            row = self._transitions.setdefault(previous, {})
+            row[color] = row.get(color, 0) + 1
+            # Sparse polls blur the transition time, so only densely bracketed segments train the period.
+            if self._entry_observed and self._entry_uncertainty <= self._max_sample_gap and gap <= self._max_sample_gap:
+                self._record_dwell(ts - self._current_entry_ts)
+
+        self._entry_observed = previous is not None
+        self._current = color
+        self._current_entry_ts = ts
+        self._entry_uncertainty = gap
+
+    def _record_dwell(self, dwell: float) -> None:
+        if self._samples >= self._min_samples and not (0.5 * self._period <= dwell <= 2.0 * self._period):
+            return
+        if self._samples == 0:
+            self._period = dwell
+        else:
+            alpha = self._smoothing
+            delta = dwell - self._period
+            self._period += alpha * delta
+            self._variance = (1 - alpha) * (self._variance + alpha * delta * delta)
+        self._samples += 1
+
+    def next_color(self, color: str) -> Tuple[Optional[str], float]:
+        row = self._transitions.get(color)
+        if not row:
+            return None, 0.0
+        total = sum(row.values())
+        best = max(row, key=row.__getitem__)
+        return best, row[best] / total
+
+    def confidence(self) -> float:
+        if self._samples < self._min_samples:
+            return 0.0
+        warmup = self._samples / (self._samples + self._min_samples)
+        stability = max(0.0, 1.0 - 2.0 * self.period_std / self._period)
+        return warmup * stability
+
+    def predict(self, target: str, now: float) -> Optional[PhasePrediction]:
+        if self._current is None or self._samples < self._min_samples:
+            return None
+
+        steps = 0
+        order_confidence = 1.0
+        color = self._current
+        while color != target:
+            color, probability = self.next_color(color)
+            steps += 1
+            if color is None or steps > len(self._colors):
+                return None
+            order_confidence *= probability
+        if steps == 0 and not self._entry_observed:
+            # The target was seen before any transition this cycle: that first colour may be a blended or
+            # noisy frame rather than the card itself, so its "window" would be a guess centred on noise.
+            return None
+
+        period = self._period
+        expected_start = self._current_entry_ts + steps * period
+        # Missed transitions (e.g. a long stall) push the estimate forward by whole periods.
+        cycle = period * len(self._colors)
+        while expected_start + period < now:
+            expected_start += cycle
+
+        margin = 2.0 * self.period_std * math.sqrt(max(1, steps)) + self._entry_uncertainty
+        return PhasePrediction(
+            expected_start_ts=expected_start,
+            window_start_ts=expected_start - margin,
+            window_end_ts=expected_start + period + margin,
+            steps=steps,
+            confidence=self.confidence() * order_confidence,
+        )
@@ -0,0 +1,167 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.capture import PatchBuffer
+from app.color_detector import ColorDetector
+from app.color_lut import TARGET_BITS
+from app.config import TimingConfig
+from app.trace import untraced
+
+
+@dataclass(frozen=True)
+class PointReport:
+    x: int
+    y: int
+    frames: int
+    hit_ratios: Dict[str, float]
+    dominant: Optional[str]
+    center_ratio: float
+    best: Tuple[int, int]
+    best_ratio: float
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "x": self.x,
+            "y": self.y,
+            "frames": self.frames,
+            "hit_ratios": {color: round(ratio, 4) for color, ratio in self.hit_ratios.items()},
+            "dominant": self.dominant,
+            "center_ratio": round(self.center_ratio, 4),
+            "best_x": self.best[0],
+            "best_y": self.best[1],
+            "best_ratio": round(self.best_ratio, 4),
+        }
+
+    def format(self) -> str:
+        ratios = " ".join(f"{color} {ratio * 100:.0f}%" for color, ratio in self.hit_ratios.items())
+        text = f"取色校准 ({self.x}, {self.y}) {self.frames} 帧：{ratios}"
+        if self.dominant is None:
+            return f"{text}；附近没有识别到卡牌颜色"
+        return (
+            f"{text}；{self.dominant} 在当前点命中率 {self.center_ratio * 100:.0f}%，"
+            f"建议取色点 {self.best} 命中率 {self.best_ratio * 100:.0f}%"
+        )
+
+
+def analyze_burst(
+    frames: List[List[int]], side: int, x: int, y: int, sample_radius: int
+) -> PointReport:
+    # frames holds one classification mask per pixel of a side x side patch centred on (x, y).
+    count = len(frames)
+    pixels = side * side
+    hit_ratios = {}
+    per_pixel: Dict[str, List[int]] = {}
+    for color, bit in TARGET_BITS.items():
+        hits = [0] * pixels
+        for masks in frames:
+            for i, mask in enumerate(masks):
+                if mask & bit:
+                    hits[i] += 1
+        per_pixel[color] = hits
+        hit_ratios[color] = sum(hits) / (pixels * count) if count else 0.0
+
+    dominant = max(hit_ratios, key=hit_ratios.__getitem__)
+    if hit_ratios[dominant] <= 0.0:
+        return PointReport(x, y, count, hit_ratios, None, 0.0, (x, y), 0.0)
+
+    hits = per_pixel[dominant]
+    radius = side // 2
+    r = min(sample_radius, radius)
+    window = (2 * r + 1) ** 2 * count
+
+    def window_ratio(dx: int, dy: int) -> float:
+        total = 0
+        for wy in range(dy - r, dy + r + 1):
+            row = (wy + radius) * side
+            for wx in range(dx - r, dx + r + 1):
+                total += hits[row + wx + radius]
+        return total / window
+
+    center_ratio = window_ratio(0, 0)
+    best = (0, 0)
+    best_ratio = center_ratio
+    span = radius - r
+    for dy in range(-span, span + 1):
+        for dx in range(-span, span + 1):
+            ratio = window_ratio(dx, dy)
+            # Prefer the most stable window; among equals, the one closest to where the user clicked.
+            if ratio > best_ratio or (ratio == best_ratio and dx * dx + dy * dy < best[0] ** 2 + best[1] ** 2):
+                best = (dx, dy)
+                best_ratio = ratio
+    return PointReport(x, y, count, hit_ratios, dominant, center_ratio, (x + best[0], y + best[1]), best_ratio)
+
+
+class PointCalibrator:
+    # Samples a burst of frames around a clicked point on its own thread; a newer click supersedes a pending one.
+    def __init__(
+        self,
+        color_detector: ColorDetector,
+        on_report: Callable[[PointReport], None],
+        frames: int = 8,
+        frame_interval: float = 0.016,
+        radius: int = 6,
+        sleep: Callable[[float], object] = time.sleep,
+    ):
+        self._color_detector = color_detector
+        self._on_report = on_report
+        self._frames = max(1, frames)
+        self._frame_interval = frame_interval
+        self._radius = max(0, radius)
+        self._sleep = sleep
+        side = 2 * self._radius + 1
+        self._patch = PatchBuffer(side, side)
+        self._lock = threading.Lock()
+        self._pending: Optional[Tuple[int, int]] = None
+        self._event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_timing(cls, timing: TimingConfig, color_detector: ColorDetector, on_report, **kwargs) -> "PointCalibrator":
+        return cls(
+            color_detector,
+            on_report,
+            frames=timing.calibration_frames,
+            frame_interval=timing.calibration_frame_interval,
+            radius=timing.calibration_radius_px,
+            **kwargs,
+        )
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._loop, name="point-calibration", daemon=True)
+        self._thread.start()
+
+    def submit(self, x: int, y: int) -> None:
+        with self._lock:
+            self._pending = (x, y)
+        self._event.set()
+
+    def _loop(self) -> None:
+        while True:
+            self._event.wait()
+            self.run_pending()
+
+    def run_pending(self) -> Optional[PointReport]:
+        self._event.clear()
+        with self._lock:
+            point = self._pending
+            self._pending = None
+        if point is None:
+            return None
+        report = self.sample(*point)
+        self._on_report(report)
+        return report
+
+    def sample(self, x: int, y: int) -> PointReport:
+        detector = self._color_detector
+        patch = self._patch
+        patch.move_to(x - self._radius, y - self._radius)
+        frames = []
+        for i in range(self._frames):
+            if i:
+                self._sleep(self._frame_interval)
+            with untraced():
+                detector.frame_source.grab(patch)
+            frames.append(detector.pixel_masks(patch.data))
+        return analyze_burst(frames, patch.width, x, y, detector.sample_radius_px)
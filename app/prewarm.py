@@ -0,0 +1,41 @@
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from app.color_detector import ColorDetector
+from app.injection import W_SCANCODE, KeyInjector
+from app.window_guard import WindowGuard
+
+Step = Tuple[str, Callable[[], object]]
+
+
+def pipeline_steps(
+    color_detector: ColorDetector, window_guard: WindowGuard, injector: KeyInjector, x: int, y: int
+) -> List[Step]:
+    # Everything the first draw would otherwise create lazily: the process-name lookup (and psutil),
+    # the calling thread's screen DC and DIB sections, and the SendInput packet.
+    return [
+        ("focus", window_guard.prewarm),
+        ("capture", lambda: color_detector.prewarm(x, y)),
+        ("inject", lambda: injector.prewarm(W_SCANCODE)),
+    ]
+
+
+def run_prewarm(
+    steps: Sequence[Step],
+    clock: Callable[[], float] = time.perf_counter,
+    log: Callable[[str], None] = print,
+) -> Dict[str, float]:
+    timings = {}
+    for name, step in steps:
+        start = clock()
+        try:
+            step()
+        except Exception as exc:
+            # A failed warm-up only means the first draw pays for it.
+            log(f"预热 {name} 失败：{exc}")
+        timings[name] = (clock() - start) * 1000
+    return timings
+
+
+def format_prewarm(timings: Dict[str, float]) -> str:
+    return " ".join(f"{name}={ms:.1f}ms" for name, ms in timings.items())
@@ -0,0 +1,120 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Set, Tuple
+
+CacheKey = Tuple[int, float]
+
+
+class ProcessNameCache:
+    # Keyed by (pid, create_time): a pid reused by a new process gets a new key and never sees the old name.
+    # Hits come straight from the pid index without opening the process, but only for a window handle
+    # already seen with that entry: a reused pid arrives with the new process's window, so its first
+    # lookup rechecks create_time. Lookups without a handle, and entries older than max_age, are
+    # revalidated the same way.
+    def __init__(
+        self,
+        capacity: int = 64,
+        psutil_module=None,
+        max_age: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        # psutil is imported on the first miss so a headless window guard can be built without it.
+        self._psutil = psutil_module
+        self._capacity = max(1, capacity)
+        self._max_age = max_age
+        self._clock = clock
+        self._entries: "OrderedDict[CacheKey, str]" = OrderedDict()
+        self._key_by_pid: Dict[int, CacheKey] = {}
+        self._checked_at: Dict[int, float] = {}
+        self._windows: Dict[int, Set[int]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revalidated = 0
+        self.reused = 0
+        self.exited = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, pid: int, hwnd: Optional[int] = None) -> str:
+        key = self._key_by_pid.get(pid)
+        if (
+            key is not None
+            and hwnd is not None
+            and hwnd in self._windows[pid]
+            and self._clock() - self._checked_at[pid] < self._max_age
+        ):
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        return self._resolve(pid, key, hwnd)
+
+    def _resolve(self, pid: int, key: Optional[CacheKey], hwnd: Optional[int]) -> str:
+        if self._psutil is None:
+            import psutil
+
+            self._psutil = psutil
+        try:
+            process = self._psutil.Process(pid)
+            create_time = process.create_time()
+        except self._psutil.Error:
+            if key is not None:
+                self.exited += 1
+                self.forget(pid)
+            self.misses += 1
+            return ""
+
+        now = self._clock()
+        if key is not None:
+            if key[1] == create_time:
+                self._checked_at[pid] = now
+                if hwnd is not None:
+                    self._windows[pid].add(hwnd)
+                self._entries.move_to_end(key)
+                self.revalidated += 1
+                self.hits += 1
+                return self._entries[key]
+            self.reused += 1
+            self.forget(pid)
+
+        self.misses += 1
+        try:
+            name = process.name()
+        except self._psutil.Error:
+            # Nothing is cached, so the next lookup opens the process again and rechecks create_time.
+            return ""
+        self._insert((pid, create_time), name, now, hwnd)
+        return name
+
+    def _insert(self, key: CacheKey, name: str, now: float, hwnd: Optional[int]) -> None:
+        self._entries[key] = name
+        self._key_by_pid[key[0]] = key
+        self._checked_at[key[0]] = now
+        self._windows[key[0]] = set() if hwnd is None else {hwnd}
+        while len(self._entries) > self._capacity:
+            (old_pid, _), _ = self._entries.popitem(last=False)
+            del self._key_by_pid[old_pid]
+            del self._checked_at[old_pid]
+            del self._windows[old_pid]
+            self.evictions += 1
+
+    def forget(self, pid: int) -> None:
+        key = self._key_by_pid.pop(pid, None)
+        if key is not None:
+            del self._entries[key]
+            del self._checked_at[pid]
+            del self._windows[pid]
+
+    def hit_rate(self) -> Optional[float]:
+        total = self.hits + self.misses
+        return self.hits / total if total else None
+
+    def format_stats(self) -> str:
+        rate = self.hit_rate()
+        return (
+            f"hits={self.hits} misses={self.misses} "
+            f"hit_rate={'n/a' if rate is None else f'{rate * 100:.1f}%'} "
+            f"size={len(self._entries)} evictions={self.evictions} revalidated={self.revalidated} "
+            f"reused={self.reused} exited={self.exited}"
+        )
@@ -0,0 +1,304 @@
+import json
+import os
+import threading
+from ctypes import Structure, byref, c_void_p, sizeof, wintypes
+from dataclasses import asdict, dataclass, field, fields, replace
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.capture import BYTES_PER_PIXEL, PatchBuffer
+from app.config import ColorThresholds
+
+PROFILE_FORMAT_VERSION = 1
+MONITOR_DEFAULTTOPRIMARY = 1
+MONITOR_DEFAULTTONEAREST = 2
+MONITORINFOF_PRIMARY = 1
+MDT_EFFECTIVE_DPI = 0
+
+RGB = Tuple[int, int, int]
+
+
+@dataclass(frozen=True)
+class DisplayKey:
+    width: int
+    height: int
+    scale_percent: int = 100
+    monitor: str = "0"
+
+    def __str__(self) -> str:
+        return f"{self.width}x{self.height}@{self.scale_percent}%#{self.monitor}"
+
+
+@dataclass(frozen=True)
+class Profile:
+    x: int
+    y: int
+    sample_radius_px: int = 1
+    colors: ColorThresholds = field(default_factory=ColorThresholds)
+    tuning: Optional[Dict[str, float]] = None
+    calibration: Optional[Dict[str, object]] = None
+
+    def to_dict(self) -> dict:
+        data = {
+            "x": self.x,
+            "y": self.y,
+            "sample_radius_px": self.sample_radius_px,
+            "colors": asdict(self.colors),
+        }
+        if self.tuning is not None:
+            data["tuning"] = dict(self.tuning)
+        if self.calibration is not None:
+            data["calibration"] = dict(self.calibration)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Profile":
+        known = {f.name for f in fields(ColorThresholds)}
+        colors = ColorThresholds(**{k: int(v) for k, v in data.get("colors", {}).items() if k in known})
+        return cls(
+            x=int(data["x"]),
+            y=int(data["y"]),
+            sample_radius_px=int(data.get("sample_radius_px", 1)),
+            colors=colors,
+            tuning=data.get("tuning"),
+            calibration=data.get("calibration"),
+        )
+
+
+class _MonitorInfoEx(Structure):
+    _fields_ = [
+        ("cbSize", wintypes.DWORD),
+        ("rcMonitor", wintypes.RECT),
+        ("rcWork", wintypes.RECT),
+        ("dwFlags", wintypes.DWORD),
+        ("szDevice", wintypes.WCHAR * 32),
+    ]
+
+
+def _load_display_api():
+    from ctypes import windll
+
+    user32 = windll.user32
+    # Monitor and window handles are pointer-sized; without argtypes ctypes would truncate them to C int.
+    for name, restype, argtypes in (
+        ("MonitorFromWindow", c_void_p, (wintypes.HWND, wintypes.DWORD)),
+        ("MonitorFromPoint", c_void_p, (wintypes.POINT, wintypes.DWORD)),
+        ("GetMonitorInfoW", wintypes.BOOL, (c_void_p, c_void_p)),
+    ):
+        function = getattr(user32, name)
+        function.restype = restype
+        function.argtypes = argtypes
+    try:
+        shcore = windll.shcore
+        shcore.GetDpiForMonitor.restype = wintypes.LONG
+        shcore.GetDpiForMonitor.argtypes = (c_void_p, wintypes.UINT, c_void_p, c_void_p)
+    except (OSError, AttributeError):
+        shcore = None
+    return user32, shcore
+
+
+def detect_display_key(hwnd=None, user32=None, shcore=None) -> DisplayKey:
+    # Keyed by the monitor holding the game window (the primary one while the game is not running),
+    # so a second screen with another resolution or scale keeps its own coordinates and thresholds.
+    if user32 is None:
+        try:
+            user32, shcore = _load_display_api()
+        except ImportError:
+            return DisplayKey(0, 0, 100, "default")
+
+    if hwnd:
+        monitor = user32.MonitorFromWindow(hwnd, MONITOR_DEFAULTTONEAREST)
+    else:
+        monitor = user32.MonitorFromPoint(wintypes.POINT(0, 0), MONITOR_DEFAULTTOPRIMARY)
+    info = _MonitorInfoEx()
+    info.cbSize = sizeof(info)
+    if not monitor or not user32.GetMonitorInfoW(monitor, byref(info)):
+        return DisplayKey(user32.GetSystemMetrics(0), user32.GetSystemMetrics(1), _system_scale(user32), "0")
+
+    rect = info.rcMonitor
+    scale = None
+    if shcore is not None:
+        dpi_x = wintypes.UINT()
+        dpi_y = wintypes.UINT()
+        if shcore.GetDpiForMonitor(monitor, MDT_EFFECTIVE_DPI, byref(dpi_x), byref(dpi_y)) == 0:
+            scale = round(dpi_x.value * 100 / 96)
+    if scale is None:
+        scale = _system_scale(user32)
+    # Profiles saved before per-monitor keys used "0" for the primary monitor.
+    name = "0" if info.dwFlags & MONITORINFOF_PRIMARY else info.szDevice.lstrip("\\.")
+    return DisplayKey(rect.right - rect.left, rect.bottom - rect.top, scale, name)
+
+
+def _system_scale(user32) -> int:
+    try:
+        return round(user32.GetDpiForSystem() * 100 / 96)
+    except Exception:
+        return 100
+
+
+def _atomic_write_json(path: str, payload: dict) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+class ProfileStore:
+    def __init__(self, path: str, log: Callable[[str], None] = print):
+        self._path = path
+        self._log = log
+        self._lock = threading.Lock()
+        self._profiles: Dict[str, Profile] = {}
+        self._mtime_ns: Optional[int] = None
+        # str(key) -> (key, default, merged changes) waiting for the watcher thread to write them.
+        self._pending: Dict[str, Tuple[DisplayKey, Profile, dict]] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def load(self) -> bool:
+        try:
+            stat = os.stat(self._path)
+            with open(self._path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            profiles = {key: Profile.from_dict(value) for key, value in payload.get("profiles", {}).items()}
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            self._log(f"加载配置档案失败：{exc}，保留当前配置")
+            return False
+
+        # Swap the whole mapping at once so readers never see a half-loaded file.
+        with self._lock:
+            self._profiles = profiles
+            self._mtime_ns = stat.st_mtime_ns
+        return True
+
+    def get(self, key: DisplayKey) -> Optional[Profile]:
+        return self._profiles.get(str(key))
+
+    def keys(self) -> List[str]:
+        return sorted(self._profiles)
+
+    def save_profile(self, key: DisplayKey, profile: Profile) -> None:
+        with self._lock:
+            profiles = dict(self._profiles)
+            profiles[str(key)] = profile
+            payload = {
+                "version": PROFILE_FORMAT_VERSION,
+                "profiles": {name: value.to_dict() for name, value in sorted(profiles.items())},
+            }
+            _atomic_write_json(self._path, payload)
+            self._profiles = profiles
+            self._mtime_ns = os.stat(self._path).st_mtime_ns
+
+    def update_profile(self, key: DisplayKey, default: Profile, **changes) -> Profile:
+        profile = replace(self.get(key) or default, **changes)
+        self.save_profile(key, profile)
+        return profile
+
+    def schedule_update(self, key: DisplayKey, default: Profile, **changes) -> None:
+        # For callers on latency-sensitive threads: the write happens on the watcher's next tick (or in
+        # stop), and repeated updates in between collapse into one.
+        with self._lock:
+            _, _, pending = self._pending.get(str(key), (key, default, {}))
+            self._pending[str(key)] = (key, default, {**pending, **changes})
+
+    def flush_pending(self) -> int:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for key, default, changes in pending.values():
+            try:
+                self.update_profile(key, default, **changes)
+            except OSError as exc:
+                self._log(f"保存配置档案失败：{exc}")
+        return len(pending)
+
+    def reload_if_changed(self) -> bool:
+        try:
+            mtime_ns = os.stat(self._path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime_ns == self._mtime_ns:
+            return False
+        return self.load()
+
+    def start_watching(self, on_change: Callable[["ProfileStore"], None], interval: float = 1.0) -> None:
+        def loop():
+            while not self._stop_event.wait(interval):
+                self.flush_pending()
+                if self.reload_if_changed():
+                    on_change(self)
+
+        self._thread = threading.Thread(target=loop, name="profile-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=0.5)
+        self.flush_pending()
+
+
+def patch_pixels(patch: PatchBuffer) -> List[RGB]:
+    data = patch.data
+    return [(data[i + 2], data[i + 1], data[i]) for i in range(0, len(data), BYTES_PER_PIXEL)]
+
+
+def _quantile(values: List[int], fraction: float) -> int:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round((len(ordered) - 1) * fraction))))]
+
+
+def _clamp(value: int) -> int:
+    return max(0, min(255, value))
+
+
+class ThresholdCalibrator:
+    def __init__(self, margin: int = 12, trim: float = 0.02):
+        self._margin = margin
+        self._trim = trim
+        self._samples: Dict[str, List[RGB]] = {}
+
+    def add_pixels(self, color: str, pixels: Iterable[RGB]) -> None:
+        self._samples.setdefault(color, []).extend(pixels)
+
+    def add_patch(self, color: str, patch: PatchBuffer) -> None:
+        self.add_pixels(color, patch_pixels(patch))
+
+    def sample_counts(self) -> Dict[str, int]:
+        return {color: len(pixels) for color, pixels in self._samples.items()}
+
+    def fit(self, base: Optional[ColorThresholds] = None) -> ColorThresholds:
+        thresholds = base or ColorThresholds()
+        lo = self._trim
+        hi = 1.0 - self._trim
+        m = self._margin
+        changes = {}
+
+        def channel(color: str, index: int) -> List[int]:
+            return [pixel[index] for pixel in self._samples[color]]
+
+        if self._samples.get("黄"):
+            changes.update(
+                yellow_min_r=_clamp(_quantile(channel("黄", 0), lo) - m),
+                yellow_min_g=_clamp(_quantile(channel("黄", 1), lo) - m),
+                yellow_max_b=_clamp(_quantile(channel("黄", 2), hi) + m),
+            )
+        if self._samples.get("蓝"):
+            changes.update(
+                blue_max_r=_clamp(_quantile(channel("蓝", 0), hi) + m),
+                blue_max_g=_clamp(_quantile(channel("蓝", 1), hi) + m),
+                blue_min_b=_clamp(_quantile(channel("蓝", 2), lo) - m),
+            )
+        if self._samples.get("红"):
+            changes.update(
+                red_min_r=_clamp(_quantile(channel("红", 0), lo) - m),
+                red_max_g=_clamp(_quantile(channel("红", 1), hi) + m),
+                red_max_b=_clamp(_quantile(channel("红", 2), hi) + m),
+            )
+        return replace(thresholds, **changes)
@@ -0,0 +1,340 @@
+import os
+import sys
+import threading
+import time
+from ctypes import ArgumentError
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.config import AppConfig
+
+
+class PriorityApi:
+    process_levels: Dict[str, int] = {}
+    thread_levels: Dict[str, int] = {}
+
+    def process_priority(self) -> int:
+        raise NotImplementedError
+
+    def set_process_priority(self, value: int) -> None:
+        raise NotImplementedError
+
+    def thread_priority(self, thread_id: int) -> int:
+        raise NotImplementedError
+
+    def set_thread_priority(self, thread_id: int, value: int) -> None:
+        raise NotImplementedError
+
+    def set_thread_affinity(self, thread_id: int, cpus: Tuple[int, ...]) -> Tuple[int, ...]:
+        # Returns the previous affinity so it can be restored.
+        raise NotImplementedError
+
+    def begin_timer_resolution(self, ms: int) -> bool:
+        return False
+
+    def end_timer_resolution(self, ms: int) -> None:
+        pass
+
+    def cpu_count(self) -> int:
+        return os.cpu_count() or 1
+
+    def close(self) -> None:
+        pass
+
+
+class WindowsPriorityApi(PriorityApi):
+    process_levels = {"normal": 0x20, "above_normal": 0x8000, "high": 0x80}
+    thread_levels = {"normal": 0, "above_normal": 1, "highest": 2, "time_critical": 15}
+
+    THREAD_SET_INFORMATION = 0x0020
+    THREAD_QUERY_INFORMATION = 0x0040
+    THREAD_PRIORITY_ERROR_RETURN = 0x7FFFFFFF
+
+    def __init__(self, kernel32=None, winmm=None):
+        import ctypes
+        from ctypes import wintypes
+
+        if kernel32 is None or winmm is None:
+            from ctypes import windll
+
+            kernel32 = kernel32 or windll.kernel32
+            winmm = winmm or windll.winmm
+        self._ctypes = ctypes
+        self._kernel32 = kernel32
+        self._winmm = winmm
+        # Without argtypes ctypes passes ints as C int, and the 64-bit pseudo-handle from
+        # GetCurrentProcess raises ArgumentError instead of reaching the call.
+        for name, restype, argtypes in (
+            ("GetCurrentProcess", wintypes.HANDLE, ()),
+            ("OpenThread", wintypes.HANDLE, (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)),
+            ("CloseHandle", wintypes.BOOL, (wintypes.HANDLE,)),
+            ("GetPriorityClass", wintypes.DWORD, (wintypes.HANDLE,)),
+            ("SetPriorityClass", wintypes.BOOL, (wintypes.HANDLE, wintypes.DWORD)),
+            ("GetThreadPriority", ctypes.c_int, (wintypes.HANDLE,)),
+            ("SetThreadPriority", wintypes.BOOL, (wintypes.HANDLE, ctypes.c_int)),
+            ("SetThreadAffinityMask", ctypes.c_size_t, (wintypes.HANDLE, ctypes.c_size_t)),
+        ):
+            function = getattr(kernel32, name)
+            function.restype = restype
+            function.argtypes = argtypes
+        for name in ("timeBeginPeriod", "timeEndPeriod"):
+            function = getattr(winmm, name)
+            function.restype = wintypes.UINT
+            function.argtypes = (wintypes.UINT,)
+        # Real handles stay valid from any thread, so settings can be restored from the exit handler;
+        # close() releases them once the restore is done.
+        self._handles: Dict[int, int] = {}
+
+    def _thread_handle(self, thread_id: int):
+        handle = self._handles.get(thread_id)
+        if handle is None:
+            access = self.THREAD_SET_INFORMATION | self.THREAD_QUERY_INFORMATION
+            handle = self._kernel32.OpenThread(access, False, thread_id)
+            if not handle:
+                raise OSError(f"OpenThread({thread_id}) failed: {self._ctypes.GetLastError()}")
+            self._handles[thread_id] = handle
+        return handle
+
+    def process_priority(self) -> int:
+        value = self._kernel32.GetPriorityClass(self._kernel32.GetCurrentProcess())
+        if not value:
+            raise OSError(f"GetPriorityClass failed: {self._ctypes.GetLastError()}")
+        return value
+
+    def set_process_priority(self, value: int) -> None:
+        if not self._kernel32.SetPriorityClass(self._kernel32.GetCurrentProcess(), value):
+            raise OSError(f"SetPriorityClass failed: {self._ctypes.GetLastError()}")
+
+    def thread_priority(self, thread_id: int) -> int:
+        value = self._kernel32.GetThreadPriority(self._thread_handle(thread_id))
+        if value == self.THREAD_PRIORITY_ERROR_RETURN:
+            raise OSError(f"GetThreadPriority failed: {self._ctypes.GetLastError()}")
+        return value
+
+    def set_thread_priority(self, thread_id: int, value: int) -> None:
+        if not self._kernel32.SetThreadPriority(self._thread_handle(thread_id), value):
+            raise OSError(f"SetThreadPriority failed: {self._ctypes.GetLastError()}")
+
+    def set_thread_affinity(self, thread_id: int, cpus: Tuple[int, ...]) -> Tuple[int, ...]:
+        mask = 0
+        for cpu in cpus:
+            mask |= 1 << cpu
+        previous = self._kernel32.SetThreadAffinityMask(self._thread_handle(thread_id), mask)
+        if not previous:
+            raise OSError(f"SetThreadAffinityMask failed: {self._ctypes.GetLastError()}")
+        return tuple(cpu for cpu in range(previous.bit_length()) if previous >> cpu & 1)
+
+    def begin_timer_resolution(self, ms: int) -> bool:
+        return self._winmm.timeBeginPeriod(ms) == 0
+
+    def end_timer_resolution(self, ms: int) -> None:
+        self._winmm.timeEndPeriod(ms)
+
+    def close(self) -> None:
+        while self._handles:
+            _thread_id, handle = self._handles.popitem()
+            self._kernel32.CloseHandle(handle)
+
+
+class PosixPriorityApi(PriorityApi):
+    # Nice values; on Linux they are per thread, so PRIO_PROCESS with a native thread id targets that thread.
+    process_levels = {"normal": 0, "above_normal": -5, "high": -10}
+    thread_levels = {"normal": 0, "above_normal": -5, "highest": -10, "time_critical": -15}
+
+    def process_priority(self) -> int:
+        return os.getpriority(os.PRIO_PROCESS, os.getpid())
+
+    def set_process_priority(self, value: int) -> None:
+        os.setpriority(os.PRIO_PROCESS, os.getpid(), value)
+
+    def thread_priority(self, thread_id: int) -> int:
+        return os.getpriority(os.PRIO_PROCESS, thread_id)
+
+    def set_thread_priority(self, thread_id: int, value: int) -> None:
+        os.setpriority(os.PRIO_PROCESS, thread_id, value)
+
+    def set_thread_affinity(self, thread_id: int, cpus: Tuple[int, ...]) -> Tuple[int, ...]:
+        if not hasattr(os, "sched_setaffinity"):
+            raise OSError("thread affinity is not supported on this platform")
+        previous = tuple(sorted(os.sched_getaffinity(thread_id)))
+        os.sched_setaffinity(thread_id, cpus)
+        return previous
+
+    def cpu_count(self) -> int:
+        if hasattr(os, "sched_getaffinity"):
+            return max(os.sched_getaffinity(0)) + 1
+        return super().cpu_count()
+
+
+def default_priority_api() -> PriorityApi:
+    if sys.platform == "win32":
+        return WindowsPriorityApi()
+    return PosixPriorityApi()
+
+
+@dataclass
+class StallStats:
+    samples: int = 0
+    stalls: int = 0
+    duration: float = 0.0
+    max_overshoot: float = 0.0
+
+    def stalls_per_second(self) -> float:
+        return self.stalls / self.duration if self.duration > 0 else 0.0
+
+    def format(self) -> str:
+        return (
+            f"stalls={self.stalls}/{self.samples} ({self.stalls_per_second():.1f}/s) "
+            f"max_overshoot={self.max_overshoot * 1000:.2f}ms"
+        )
+
+
+def measure_stalls(
+    duration: float,
+    interval: float = 0.001,
+    threshold: float = 0.002,
+    clock: Callable[[], float] = time.perf_counter,
+    sleep: Callable[[float], None] = time.sleep,
+) -> StallStats:
+    # A stall is a short sleep that overshoots by more than the threshold: the thread was not rescheduled in time.
+    stats = StallStats()
+    start = clock()
+    end = start + duration
+    now = start
+    while now < end:
+        sleep(interval)
+        after = clock()
+        overshoot = after - now - interval
+        stats.samples += 1
+        if overshoot > threshold:
+            stats.stalls += 1
+        stats.max_overshoot = max(stats.max_overshoot, overshoot)
+        now = after
+    stats.duration = now - start
+    return stats
+
+
+class RealtimeMode:
+    def __init__(
+        self,
+        api: Optional[PriorityApi] = None,
+        process_priority: str = "high",
+        thread_priority: str = "highest",
+        cpu: int = -1,
+        timer_resolution_ms: int = 1,
+        log: Callable[[str], None] = print,
+    ):
+        self._api = api or default_priority_api()
+        self._process_priority = process_priority
+        self._thread_priority = thread_priority
+        self._cpu = cpu
+        self._timer_resolution_ms = timer_resolution_ms
+        self._log = log
+        self._restore: List[Tuple[str, Callable[[], None]]] = []
+        self.active = False
+        self.before: Optional[StallStats] = None
+        self.after: Optional[StallStats] = None
+
+    @classmethod
+    def from_config(cls, config: AppConfig, **kwargs) -> "RealtimeMode":
+        return cls(
+            process_priority=config.realtime_process_priority,
+            thread_priority=config.realtime_thread_priority,
+            cpu=config.realtime_cpu,
+            timer_resolution_ms=config.realtime_timer_ms,
+            **kwargs,
+        )
+
+    @property
+    def pinned_cpu(self) -> int:
+        # Negative values count from the last core; core 0 usually takes most device interrupts.
+        count = self._api.cpu_count()
+        return self._cpu % count if self._cpu < 0 else min(self._cpu, count - 1)
+
+    def _try(self, what: str, action: Callable[[], Optional[Callable[[], None]]]) -> bool:
+        try:
+            undo = action()
+        except (OSError, ValueError, KeyError, ArgumentError) as exc:
+            self._log(f"实时模式：{what} 失败（{exc}）")
+            return False
+        if undo is not None:
+            self._restore.append((what, undo))
+        return True
+
+    def enter(self) -> None:
+        api = self._api
+
+        def raise_process():
+            previous = api.process_priority()
+            api.set_process_priority(api.process_levels[self._process_priority])
+            return lambda: api.set_process_priority(previous)
+
+        def raise_timer():
+            ms = self._timer_resolution_ms
+            if not api.begin_timer_resolution(ms):
+                return None
+            return lambda: api.end_timer_resolution(ms)
+
+        self._try("进程优先级", raise_process)
+        if self._timer_resolution_ms > 0:
+            self._try("计时器精度", raise_timer)
+        self.active = True
+
+    def promote_thread(self, thread: Optional[threading.Thread], pin: bool = False, restore: bool = True) -> None:
+        if thread is None or thread.native_id is None:
+            return
+        api = self._api
+        thread_id = thread.native_id
+
+        def raise_priority():
+            previous = api.thread_priority(thread_id)
+            api.set_thread_priority(thread_id, api.thread_levels[self._thread_priority])
+            return (lambda: api.set_thread_priority(thread_id, previous)) if restore else None
+
+        def pin_thread():
+            previous = api.set_thread_affinity(thread_id, (self.pinned_cpu,))
+            return (lambda: api.set_thread_affinity(thread_id, previous)) if restore else None
+
+        self._try(f"线程 {thread.name} 优先级", raise_priority)
+        if pin:
+            self._try(f"线程 {thread.name} 绑定 CPU", pin_thread)
+
+    def promote_threads(self, threads: Iterable[threading.Thread]) -> None:
+        for thread in threads:
+            self.promote_thread(thread)
+
+    def probe(self, duration: float, promote: bool = False, **kwargs) -> StallStats:
+        # Runs on a fresh thread so "after" sees the same priority and pinning as the selector worker.
+        result: List[StallStats] = []
+
+        def run():
+            if promote:
+                self.promote_thread(threading.current_thread(), pin=True, restore=False)
+            result.append(measure_stalls(duration, **kwargs))
+
+        thread = threading.Thread(target=run, name="stall-probe", daemon=True)
+        thread.start()
+        thread.join()
+        return result[0]
+
+    def restore(self) -> None:
+        while self._restore:
+            what, undo = self._restore.pop()
+            try:
+                undo()
+            except (OSError, ValueError, ArgumentError) as exc:
+                self._log(f"实时模式：恢复{what}失败（{exc}）")
+        self._api.close()
+        self.active = False
+
+    @property
+    def applied(self) -> List[str]:
+        return [what for what, _ in self._restore]
+
+    def format_stats(self) -> str:
+        parts = [f"active={self.active} cpu={self.pinned_cpu} applied={len(self._restore)}"]
+        if self.before is not None:
+            parts.append(f"before: {self.before.format()}")
+        if self.after is not None:
+            parts.append(f"after: {self.after.format()}")
+        return " ".join(parts)
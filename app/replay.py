@@ -0,0 +1,181 @@
+import argparse
+import sys
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+from app.adaptive import AdaptiveController, TuningParams
+from app.capture import BYTES_PER_PIXEL, FrameSource, PatchBuffer
+from app.change_gate import ChangeGate
+from app.color_detector import ColorDetector
+from app.color_lut import build_lut
+from app.config import AppConfig
+from app.scheduler import PollScheduler
+from app.selector import Selector
+from app.simulation import VirtualClock
+from app.state import SharedState
+from app.trace import EV_CONFIG, EV_FOCUS, EV_POLL, EV_REQUEST, EV_RESULT, TraceEvent, decode_config, read_trace
+
+
+class TraceFrameSource(FrameSource):
+    def __init__(self, polls: Sequence[TraceEvent], clock: VirtualClock, capture_cost: float = 0.0):
+        self._ts = [event.ts for event in polls]
+        self._polls = list(polls)
+        self._clock = clock
+        self._capture_cost = capture_cost
+
+    def _poll_now(self) -> Optional[TraceEvent]:
+        index = bisect_right(self._ts, self._clock.now()) - 1
+        return self._polls[index] if index >= 0 else None
+
+    def get_pixel(self, px: int, py: int) -> Tuple[int, int, int]:
+        poll = self._poll_now()
+        return poll.rgb if poll is not None else (0, 0, 0)
+
+    def grab(self, patch: PatchBuffer) -> bool:
+        self._clock.advance(self._capture_cost)
+        poll = self._poll_now()
+        if poll is not None and len(poll.payload) == len(patch.data):
+            patch.data[:] = poll.payload
+            return True
+        # Pixel-only samples, or a different sample radius than at record time: replay a uniform patch.
+        r, g, b = poll.rgb if poll is not None else (0, 0, 0)
+        patch.data[:] = bytes((b, g, r, 0)) * (len(patch.data) // BYTES_PER_PIXEL)
+        return True
+
+
+class TraceWindowGuard:
+    def __init__(self, focus: Sequence[TraceEvent], clock: VirtualClock):
+        self._ts = [event.ts for event in focus]
+        self._active = [bool(event.flag) for event in focus]
+        self._clock = clock
+
+    def is_allowed(self) -> bool:
+        index = bisect_right(self._ts, self._clock.now()) - 1
+        return self._active[index] if index >= 0 else True
+
+
+@dataclass
+class ReplayedDraw:
+    request_id: int
+    color: str
+    recorded_success: Optional[bool]
+    recorded_reason: Optional[str]
+    replayed_success: bool
+    replayed_reason: str
+
+    @property
+    def matches(self) -> bool:
+        if self.recorded_success is None:
+            return True
+        return self.recorded_success == self.replayed_success and self.recorded_reason == self.replayed_reason
+
+
+@dataclass
+class ReplayReport:
+    draws: List[ReplayedDraw] = field(default_factory=list)
+
+    def mismatches(self) -> List[ReplayedDraw]:
+        return [draw for draw in self.draws if not draw.matches]
+
+    def format(self) -> str:
+        lines = [f"draws={len(self.draws)} mismatches={len(self.mismatches())}"]
+        for draw in self.mismatches():
+            lines.append(
+                f"  req={draw.request_id} color={draw.color} "
+                f"recorded={draw.recorded_success}/{draw.recorded_reason or '-'} "
+                f"replayed={draw.replayed_success}/{draw.replayed_reason or '-'}"
+            )
+        return "\n".join(lines)
+
+
+def replay_trace(
+    events: Sequence[TraceEvent],
+    app_config: Optional[AppConfig] = None,
+    capture_cost: float = 0.0,
+) -> ReplayReport:
+    events = sorted(events, key=lambda event: event.ts)
+    report = ReplayReport()
+    if not events:
+        return report
+
+    # The session's own settings unless the caller overrides them; traces without a config record
+    # fall back to the defaults.
+    recorded_config = next((event for event in events if event.kind == EV_CONFIG), None)
+    tuning = None
+    if recorded_config is not None:
+        session_config, tuning = decode_config(recorded_config.payload)
+        app_config = app_config or session_config
+    app_config = app_config or AppConfig()
+    timing = app_config.timing
+    tuner = None
+    if tuning is not None:
+        tuner = AdaptiveController.from_dict(tuning, TuningParams.from_timing(timing))
+
+    clock = VirtualClock(start=events[0].ts)
+    scheduler = PollScheduler.from_timing(timing, clock=clock.now, sleep=clock.sleep)
+    color_detector = ColorDetector(
+        app_config.colors,
+        timing.double_sample_gap,
+        sample_radius_px=timing.sample_radius_px,
+        sample_min_hits=timing.sample_min_hits,
+        frame_source=TraceFrameSource([e for e in events if e.kind == EV_POLL], clock, capture_cost),
+        lut=build_lut(app_config.colors),
+        sleep=scheduler.sleep_for,
+        clock=clock.now,
+        regions=timing.roi_regions if timing.multi_roi_enabled else None,
+        change_gate=ChangeGate() if timing.change_gate_enabled else None,
+    )
+    state = SharedState()
+    results: List[dict] = []
+    selector = Selector(
+        config=app_config,
+        state=state,
+        color_detector=color_detector,
+        window_guard=TraceWindowGuard([e for e in events if e.kind == EV_FOCUS], clock),
+        click_w=lambda *_args: None,
+        debug_log=lambda *_args: None,
+        on_result=results.append,
+        scheduler=scheduler,
+        tuner=tuner,
+        log=lambda _line: None,
+    )
+
+    recorded = {event.request_id: event for event in events if event.kind == EV_RESULT}
+    for request in (event for event in events if event.kind == EV_REQUEST):
+        if request.ts > clock.now():
+            clock.advance(request.ts - clock.now())
+        state.set_xy(request.a, request.b)
+        results.clear()
+        selector.submit(request.color_name, open_cycle=False)
+        selector.run_pending()
+        selector.verify_pending(wait=True)
+
+        result = results[-1] if results else {"success": False, "fail_reason": "no_result"}
+        outcome = recorded.get(request.request_id)
+        report.draws.append(
+            ReplayedDraw(
+                request_id=request.request_id,
+                color=request.color_name,
+                recorded_success=bool(outcome.flag) if outcome is not None else None,
+                recorded_reason=outcome.fail_reason if outcome is not None else None,
+                replayed_success=bool(result["success"]),
+                replayed_reason=result["fail_reason"],
+            )
+        )
+    return report
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a recorded selector trace and compare the outcomes")
+    parser.add_argument("trace", help="trace file written with TF_TRACE_FILE")
+    parser.add_argument("--capture-cost", type=float, default=0.0, help="virtual seconds charged per grab")
+    args = parser.parse_args(argv)
+
+    report = replay_trace(read_trace(args.trace), capture_cost=args.capture_cost)
+    print(report.format())
+    return 1 if report.mismatches() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
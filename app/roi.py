@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Union
+
+from app.capture import BYTES_PER_PIXEL, PatchBuffer
+
+
+@dataclass(frozen=True)
+class SampleRegion:
+    dx: int
+    dy: int
+    weight: float = 1.0
+
+    @classmethod
+    def coerce(cls, value: Union["SampleRegion", Sequence[float]]) -> "SampleRegion":
+        if isinstance(value, cls):
+            return value
+        return cls(int(value[0]), int(value[1]), float(value[2]) if len(value) > 2 else 1.0)
+
+
+@dataclass(frozen=True)
+class RoiVote:
+    color: Optional[str]
+    confidence: float
+    scores: Dict[str, float]
+
+
+class RoiLayout:
+    # All regions share one bounding-box patch, so a poll is a single grab regardless of region count.
+    def __init__(self, regions: Sequence[Union[SampleRegion, Sequence[float]]], radius: int):
+        if not regions:
+            raise ValueError("at least one sample region is required")
+        regions = tuple(SampleRegion.coerce(region) for region in regions)
+        self.regions = regions
+        self.radius = max(0, int(radius))
+        r = self.radius
+        self._left = min(region.dx for region in regions) - r
+        self._top = min(region.dy for region in regions) - r
+        width = max(region.dx for region in regions) + r - self._left + 1
+        height = max(region.dy for region in regions) + r - self._top + 1
+        self.patch = PatchBuffer(width, height)
+        self.weights = [float(region.weight) for region in regions]
+        self.total_weight = sum(self.weights)
+        self.offsets: List[List[int]] = []
+        for region in regions:
+            cx = region.dx - self._left
+            cy = region.dy - self._top
+            self.offsets.append(
+                [
+                    ((cy + y) * width + (cx + x)) * BYTES_PER_PIXEL
+                    for y in range(-r, r + 1)
+                    for x in range(-r, r + 1)
+                ]
+            )
+
+    def move_to(self, px: int, py: int) -> PatchBuffer:
+        self.patch.move_to(px + self._left, py + self._top)
+        return self.patch
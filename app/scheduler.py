@@ -0,0 +1,125 @@
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from app.config import TimingConfig
+
+POLL_STRATEGIES = ("sleep", "hybrid", "spin")
+
+
+@dataclass
+class JitterStats:
+    ticks: int = 0
+    late_ticks: int = 0
+    missed_deadlines: int = 0
+    total_lateness: float = 0.0
+    max_lateness: float = 0.0
+    total_interval: float = 0.0
+    total_target_interval: float = 0.0
+
+    def mean_lateness_ms(self) -> float:
+        return (self.total_lateness / self.ticks) * 1000 if self.ticks else 0.0
+
+    def achieved_interval_ms(self) -> float:
+        return (self.total_interval / self.ticks) * 1000 if self.ticks else 0.0
+
+    def target_interval_ms(self) -> float:
+        return (self.total_target_interval / self.ticks) * 1000 if self.ticks else 0.0
+
+
+class PollScheduler:
+    def __init__(
+        self,
+        strategy: str = "hybrid",
+        spin_threshold: float = 0.0015,
+        late_threshold: float = 0.001,
+        clock: Callable[[], float] = time.perf_counter,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if strategy not in POLL_STRATEGIES:
+            raise ValueError(f"unknown poll strategy: {strategy}")
+        self.strategy = strategy
+        self._spin_threshold = max(0.0, spin_threshold)
+        self._late_threshold = late_threshold
+        self._clock = clock
+        self._sleep = sleep
+        self._next_deadline: Optional[float] = None
+        self._last_tick: Optional[float] = None
+        self.stats = JitterStats()
+
+    @classmethod
+    def from_timing(cls, timing: TimingConfig, **kwargs) -> "PollScheduler":
+        return cls(strategy=timing.poll_strategy, spin_threshold=timing.poll_spin_threshold, **kwargs)
+
+    def now(self) -> float:
+        return self._clock()
+
+    def reset(self) -> None:
+        # Anchor the tick grid at the start of a request so the first poll's work is absorbed too.
+        now = self._clock()
+        self._next_deadline = now
+        self._last_tick = now
+
+    def wait_next(self, interval: float) -> float:
+        now = self._clock()
+        if self._next_deadline is None:
+            deadline = now + interval
+        else:
+            deadline = self._next_deadline + interval
+            if deadline < now - interval:
+                # Fell more than a whole tick behind: resync instead of bursting to catch up.
+                self.stats.missed_deadlines += 1
+                deadline = now
+
+        woke = self.sleep_until(deadline)
+        self._record_tick(deadline, woke, interval)
+        self._next_deadline = deadline
+        return woke
+
+    def sleep_for(self, duration: float) -> float:
+        return self.sleep_until(self._clock() + duration)
+
+    def sleep_until(self, deadline: float) -> float:
+        clock = self._clock
+        sleep = self._sleep
+        now = clock()
+        if self.strategy == "sleep":
+            if deadline > now:
+                sleep(deadline - now)
+                now = clock()
+            return now
+
+        spin_threshold = self._spin_threshold if self.strategy == "hybrid" else 0.0
+        remaining = deadline - now
+        if remaining > spin_threshold and spin_threshold > 0.0:
+            sleep(remaining - spin_threshold)
+            now = clock()
+        while now < deadline:
+            sleep(0)
+            now = clock()
+        return now
+
+    def _record_tick(self, deadline: float, woke: float, interval: float) -> None:
+        stats = self.stats
+        lateness = max(0.0, woke - deadline)
+        stats.ticks += 1
+        stats.total_lateness += lateness
+        if lateness > stats.max_lateness:
+            stats.max_lateness = lateness
+        if lateness > self._late_threshold:
+            stats.late_ticks += 1
+        if self._last_tick is not None:
+            stats.total_interval += woke - self._last_tick
+        else:
+            stats.total_interval += interval
+        stats.total_target_interval += interval
+        self._last_tick = woke
+
+    def format_stats(self) -> str:
+        stats = self.stats
+        return (
+            f"strategy={self.strategy} ticks={stats.ticks} "
+            f"interval={stats.achieved_interval_ms():.2f}/{stats.target_interval_ms():.2f}ms "
+            f"lateness_avg={stats.mean_lateness_ms():.3f}ms lateness_max={stats.max_lateness * 1000:.3f}ms "
+            f"late={stats.late_ticks} missed={stats.missed_deadlines}"
+        )
@@ -1,11 +1,21 @@
 import threading
-import time
-from typing import Callable, Optional
+from typing import TYPE_CHECKING, Callable, Optional, Tuple
 
+from app.adaptive import AdaptiveController, TuningParams
 from app.color_detector import ColorDetector
 from app.config import AppConfig
+from app.perf import StageTimers
+from app.phase_tracker import CardPhaseTracker
+from app.scheduler import PollScheduler
 from app.state import SharedState
-from app.window_guard import WindowGuard
+from app.trace import TraceRecorder
+
+if TYPE_CHECKING:
+    from app.window_guard import WindowGuard
+
+# phase_lock_lead stands in for the key-to-lock delay of the game; a lead longer than that delay lands the
+# lock before the card it was aimed at. One 60 Hz frame is the most it is ever trusted with.
+MAX_PHASE_LOCK_LEAD = 0.016
 
 
 class Selector:
@@ -14,10 +24,15 @@ class Selector:
         config: AppConfig,
         state: SharedState,
         color_detector: ColorDetector,
-        window_guard: WindowGuard,
+        window_guard: "WindowGuard",
         click_w: Callable[[bool, Optional[int]], None],
         debug_log: Callable[[str, str], None],
         on_result: Optional[Callable[[dict], None]] = None,
+        scheduler: Optional[PollScheduler] = None,
+        log: Callable[[str], None] = print,
+        trace: Optional[TraceRecorder] = None,
+        tuner: Optional[AdaptiveController] = None,
+        stages: Optional[StageTimers] = None,
     ):
         self._config = config
         self._state = state
@@ -26,102 +41,281 @@ class Selector:
         self._click_w = click_w
         self._debug_log = debug_log
         self._on_result = on_result
+        self._scheduler = scheduler or PollScheduler.from_timing(config.timing)
+        self._log = log
+        self._trace = trace
+        self._tuner = tuner
+        self._stages = stages
+        self._static_params = TuningParams.from_timing(config.timing)
+        self._phase_tracker = (
+            CardPhaseTracker(initial_period=0.16) if config.timing.phase_tracking_enabled else None
+        )
+        self._draw_confidence: Optional[float] = None
+        # (due_ts, result) of a successful lock the tuner has not been told about yet.
+        self._pending_verify: Optional[Tuple[float, dict]] = None
         self._selector_event = threading.Event()
-        self._worker = threading.Thread(target=self._worker_loop, daemon=True)
+        self._prewarm: Optional[Callable[[], object]] = None
+        self.ready = threading.Event()
+        self._worker = threading.Thread(target=self._worker_loop, name="selector", daemon=True)
 
-    def start(self):
+    @property
+    def worker_thread(self) -> threading.Thread:
+        return self._worker
+
+    def start(self, prewarm: Optional[Callable[[], object]] = None):
+        # prewarm runs on the worker itself: capture contexts are per thread.
+        self._prewarm = prewarm
         self._worker.start()
 
-    def submit(self, color: str, open_cycle: bool = True) -> int:
+    def submit(self, color: str, open_cycle: bool = True, ts: Optional[float] = None) -> int:
         if open_cycle:
             self._click_w(False, None)
-        now = time.perf_counter()
+        # Requests dispatched off the hook thread keep the key-press time as their start.
+        now = ts if ts is not None else self._scheduler.now()
         request_id = self._state.register_request(color, now)
         self._selector_event.set()
         self._debug_log("submit", f"提交请求 req={request_id} color={color} open_cycle={open_cycle}")
         return request_id
 
     def _worker_loop(self):
+        if self._prewarm is not None:
+            try:
+                self._prewarm()
+            except Exception as exc:
+                self._log(f"预热失败：{exc}")
+        self.ready.set()
         while True:
-            self._selector_event.wait()
+            if self._selector_event.wait(self._verify_wait()):
+                self.run_pending()
+            self.verify_pending()
 
-            while True:
-                self._selector_event.clear()
-                request_id, req_color, request_start_ts = self._state.get_request_snapshot()
-                if request_id == 0:
-                    break
+    def run_pending(self):
+        while True:
+            self._selector_event.clear()
+            request_id, req_color, request_start_ts = self._state.get_request_snapshot()
+            if request_id == 0:
+                break
 
-                deadline = request_start_ts + self._config.timing.select_timeout
-                saw_single_match = False
-                extended_once = False
-                consecutive_match_count = 0
-                poll_interval = self._config.timing.card_poll_interval
+            stages = self._stages
+            if stages is None:
+                self._run_request(request_id, req_color, request_start_ts)
+            else:
+                start = stages.clock()
+                self._run_request(request_id, req_color, request_start_ts)
+                stages.end_draw(stages.clock() - start)
 
-                while True:
-                    active_request_id, paused, px, py = self._state.get_worker_snapshot_fast()
-                    if active_request_id != request_id:
-                        self._debug_log("worker", f"请求被覆盖 old={request_id} new={active_request_id}")
-                        break
+            if not self._state.has_newer_request(request_id):
+                break
 
-                    if paused:
-                        self._log_result(self._state.record_result(request_id, False, "paused"))
-                        break
+    @property
+    def phase_tracker(self) -> Optional[CardPhaseTracker]:
+        return self._phase_tracker
+
+    @property
+    def tuner(self) -> Optional[AdaptiveController]:
+        return self._tuner
+
+    def _run_request(self, request_id: int, req_color: str, request_start_ts: float):
+        timing = self._config.timing
+        params = self._tuner.params if self._tuner is not None else self._static_params
+        deadline = request_start_ts + timing.select_timeout
+        saw_single_match = False
+        extended_once = False
+        consecutive_match_count = 0
+        poll_interval = params.card_poll_interval
+        scheduler = self._scheduler
+        if self._pending_verify is not None:
+            # The previous locked card is being replaced before its late look was due.
+            _, result = self._pending_verify
+            self._pending_verify = None
+            self._tuner.observe(result, None)
+        scheduler.reset()
+        tracker = self._phase_tracker
+        self._draw_confidence = None
+        if tracker is not None:
+            tracker.begin_cycle(request_start_ts)
+        if self._trace is not None:
+            self._trace.request(request_start_ts, request_id, req_color, *self._state.get_xy())
+
+        stages = self._stages
+        t = 0.0
+        while True:
+            if stages is not None:
+                t = stages.clock()
+            active_request_id, paused, px, py = self._state.get_worker_snapshot_fast()
+            if stages is not None:
+                t = stages.record("state", t)
+            if active_request_id != request_id:
+                self._debug_log("worker", f"请求被覆盖 old={request_id} new={active_request_id}")
+                break
+
+            if paused:
+                self._log_result(self._state.record_result(request_id, False, "paused"))
+                break
+
+            allowed = self._window_guard.is_allowed()
+            if stages is not None:
+                t = stages.record("window", t)
+            if not allowed:
+                self._log_result(self._state.record_result(request_id, False, "inactive_window"))
+                break
+
+            now = scheduler.now()
+            if now - request_start_ts < timing.animation_grace:
+                self._wait_next(poll_interval)
+                continue
+
+            prediction = None
+            required_frames = params.match_confirm_frames
+            if self._color_detector.has_regions:
+                vote = self._color_detector.vote_regions(px, py)
+                confident = vote.confidence >= timing.roi_min_confidence
+                if tracker is not None:
+                    tracker.observe(now, vote.color if confident else None)
+                matched = confident and vote.color == req_color and self._color_detector.confirm_regions(
+                    px, py, req_color, timing.roi_min_confidence
+                )
+                if matched and vote.confidence >= timing.roi_commit_confidence:
+                    # Every region agrees on the target and the confirmation sample still shows it:
+                    # one frame is as good as several.
+                    required_frames = 1
+            elif tracker is None:
+                matched = self._color_detector.match_target_fast(px, py, req_color)
+            else:
+                matched, observed = self._color_detector.match_target_observed(px, py, req_color)
+                tracker.observe(now, observed)
+            if tracker is not None:
+                prediction = tracker.predict(req_color, now)
+                if prediction is not None:
+                    self._draw_confidence = prediction.confidence
+            if stages is not None:
+                stages.record("detect", t)
 
-                    if not self._window_guard.is_allowed():
-                        self._log_result(self._state.record_result(request_id, False, "inactive_window"))
+            if matched:
+                consecutive_match_count += 1
+                saw_single_match = True
+                poll_interval = params.card_poll_fast_interval
+                self._state.update_first_match(request_id, now)
+
+                if consecutive_match_count >= required_frames:
+                    self._press_lock(request_id)
+                    self._log_result(self._state.record_result(request_id, True))
+                    break
+            else:
+                consecutive_match_count = 0
+                poll_interval = params.card_poll_interval
+                if prediction is not None and prediction.confidence >= timing.phase_min_confidence:
+                    if self._should_preempt(prediction, now):
+                        self._press_lock(request_id)
+                        self._debug_log("worker", f"预判锁牌 req={request_id} conf={prediction.confidence:.2f}")
+                        self._log_result(self._state.record_result(request_id, True))
                         break
+                    poll_interval = self._phase_poll_interval(prediction, now, params)
 
-                    now = time.perf_counter()
-                    if now - request_start_ts < self._config.timing.animation_grace:
-                        time.sleep(poll_interval)
-                        continue
-
-                    if self._color_detector.match_target_fast(px, py, req_color):
-                        consecutive_match_count += 1
-                        saw_single_match = True
-                        poll_interval = self._config.timing.card_poll_fast_interval
-                        self._state.update_first_match(request_id, now)
-
-                        if consecutive_match_count >= self._config.timing.match_confirm_frames:
-                            self._click_w(True, request_id)
-                            self._log_result(self._state.record_result(request_id, True))
-                            break
-                    else:
-                        consecutive_match_count = 0
-                        poll_interval = self._config.timing.card_poll_interval
-
-                    if now >= deadline:
-                        if saw_single_match and not extended_once:
-                            deadline = now + self._config.timing.partial_match_grace
-                            extended_once = True
-                            self._debug_log(
-                                "worker",
-                                f"请求宽限 req={request_id} grace={self._config.timing.partial_match_grace}s",
-                            )
-                        else:
-                            reason = "timeout_no_confirm" if saw_single_match else "timeout_no_match"
-                            self._log_result(self._state.record_result(request_id, False, reason))
-                            break
-
-                    time.sleep(poll_interval)
-
-                if not self._state.has_newer_request(request_id):
+            if now >= deadline:
+                if saw_single_match and not extended_once:
+                    deadline = now + params.partial_match_grace
+                    extended_once = True
+                    self._debug_log(
+                        "worker",
+                        f"请求宽限 req={request_id} grace={params.partial_match_grace}s",
+                    )
+                else:
+                    reason = "timeout_no_confirm" if saw_single_match else "timeout_no_match"
+                    self._log_result(self._state.record_result(request_id, False, reason))
                     break
 
+            self._wait_next(poll_interval)
+
+    def _wait_next(self, interval: float) -> None:
+        stages = self._stages
+        if stages is None:
+            self._scheduler.wait_next(interval)
+            return
+        start = stages.clock()
+        self._scheduler.wait_next(interval)
+        stages.record("wait", start)
+
+    def _press_lock(self, request_id: int) -> None:
+        stages = self._stages
+        if stages is None:
+            self._click_w(True, request_id)
+            return
+        start = stages.clock()
+        self._click_w(True, request_id)
+        stages.record("click", start)
+
+    def _phase_poll_interval(self, prediction, now: float, params: TuningParams) -> float:
+        if now < prediction.window_start_ts:
+            # Far from the expected card: poll sparsely, but wake up right at the window.
+            wait = prediction.window_start_ts - now
+            return min(max(wait, params.card_poll_interval), self._config.timing.phase_sparse_interval)
+        if now <= prediction.window_end_ts:
+            return params.card_poll_fast_interval
+        return params.card_poll_interval
+
+    def _should_preempt(self, prediction, now: float) -> bool:
+        timing = self._config.timing
+        if timing.phase_lock_lead <= 0 or prediction.steps != 1:
+            return False
+        if prediction.confidence < timing.phase_preempt_confidence:
+            return False
+        # Fire only if the lock lands after the latest plausible start of the target and before its
+        # earliest plausible end: the learned period spread sets the timing, confidence only gates the order.
+        margin = prediction.expected_start_ts - prediction.window_start_ts
+        land = now + min(timing.phase_lock_lead, MAX_PHASE_LOCK_LEAD)
+        return prediction.expected_start_ts + margin <= land < prediction.window_end_ts - 2 * margin
+
+    def _verify_wait(self) -> Optional[float]:
+        if self._pending_verify is None:
+            return None
+        return max(0.0, self._pending_verify[0] - self._scheduler.now())
+
+    def verify_pending(self, wait: bool = False) -> bool:
+        # The locked card stays on screen, so a late look tells whether the lock landed on the wrong one.
+        # It runs between requests instead of holding the worker for lock_verify_delay after every lock.
+        if self._pending_verify is None:
+            return False
+        due, result = self._pending_verify
+        if wait:
+            self._scheduler.sleep_until(due)
+        elif self._scheduler.now() < due:
+            return False
+        self._pending_verify = None
+        px, py = self._state.get_xy()
+        _, observed = self._color_detector.sample_card_hits(px, py)
+        self._tuner.observe(result, observed is not None and observed != result["req_color"])
+        return True
+
     def _log_result(self, result):
         if result is None:
             return
 
+        if self._phase_tracker is not None:
+            result["phase_confidence"] = self._draw_confidence
+
+        if self._trace is not None:
+            self._trace.result(
+                self._scheduler.now(), result["request_id"], result["req_color"], result["success"], result["fail_reason"]
+            )
+
+        if self._tuner is not None:
+            delay = self._config.timing.lock_verify_delay
+            if result["success"] and delay > 0:
+                self._pending_verify = (self._scheduler.now() + delay, result)
+            else:
+                self._tuner.observe(result, None)
+
         if self._on_result is not None:
             self._on_result(result)
 
         if result["success"]:
-            print(
+            self._log(
                 f"抽牌成功 color={result['req_color']} req={result['request_id']} "
                 f"first_match={result['first_match_latency_ms']}ms lock={result['lock_latency_ms']}ms"
             )
         else:
-            print(
+            self._log(
                 f"抽牌失败 color={result['req_color']} req={result['request_id']} reason={result['fail_reason']} "
                 f"first_match={result['first_match_latency_ms']}ms"
             )
@@ -0,0 +1,436 @@
+import random
+import time
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.adaptive import AdaptiveController
+from app.capture import BYTES_PER_PIXEL, FrameSource, PatchBuffer
+from app.change_gate import ChangeGate
+from app.color_detector import ColorDetector
+from app.color_lut import build_lut
+from app.config import AppConfig
+from app.perf import StageTimers
+from app.scheduler import PollScheduler
+from app.selector import Selector
+from app.state import SharedState
+from app.trace import TraceRecorder, TracingFrameSource
+
+CARD_RGB = {
+    "黄": (222, 188, 62),
+    "蓝": (52, 112, 228),
+    "红": (214, 58, 48),
+}
+IDLE_RGB = (72, 76, 84)
+
+
+@dataclass(frozen=True)
+class CardCycleConfig:
+    card_period: float = 0.16
+    period_jitter: float = 0.01
+    frame_interval: float = 1 / 60
+    transition_frames: int = 2
+    color_noise: float = 6.0
+    # Draw noise once per displayed frame, so grabs within one frame see identical pixels like a real screen.
+    static_frames: bool = False
+    open_delay: float = 0.03
+    lock_delay: float = 0.015
+    capture_cost: float = 0.0002
+    min_sleep: float = 0.00005
+    order: Tuple[str, ...] = ("蓝", "红", "黄")
+    anchor: Tuple[int, int] = (827, 975)
+    # Particle effects that briefly paint a card-coloured blob near the sampled point.
+    vfx_rate: float = 0.0
+    vfx_frames: int = 4
+    vfx_radius: int = 3
+
+
+class VirtualClock:
+    def __init__(self, start: float = 1000.0, min_sleep: float = 0.00005):
+        self._now = start
+        self._min_sleep = min_sleep
+
+    def now(self) -> float:
+        return self._now
+
+    def sleep(self, duration: float) -> None:
+        self._now += duration if duration > 0 else self._min_sleep
+
+    def advance(self, duration: float) -> None:
+        self._now += duration
+
+
+class CardCycleModel:
+    def __init__(self, config: CardCycleConfig, rng: random.Random):
+        self._config = config
+        self._rng = rng
+        self._starts: List[float] = []
+        self._cards: List[str] = []
+        self.open_ts: Optional[float] = None
+
+    def open_cycle(self, now: float, horizon: float = 3.0) -> None:
+        config = self._config
+        start_index = self._rng.randrange(len(config.order))
+        t = now + config.open_delay
+        starts = []
+        cards = []
+        i = start_index
+        while t < now + horizon:
+            starts.append(t)
+            cards.append(config.order[i % len(config.order)])
+            t += max(config.frame_interval, self._rng.gauss(config.card_period, config.period_jitter))
+            i += 1
+        self._starts = starts
+        self._cards = cards
+        self.open_ts = now
+
+    def lock_cycle(self, ts: float, card: Optional[str]) -> None:
+        # The selected card stays on the icon until the draw ends.
+        index = bisect_right(self._starts, ts)
+        if card is None:
+            self._starts = self._starts[:index]
+            self._cards = self._cards[:index]
+            return
+        self._starts = self._starts[:index] + [ts]
+        self._cards = self._cards[:index] + [card]
+
+    def close_cycle(self) -> None:
+        self._starts = []
+        self._cards = []
+        self.open_ts = None
+
+    def card_at(self, ts: float) -> Optional[str]:
+        index = bisect_right(self._starts, ts) - 1
+        if index < 0:
+            return None
+        return self._cards[index]
+
+    def base_rgb_at(self, ts: float) -> Tuple[int, int, int]:
+        config = self._config
+        frame_ts = int(ts / config.frame_interval) * config.frame_interval
+        index = bisect_right(self._starts, frame_ts) - 1
+        if index < 0:
+            return IDLE_RGB
+
+        current = CARD_RGB[self._cards[index]]
+        blend_span = config.transition_frames * config.frame_interval
+        since_start = frame_ts - self._starts[index]
+        if blend_span <= 0 or since_start >= blend_span:
+            return current
+
+        previous = CARD_RGB[self._cards[index - 1]] if index > 0 else IDLE_RGB
+        alpha = (since_start + config.frame_interval) / (blend_span + config.frame_interval)
+        return tuple(int(p + (c - p) * alpha) for p, c in zip(previous, current))
+
+
+class SimulatedScreen(FrameSource):
+    def __init__(
+        self,
+        model: CardCycleModel,
+        clock: VirtualClock,
+        config: CardCycleConfig,
+        rng: random.Random,
+        cpu_clock: Callable[[], float] = time.process_time,
+    ):
+        self._model = model
+        self._clock = clock
+        self._config = config
+        self._rng = rng
+        self._cpu_clock = cpu_clock
+        self.grab_count = 0
+        # CPU spent rendering fake pixels (per-pixel gauss noise dominates it); the simulator
+        # subtracts it so cpu_ms covers only the detector and selector.
+        self.cpu_seconds = 0.0
+        self._vfx_rng = random.Random(rng.random())
+        self._vfx_frame = int(clock.now() / config.frame_interval)
+        self._vfx_until = -1
+        self._vfx_center = config.anchor
+        self._vfx_rgb = IDLE_RGB
+        self._noise_seed = rng.randrange(1 << 30)
+
+    def reseed(self, seed: float) -> None:
+        self._rng = random.Random(seed)
+        self._vfx_rng = random.Random(self._rng.random())
+
+    def _update_vfx(self, now: float) -> bool:
+        config = self._config
+        if config.vfx_rate <= 0:
+            return False
+        frame = int(now / config.frame_interval)
+        rng = self._vfx_rng
+        while self._vfx_frame < frame:
+            self._vfx_frame += 1
+            if self._vfx_frame > self._vfx_until and rng.random() < config.vfx_rate:
+                self._vfx_until = self._vfx_frame + config.vfx_frames - 1
+                ax, ay = config.anchor
+                self._vfx_center = (ax + rng.randint(-2, 2), ay + rng.randint(-2, 2))
+                self._vfx_rgb = rng.choice(list(CARD_RGB.values()))
+        return self._vfx_frame <= self._vfx_until
+
+    def _noisy(self, rgb: Tuple[int, int, int], rng: Optional[random.Random] = None) -> Tuple[int, int, int]:
+        noise = self._config.color_noise
+        if noise <= 0:
+            return rgb
+        gauss = (rng or self._rng).gauss
+        return tuple(min(255, max(0, int(c + gauss(0.0, noise)))) for c in rgb)
+
+    def get_pixel(self, px: int, py: int) -> Tuple[int, int, int]:
+        cpu_start = self._cpu_clock()
+        rgb = self._noisy(self._model.base_rgb_at(self._clock.now()))
+        self.cpu_seconds += self._cpu_clock() - cpu_start
+        return rgb
+
+    def grab(self, patch: PatchBuffer) -> bool:
+        cpu_start = self._cpu_clock()
+        self.grab_count += 1
+        self._clock.advance(self._config.capture_cost)
+        now = self._clock.now()
+        base = self._model.base_rgb_at(now)
+        vfx = self._update_vfx(now)
+        cx, cy = self._vfx_center
+        radius_sq = self._config.vfx_radius ** 2
+        rng = None
+        if self._config.static_frames:
+            frame = int(now / self._config.frame_interval)
+            rng = random.Random(hash((self._noise_seed, frame, patch.left, patch.top, patch.width, patch.height)))
+        data = patch.data
+        width = patch.width
+        for i in range(0, len(data), BYTES_PER_PIXEL):
+            rgb = base
+            if vfx:
+                pixel = i // BYTES_PER_PIXEL
+                dx = patch.left + pixel % width - cx
+                dy = patch.top + pixel // width - cy
+                if dx * dx + dy * dy <= radius_sq:
+                    rgb = self._vfx_rgb
+            r, g, b = self._noisy(rgb, rng)
+            data[i] = b
+            data[i + 1] = g
+            data[i + 2] = r
+        self.cpu_seconds += self._cpu_clock() - cpu_start
+        return True
+
+
+class SimulatedWindowGuard:
+    def __init__(self):
+        self.allowed = True
+
+    def is_allowed(self) -> bool:
+        return self.allowed
+
+
+@dataclass
+class DrawOutcome:
+    target: str
+    success: bool
+    fail_reason: str
+    locked_card: Optional[str]
+    lock_latency_ms: Optional[float]
+    first_match_latency_ms: Optional[float]
+    cpu_ms: float
+    polls: int
+    phase_confidence: Optional[float] = None
+
+    @property
+    def wrong_card(self) -> bool:
+        return self.success and self.locked_card != self.target
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(len(ordered) * fraction))
+    return ordered[index]
+
+
+@dataclass
+class BenchmarkReport:
+    outcomes: List[DrawOutcome] = field(default_factory=list)
+
+    @property
+    def draws(self) -> int:
+        return len(self.outcomes)
+
+    def success_rate(self) -> float:
+        return sum(1 for o in self.outcomes if o.success) / self.draws if self.draws else 0.0
+
+    def wrong_card_rate(self) -> float:
+        locked = [o for o in self.outcomes if o.success]
+        return sum(1 for o in locked if o.wrong_card) / len(locked) if locked else 0.0
+
+    def lock_latencies(self) -> List[float]:
+        return [o.lock_latency_ms for o in self.outcomes if o.success and o.lock_latency_ms is not None]
+
+    def cpu_ms_per_draw(self) -> float:
+        return sum(o.cpu_ms for o in self.outcomes) / self.draws if self.draws else 0.0
+
+    def polls_per_draw(self) -> float:
+        return sum(o.polls for o in self.outcomes) / self.draws if self.draws else 0.0
+
+    def failures(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for o in self.outcomes:
+            if not o.success:
+                counts[o.fail_reason] = counts.get(o.fail_reason, 0) + 1
+        return counts
+
+    def summary(self) -> Dict[str, object]:
+        lock = self.lock_latencies()
+        return {
+            "draws": self.draws,
+            "success_rate": self.success_rate(),
+            "wrong_card_rate": self.wrong_card_rate(),
+            "lock_p50_ms": percentile(lock, 0.50),
+            "lock_p95_ms": percentile(lock, 0.95),
+            "lock_p99_ms": percentile(lock, 0.99),
+            "cpu_ms_per_draw": self.cpu_ms_per_draw(),
+            "polls_per_draw": self.polls_per_draw(),
+            "failures": self.failures(),
+        }
+
+    def format(self) -> str:
+        s = self.summary()
+
+        def ms(value):
+            return "n/a" if value is None else f"{value:.1f}ms"
+
+        return (
+            f"draws={s['draws']} success_rate={s['success_rate'] * 100:.1f}% "
+            f"wrong_card_rate={s['wrong_card_rate'] * 100:.2f}% "
+            f"lock_p50={ms(s['lock_p50_ms'])} lock_p95={ms(s['lock_p95_ms'])} lock_p99={ms(s['lock_p99_ms'])} "
+            f"cpu_per_draw={s['cpu_ms_per_draw']:.3f}ms polls_per_draw={s['polls_per_draw']:.1f} "
+            f"failures={s['failures']}"
+        )
+
+
+class CardCycleSimulator:
+    def __init__(
+        self,
+        app_config: Optional[AppConfig] = None,
+        cycle: Optional[CardCycleConfig] = None,
+        seed: int = 0,
+        targets: Tuple[str, ...] = ("黄", "蓝", "红"),
+        draw_gap: float = 1.5,
+        selector_factory: Optional[Callable[..., Selector]] = None,
+        trace: Optional[TraceRecorder] = None,
+        tuner: Optional[AdaptiveController] = None,
+        stages: Optional[StageTimers] = None,
+        cpu_clock: Callable[[], float] = time.process_time,
+    ):
+        self.app_config = app_config or AppConfig()
+        self._cpu_clock = cpu_clock
+        self.cycle = cycle or CardCycleConfig()
+        self._targets = targets
+        self._draw_gap = draw_gap
+        self._rng = random.Random(seed)
+        self.clock = VirtualClock(min_sleep=self.cycle.min_sleep)
+        self.model = CardCycleModel(self.cycle, random.Random(self._rng.random()))
+        self.screen = SimulatedScreen(
+            self.model, self.clock, self.cycle, random.Random(self._rng.random()), cpu_clock=cpu_clock
+        )
+        self.window_guard = SimulatedWindowGuard()
+        self.state = SharedState()
+        self.state.set_xy(*self.cycle.anchor)
+
+        frame_source = self.screen
+        if trace is not None:
+            trace.config(self.clock.now(), self.app_config, tuner.to_dict() if tuner is not None else None)
+            frame_source = TracingFrameSource(self.screen, trace, self.clock.now)
+
+        timing = self.app_config.timing
+        self.scheduler = PollScheduler.from_timing(timing, clock=self.clock.now, sleep=self.clock.sleep)
+        self.color_detector = ColorDetector(
+            self.app_config.colors,
+            timing.double_sample_gap,
+            sample_radius_px=timing.sample_radius_px,
+            sample_min_hits=timing.sample_min_hits,
+            frame_source=frame_source,
+            lut=build_lut(self.app_config.colors),
+            sleep=self.scheduler.sleep_for,
+            clock=self.clock.now,
+            regions=timing.roi_regions if timing.multi_roi_enabled else None,
+            change_gate=ChangeGate() if timing.change_gate_enabled else None,
+            stages=stages,
+        )
+        self._results: List[dict] = []
+        self._locked_card: Optional[str] = None
+        self._lock_ts: Optional[float] = None
+        factory = selector_factory or Selector
+        self.selector = factory(
+            config=self.app_config,
+            state=self.state,
+            color_detector=self.color_detector,
+            window_guard=self.window_guard,
+            click_w=self.click_w,
+            debug_log=lambda *_args: None,
+            on_result=self._results.append,
+            scheduler=self.scheduler,
+            log=lambda _line: None,
+            trace=trace,
+            tuner=tuner,
+            stages=stages,
+        )
+
+    def click_w(self, is_lock_press: bool = False, request_id: Optional[int] = None):
+        now = self.clock.now()
+        if not is_lock_press:
+            if self.model.open_ts is None:
+                self.model.open_cycle(now)
+            return
+
+        lock_ts = now + self.cycle.lock_delay
+        self._locked_card = self.model.card_at(lock_ts)
+        self._lock_ts = now
+        self.model.lock_cycle(lock_ts, self._locked_card)
+        if request_id is not None:
+            self.state.update_key_send(request_id, now)
+
+    def run_draw(self, target: str) -> DrawOutcome:
+        self._locked_card = None
+        self._lock_ts = None
+        self._results.clear()
+        grabs_before = self.screen.grab_count
+        screen_cpu_before = self.screen.cpu_seconds
+        # Fresh noise per draw, drawn from the same stream as the targets: how many grabs one draw
+        # takes never shifts the pixels a later draw sees, so two configurations compare draw for draw.
+        self.screen.reseed(self._rng.random())
+
+        cpu_start = self._cpu_clock()
+        # W for blue is pressed by the player, so the cycle opens without the selector's click.
+        open_cycle = target != "蓝"
+        if not open_cycle:
+            self.model.open_cycle(self.clock.now())
+        start_ts = self.clock.now()
+        self.selector.submit(target, open_cycle=open_cycle)
+        self.selector.run_pending()
+        self.selector.verify_pending(wait=True)
+        screen_cpu = self.screen.cpu_seconds - screen_cpu_before
+        cpu_ms = max(0.0, self._cpu_clock() - cpu_start - screen_cpu) * 1000
+
+        result = self._results[-1] if self._results else {"success": False, "fail_reason": "no_result"}
+        first_match_ts = self.state.get_last_latency().first_match_ts
+        outcome = DrawOutcome(
+            target=target,
+            success=bool(result["success"]),
+            fail_reason=result.get("fail_reason", ""),
+            locked_card=self._locked_card,
+            lock_latency_ms=(self._lock_ts - start_ts) * 1000 if self._lock_ts is not None else None,
+            first_match_latency_ms=(first_match_ts - start_ts) * 1000 if first_match_ts is not None else None,
+            cpu_ms=cpu_ms,
+            polls=self.screen.grab_count - grabs_before,
+            phase_confidence=result.get("phase_confidence"),
+        )
+
+        self.model.close_cycle()
+        self.clock.advance(self._draw_gap)
+        # Start every draw on a frame boundary, so the cycle lines up with the frames the same way
+        # however long the previous draw took.
+        self.clock.advance(-self.clock.now() % self.cycle.frame_interval)
+        return outcome
+
+    def run(self, draws: int) -> BenchmarkReport:
+        report = BenchmarkReport()
+        for _ in range(draws):
+            report.outcomes.append(self.run_draw(self._rng.choice(self._targets)))
+        return report
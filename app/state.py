@@ -1,9 +1,9 @@
 import threading
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from typing import Dict, Optional, Tuple
 
 
-@dataclass
+@dataclass(slots=True)
 class RuntimeState:
     x: int = 827
     y: int = 975
@@ -17,18 +17,29 @@ class RuntimeState:
     active_last_true_ts: float = 0.0
 
 
-@dataclass
+@dataclass(slots=True)
 class LastLatency:
     request_id: int = 0
     req_color: str = ""
     w_start_ts: float = 0.0
     first_match_ts: Optional[float] = None
+    lock_decision_ts: Optional[float] = None
     key_send_ts: Optional[float] = None
     success: bool = False
     fail_reason: str = ""
 
+    def reset(self, request_id: int, req_color: str, w_start_ts: float) -> None:
+        self.request_id = request_id
+        self.req_color = req_color
+        self.w_start_ts = w_start_ts
+        self.first_match_ts = None
+        self.lock_decision_ts = None
+        self.key_send_ts = None
+        self.success = False
+        self.fail_reason = ""
 
-@dataclass
+
+@dataclass(slots=True)
 class LatencyStats:
     total: int = 0
     success: int = 0
@@ -36,28 +47,118 @@ class LatencyStats:
     last: LastLatency = field(default_factory=LastLatency)
 
 
+class DrawResult:
+    # One per finished draw. Consumers index it like the dict it replaces (result["success"],
+    # result.get("lock_latency_us")), but it is a fixed slot layout instead of a per-draw hash table.
+    __slots__ = (
+        "req_color",
+        "request_id",
+        "success",
+        "fail_reason",
+        "lock_latency_ms",
+        "first_match_latency_ms",
+        "lock_latency_us",
+        "first_match_latency_us",
+        "inject_latency_us",
+        "phase_confidence",
+    )
+
+    def __init__(
+        self,
+        req_color: str,
+        request_id: int,
+        success: bool,
+        fail_reason: str = "",
+        lock_latency_ms: Optional[int] = None,
+        first_match_latency_ms: Optional[int] = None,
+        lock_latency_us: Optional[int] = None,
+        first_match_latency_us: Optional[int] = None,
+        inject_latency_us: Optional[int] = None,
+        phase_confidence: Optional[float] = None,
+    ):
+        self.req_color = req_color
+        self.request_id = request_id
+        self.success = success
+        self.fail_reason = fail_reason
+        self.lock_latency_ms = lock_latency_ms
+        self.first_match_latency_ms = first_match_latency_ms
+        self.lock_latency_us = lock_latency_us
+        self.first_match_latency_us = first_match_latency_us
+        self.inject_latency_us = inject_latency_us
+        self.phase_confidence = phase_confidence
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value) -> None:
+        try:
+            setattr(self, key, value)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.__slots__
+
+    def to_dict(self) -> Dict[str, object]:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, DrawResult):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __repr__(self) -> str:
+        return f"DrawResult({self.to_dict()!r})"
+
+
+# Writers serialize on the lock and publish frozen tuples; hot-path readers load a tuple
+# attribute without locking (a single reference load is atomic in CPython).
 class SharedState:
     def __init__(self):
         self._lock = threading.Lock()
         self._state = RuntimeState()
         self._latency = LatencyStats()
+        self._version = 0
+        self._worker_view: Tuple[int, bool, int, int] = (0, False, 0, 0)
+        self._request_view: Tuple[int, str, float] = (0, "", 0.0)
+        self._publish()
+
+    def _publish(self) -> None:
+        state = self._state
+        self._worker_view = (state.request_id, state.paused, state.x, state.y)
+        self._request_view = (state.request_id, state.req_color, state.request_start_ts)
+        self._version += 1
+
+    @property
+    def version(self) -> int:
+        return self._version
 
     def get_xy(self) -> Tuple[int, int]:
-        with self._lock:
-            return self._state.x, self._state.y
+        view = self._worker_view
+        return view[2], view[3]
 
     def set_xy(self, x: int, y: int) -> None:
         with self._lock:
             self._state.x = x
             self._state.y = y
+            self._publish()
 
     def is_paused(self) -> bool:
-        with self._lock:
-            return self._state.paused
+        return self._worker_view[1]
 
     def toggle_paused(self) -> bool:
         with self._lock:
             self._state.paused = not self._state.paused
+            self._publish()
             return self._state.paused
 
     def set_ctrl_pressed(self, pressed: bool) -> None:
@@ -65,8 +166,7 @@ class SharedState:
             self._state.ctrl_press = pressed
 
     def is_ctrl_pressed(self) -> bool:
-        with self._lock:
-            return self._state.ctrl_press
+        return self._state.ctrl_press
 
     def register_request(self, color: str, now: float) -> int:
         with self._lock:
@@ -75,40 +175,40 @@ class SharedState:
             self._state.request_start_ts = now
 
             rid = self._state.request_id
-            self._latency.last = LastLatency(
-                request_id=rid,
-                req_color=color,
-                w_start_ts=now,
-                first_match_ts=None,
-                key_send_ts=None,
-                success=False,
-                fail_reason="",
-            )
+            self._publish()
+            # Reset in place; readers only ever see copies from get_last_latency.
+            self._latency.last.reset(rid, color, now)
             return rid
 
     def get_request_snapshot(self) -> Tuple[int, str, float]:
-        with self._lock:
-            return self._state.request_id, self._state.req_color, self._state.request_start_ts
+        return self._request_view
 
     def get_worker_snapshot_fast(self) -> Tuple[int, bool, int, int]:
+        return self._worker_view
+
+    def get_last_latency(self) -> LastLatency:
         with self._lock:
-            return self._state.request_id, self._state.paused, self._state.x, self._state.y
+            return replace(self._latency.last)
 
     def has_newer_request(self, request_id: int) -> bool:
-        with self._lock:
-            return self._state.request_id != request_id
+        return self._worker_view[0] != request_id
 
     def update_first_match(self, request_id: int, ts: float) -> None:
         with self._lock:
             if self._latency.last.request_id == request_id and self._latency.last.first_match_ts is None:
                 self._latency.last.first_match_ts = ts
 
+    def update_lock_decision(self, request_id: int, ts: float) -> None:
+        with self._lock:
+            if self._latency.last.request_id == request_id:
+                self._latency.last.lock_decision_ts = ts
+
     def update_key_send(self, request_id: int, ts: float) -> None:
         with self._lock:
             if self._latency.last.request_id == request_id:
                 self._latency.last.key_send_ts = ts
 
-    def record_result(self, request_id: int, success: bool, fail_reason: str = "") -> Optional[dict]:
+    def record_result(self, request_id: int, success: bool, fail_reason: str = "") -> Optional[DrawResult]:
         with self._lock:
             last = self._latency.last
             if last.request_id != request_id:
@@ -124,21 +224,31 @@ class SharedState:
                 last.fail_reason = fail_reason
                 self._latency.failures[fail_reason] = self._latency.failures.get(fail_reason, 0) + 1
 
-            lock_latency_ms = None
-            first_match_latency_ms = None
-            if last.key_send_ts:
-                lock_latency_ms = int((last.key_send_ts - last.w_start_ts) * 1000)
+            lock_latency_us = None
+            first_match_latency_us = None
+            inject_latency_us = None
+            # A queued injector may not have sent yet; fall back to the decision time.
+            lock_ts = last.key_send_ts or last.lock_decision_ts
+            if lock_ts:
+                lock_latency_us = round((lock_ts - last.w_start_ts) * 1_000_000)
+            if last.key_send_ts and last.lock_decision_ts:
+                inject_latency_us = round((last.key_send_ts - last.lock_decision_ts) * 1_000_000)
             if last.first_match_ts:
-                first_match_latency_ms = int((last.first_match_ts - last.w_start_ts) * 1000)
+                first_match_latency_us = round((last.first_match_ts - last.w_start_ts) * 1_000_000)
+            lock_latency_ms = lock_latency_us // 1000 if lock_latency_us is not None else None
+            first_match_latency_ms = first_match_latency_us // 1000 if first_match_latency_us is not None else None
 
-            return {
-                "req_color": last.req_color,
-                "request_id": request_id,
-                "success": success,
-                "fail_reason": fail_reason,
-                "lock_latency_ms": lock_latency_ms,
-                "first_match_latency_ms": first_match_latency_ms,
-            }
+            return DrawResult(
+                last.req_color,
+                request_id,
+                success,
+                fail_reason,
+                lock_latency_ms,
+                first_match_latency_ms,
+                lock_latency_us,
+                first_match_latency_us,
+                inject_latency_us,
+            )
 
     def try_handle_r_press(self, now: float, threshold_sec: float) -> bool:
         with self._lock:
@@ -156,5 +266,4 @@ class SharedState:
                 self._state.active_last_true_ts = now
 
     def last_active_true_ts(self) -> float:
-        with self._lock:
-            return self._state.active_last_true_ts
+        return self._state.active_last_true_ts
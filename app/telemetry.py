@@ -0,0 +1,282 @@
+import json
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.perf import METRICS, PerfCollector
+
+_STOP = object()
+QUANTILES = (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms"))
+WINDOWS = ("last_n", "recent", "session")
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value) -> str:
+    if value is None:
+        return "NaN"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(snapshot: dict) -> str:
+    lines = [
+        "# TYPE tf_draws_total counter",
+        f"tf_draws_total {snapshot['total']}",
+        "# TYPE tf_draws_success_total counter",
+        f"tf_draws_success_total {snapshot['success']}",
+        "# TYPE tf_draw_failures_total counter",
+    ]
+    for reason, n in sorted(snapshot["failures"].items()):
+        lines.append(f'tf_draw_failures_total{{reason="{_label(reason)}"}} {n}')
+    # A separate family: mixing label sets under one name would make sum(tf_draw_failures_total) double-count.
+    lines.append("# TYPE tf_draw_failures_by_color_total counter")
+    for color, reasons in snapshot["failures_by_color"].items():
+        for reason, n in sorted(reasons.items()):
+            lines.append(f'tf_draw_failures_by_color_total{{reason="{_label(reason)}",color="{_label(color)}"}} {n}')
+    lines.append("# TYPE tf_recent_success_ratio gauge")
+    lines.append(f"tf_recent_success_ratio {_number(snapshot['recent_success_rate'])}")
+
+    # Each family is written as one contiguous block, as the exposition format requires.
+    latency = []
+    maxima = []
+    for metric in METRICS:
+        for color, windows in snapshot["latency"].get(metric, {}).items():
+            for window in WINDOWS:
+                summary = windows[window]
+                labels = f'metric="{metric}",color="{_label(color)}",window="{window}"'
+                for quantile, key in QUANTILES:
+                    latency.append(f'tf_latency_ms{{{labels},quantile="{quantile}"}} {_number(summary[key])}')
+                latency.append(f"tf_latency_ms_sum{{{labels}}} {_number(summary['sum_ms'])}")
+                latency.append(f"tf_latency_ms_count{{{labels}}} {summary['count']}")
+                maxima.append(f"tf_latency_max_ms{{{labels}}} {_number(summary['max_ms'])}")
+    lines.append("# TYPE tf_latency_ms summary")
+    lines.extend(latency)
+    lines.append("# TYPE tf_latency_max_ms gauge")
+    lines.extend(maxima)
+
+    for name, value in snapshot["gauges"].items():
+        lines.append(f"# TYPE tf_{name} gauge")
+        lines.append(f"tf_{name} {_number(value)}")
+    lines.append("# TYPE tf_last_result_age_seconds gauge")
+    lines.append(f"tf_last_result_age_seconds {_number(snapshot['last_result_age_s'])}")
+    return "\n".join(lines) + "\n"
+
+
+class RotatingJsonl:
+    # Size-based rotation: path -> path.1 -> ... -> path.<backups>, oldest dropped.
+    def __init__(self, path: str, max_bytes: int = 5_000_000, backups: int = 3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = max(0, backups)
+        self._file = open(path, "a", encoding="utf-8")
+        self.lines = 0
+
+    def write(self, line: str) -> None:
+        if self.max_bytes > 0 and self._file.tell() + len(line) + 1 > self.max_bytes and self._file.tell() > 0:
+            self._rotate()
+        self._file.write(line)
+        self._file.write("\n")
+        self._file.flush()
+        self.lines += 1
+
+    def _rotate(self) -> None:
+        self._file.close()
+        if self.backups == 0:
+            os.remove(self.path)
+        else:
+            for index in range(self.backups - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class TelemetryExporter:
+    # The selector only enqueues finished draw results. The telemetry thread owns its own PerfCollector,
+    # summarizes it once per interval and swaps the rendered text in as one tuple, so a scrape is a
+    # reference load plus a socket write no matter how long the session has run.
+    def __init__(
+        self,
+        http_port: Optional[int] = None,
+        jsonl_path: str = "",
+        interval: float = 1.0,
+        max_bytes: int = 5_000_000,
+        backups: int = 3,
+        gauges: Optional[Dict[str, Callable[[], object]]] = None,
+        host: str = "127.0.0.1",
+        collector: Optional[PerfCollector] = None,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+        log: Callable[[str], None] = print,
+    ):
+        self._http_port = http_port
+        self._host = host
+        self._jsonl_path = jsonl_path
+        self._interval = max(0.05, interval)
+        self._max_bytes = max_bytes
+        self._backups = backups
+        self._gauges = dict(gauges or {})
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._log = log
+        self.collector = collector or PerfCollector(clock=clock)
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._jsonl: Optional[RotatingJsonl] = None
+        self._server = None
+        self._threads: List[threading.Thread] = []
+        self._last_result_at: Optional[float] = None
+        # (published_at, prometheus text, json line); replaced wholesale, never mutated.
+        self._current: Tuple[float, bytes, str] = (clock(), b"", "{}")
+        self.running = False
+        self.published = 0
+        self.scrapes = 0
+
+    @property
+    def server_address(self) -> Optional[Tuple[str, int]]:
+        return self._server.server_address[:2] if self._server is not None else None
+
+    def add_gauge(self, name: str, read: Callable[[], object]) -> None:
+        self._gauges[name] = read
+
+    def submit(self, result: dict) -> None:
+        # Results are dropped until start() succeeds so a failed bind cannot grow the queue.
+        if self.running:
+            self._queue.put(result)
+
+    def start(self) -> None:
+        if self._jsonl_path:
+            self._jsonl = RotatingJsonl(self._jsonl_path, self._max_bytes, self._backups)
+        if self._http_port is not None:
+            # http.server pulls in email and friends; only pay for it when the endpoint is enabled.
+            from http.server import ThreadingHTTPServer
+
+            self._server = ThreadingHTTPServer((self._host, self._http_port), self._handler_class())
+            self._server.daemon_threads = True
+            self._spawn("telemetry-http", self._server.serve_forever)
+        self.publish()
+        self._spawn("telemetry", self._loop)
+        self.running = True
+
+    def _spawn(self, name: str, target) -> None:
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self) -> None:
+        self.running = False
+        self._queue.put(_STOP)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        if self._jsonl is not None:
+            self._jsonl.close()
+
+    def _loop(self) -> None:
+        clock = self._clock
+        next_publish = clock() + self._interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, next_publish - clock()))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                break
+            if item is not None:
+                self.record(item)
+            now = clock()
+            if now >= next_publish:
+                self.publish()
+                next_publish = now + self._interval
+
+    def record(self, result: dict) -> None:
+        self.collector.record(result)
+        self._last_result_at = self._clock()
+
+    def run_pending(self) -> int:
+        handled = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return handled
+            if item is _STOP:
+                return handled
+            self.record(item)
+            handled += 1
+
+    def snapshot(self) -> dict:
+        now = self._clock()
+        snap = self.collector.snapshot()
+        gauges = {}
+        for name, read in self._gauges.items():
+            try:
+                gauges[name] = read()
+            except Exception as exc:
+                gauges[name] = None
+                self._log(f"遥测指标 {name} 读取失败：{exc}")
+        snap["gauges"] = gauges
+        snap["last_result_age_s"] = None if self._last_result_at is None else round(now - self._last_result_at, 3)
+        snap["ts"] = round(self._wall_clock(), 3)
+        return snap
+
+    def publish(self) -> None:
+        snap = self.snapshot()
+        line = json.dumps(snap, ensure_ascii=False, separators=(",", ":"))
+        self._current = (self._clock(), render_prometheus(snap).encode("utf-8"), line)
+        self.published += 1
+        if self._jsonl is not None:
+            try:
+                self._jsonl.write(line)
+            except OSError as exc:
+                self._log(f"遥测文件写入失败：{exc}")
+
+    def scrape(self) -> bytes:
+        published_at, body, _ = self._current
+        self.scrapes += 1
+        age = self._clock() - published_at
+        return body + f"# TYPE tf_snapshot_age_seconds gauge\ntf_snapshot_age_seconds {age:.3f}\n".encode("ascii")
+
+    def latest_json(self) -> str:
+        return self._current[2]
+
+    def _handler_class(self):
+        from http.server import BaseHTTPRequestHandler
+
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = exporter.scrape(), CONTENT_TYPE
+                elif self.path == "/snapshot":
+                    body, content_type = exporter.latest_json().encode("utf-8"), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def format_stats(self) -> str:
+        lines = self._jsonl.lines if self._jsonl is not None else 0
+        return f"published={self.published} scrapes={self.scrapes} jsonl_lines={lines} address={self.server_address}"
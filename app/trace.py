@@ -0,0 +1,281 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, fields, replace
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+from app.capture import FrameSource, PatchBuffer
+from app.color_lut import CARD_COLORS
+from app.config import AppConfig, ColorThresholds, TimingConfig
+
+TRACE_MAGIC = b"TFTRACE1"
+TRACE_VERSION = 1
+# magic, version, record size, record count, bytes used; rewritten after every flushed batch.
+HEADER = struct.Struct("<8sHHQQ")
+HEADER_SIZE = 32
+# ts, kind, color, flag, code, request_id, a, b, payload length; the payload follows the record.
+RECORD = struct.Struct("<dBBBBiiiH")
+
+EV_POLL = 1
+EV_REQUEST = 2
+EV_RESULT = 3
+EV_KEY = 4
+EV_FOCUS = 5
+# JSON payload with the colours, timing and tuner state the session ran with; written before the first poll.
+EV_CONFIG = 6
+
+COLOR_CODES = {color: index + 1 for index, color in enumerate(CARD_COLORS)}
+COLOR_BY_CODE = {code: color for color, code in COLOR_CODES.items()}
+FAIL_REASONS = ("", "paused", "inactive_window", "timeout_no_confirm", "timeout_no_match")
+REASON_CODES = {reason: index for index, reason in enumerate(FAIL_REASONS)}
+UNKNOWN_REASON = 255
+
+
+class TraceEvent(NamedTuple):
+    ts: float
+    kind: int
+    color: int
+    flag: int
+    code: int
+    request_id: int
+    a: int
+    b: int
+    payload: bytes = b""
+
+    @property
+    def color_name(self) -> Optional[str]:
+        return COLOR_BY_CODE.get(self.color)
+
+    @property
+    def rgb(self) -> Tuple[int, int, int]:
+        return (self.a >> 16) & 0xFF, (self.a >> 8) & 0xFF, self.a & 0xFF
+
+    @property
+    def fail_reason(self) -> str:
+        return FAIL_REASONS[self.code] if self.code < len(FAIL_REASONS) else "unknown"
+
+
+class TraceRecorder:
+    # Producers only append a tuple to a deque; packing and file I/O happen on the writer thread.
+    def __init__(
+        self,
+        path: str,
+        ring_capacity: int = 65536,
+        initial_records: int = 1 << 16,
+        flush_interval: float = 0.05,
+    ):
+        self._path = path
+        self._ring_capacity = ring_capacity
+        self._flush_interval = flush_interval
+        self._pending: deque = deque()
+        self._queue_lock = threading.Lock()
+        self._count = 0
+        self.dropped = 0
+        self._stop_event = threading.Event()
+        self._io_lock = threading.Lock()
+        self._file = open(path, "w+b")
+        self._used = HEADER_SIZE
+        self._capacity_bytes = 0
+        self._map: Optional[mmap.mmap] = None
+        self._resize(HEADER_SIZE + max(1, initial_records) * RECORD.size)
+        self._thread = threading.Thread(target=self._loop, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def record(
+        self,
+        kind: int,
+        ts: float,
+        color: int = 0,
+        flag: int = 0,
+        code: int = 0,
+        request_id: int = 0,
+        a: int = 0,
+        b: int = 0,
+        payload: bytes = b"",
+    ) -> None:
+        with self._queue_lock:
+            if len(self._pending) >= self._ring_capacity:
+                self.dropped += 1
+                return
+            self._pending.append((ts, kind, color, flag, code, request_id, a, b, payload))
+
+    def poll(self, ts: float, rgb: Tuple[int, int, int], patch: Optional[PatchBuffer] = None) -> None:
+        r, g, b = rgb
+        if patch is None:
+            self.record(EV_POLL, ts, a=(r << 16) | (g << 8) | b)
+        else:
+            self.record(EV_POLL, ts, code=patch.width, a=(r << 16) | (g << 8) | b, payload=bytes(patch.data))
+
+    def request(self, ts: float, request_id: int, color: str, x: int, y: int) -> None:
+        self.record(EV_REQUEST, ts, COLOR_CODES.get(color, 0), request_id=request_id, a=x, b=y)
+
+    def result(self, ts: float, request_id: int, color: str, success: bool, fail_reason: str) -> None:
+        code = REASON_CODES.get(fail_reason, UNKNOWN_REASON)
+        self.record(EV_RESULT, ts, COLOR_CODES.get(color, 0), int(success), code, request_id)
+
+    def key(self, ts: float, is_lock_press: bool, request_id: Optional[int]) -> None:
+        self.record(EV_KEY, ts, flag=int(is_lock_press), request_id=request_id or 0)
+
+    def focus(self, ts: float, is_active: bool) -> None:
+        self.record(EV_FOCUS, ts, flag=int(is_active))
+
+    def config(self, ts: float, app_config: AppConfig, tuning: Optional[dict] = None) -> None:
+        self.record(EV_CONFIG, ts, payload=encode_config(app_config, tuning))
+
+    def _resize(self, capacity_bytes: int) -> None:
+        if self._map is not None:
+            self._map.close()
+        self._file.truncate(capacity_bytes)
+        self._map = mmap.mmap(self._file.fileno(), capacity_bytes)
+        self._capacity_bytes = capacity_bytes
+        self._write_header()
+
+    def _write_header(self) -> None:
+        HEADER.pack_into(self._map, 0, TRACE_MAGIC, TRACE_VERSION, RECORD.size, self._count, self._used)
+
+    def flush(self) -> None:
+        with self._io_lock:
+            pending = self._pending
+            if not pending:
+                return
+            pack_into = RECORD.pack_into
+            size = RECORD.size
+            while pending:
+                fields = pending.popleft()
+                payload = fields[-1]
+                end = self._used + size + len(payload)
+                if end > self._capacity_bytes:
+                    self._resize(max(end, self._capacity_bytes * 2))
+                pack_into(self._map, self._used, *fields[:-1], len(payload))
+                self._map[self._used + size:end] = payload
+                self._used = end
+                self._count += 1
+            self._write_header()
+
+    def _loop(self) -> None:
+        while not self._stop_event.wait(self._flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        self._stop_event.set()
+        self._thread.join(timeout=1.0)
+        self.flush()
+        with self._io_lock:
+            self._map.flush()
+            self._map.close()
+            self._map = None
+            self._file.truncate(self._used)
+            self._file.close()
+
+
+_untraced = threading.local()
+
+
+@contextmanager
+def untraced():
+    # Warm-up and calibration grabs on this thread are not polls of a draw; replay would consume them as such.
+    _untraced.depth = getattr(_untraced, "depth", 0) + 1
+    try:
+        yield
+    finally:
+        _untraced.depth -= 1
+
+
+class TracingFrameSource(FrameSource):
+    # Records the centre colour and the full patch per grab; replay restores the patch when its size matches.
+    def __init__(self, inner: FrameSource, recorder: TraceRecorder, clock: Callable[[], float] = time.perf_counter):
+        self._inner = inner
+        self._recorder = recorder
+        self._clock = clock
+
+    def grab(self, patch: PatchBuffer) -> bool:
+        if not self._inner.grab(patch):
+            return False
+        if getattr(_untraced, "depth", 0):
+            return True
+        self._recorder.poll(self._clock(), patch.rgb_at(patch.width // 2, patch.height // 2), patch)
+        return True
+
+    def get_pixel(self, px: int, py: int) -> Tuple[int, int, int]:
+        rgb = self._inner.get_pixel(px, py)
+        if not getattr(_untraced, "depth", 0):
+            self._recorder.poll(self._clock(), rgb)
+        return rgb
+
+    def close(self) -> None:
+        self._inner.close()
+
+
+def encode_config(app_config: AppConfig, tuning: Optional[dict] = None) -> bytes:
+    data = {
+        "colors": asdict(app_config.colors),
+        "timing": asdict(app_config.timing),
+        "adaptive_tuning": app_config.adaptive_tuning,
+        "tuning": tuning,
+    }
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode_config(payload: bytes, base: Optional[AppConfig] = None) -> Tuple[AppConfig, Optional[dict]]:
+    # Fields a newer or older build does not know are skipped; the rest keep the base defaults.
+    base = base or AppConfig()
+    data = json.loads(payload.decode("utf-8"))
+    colors = {f.name: data["colors"][f.name] for f in fields(ColorThresholds) if f.name in data.get("colors", {})}
+    timing = {f.name: data["timing"][f.name] for f in fields(TimingConfig) if f.name in data.get("timing", {})}
+    if "roi_regions" in timing:
+        timing["roi_regions"] = tuple(tuple(region) for region in timing["roi_regions"])
+    app_config = replace(
+        base,
+        colors=replace(base.colors, **colors),
+        timing=replace(base.timing, **timing),
+        adaptive_tuning=bool(data.get("adaptive_tuning", base.adaptive_tuning)),
+    )
+    return app_config, data.get("tuning")
+
+
+def iter_trace(path: str) -> Iterator[TraceEvent]:
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER_SIZE:
+        raise ValueError("trace file is truncated")
+    magic, version, record_size, count, used = HEADER.unpack_from(data, 0)
+    if magic != TRACE_MAGIC or version != TRACE_VERSION or record_size != RECORD.size:
+        raise ValueError(f"unsupported trace file: {magic!r} v{version}")
+    # A crashed writer leaves the header behind the data; never read past either.
+    end = min(used, len(data))
+    offset = HEADER_SIZE
+    unpack_from = RECORD.unpack_from
+    size = RECORD.size
+    while count and offset + size <= end:
+        *fields, payload_len = unpack_from(data, offset)
+        offset += size
+        if offset + payload_len > end:
+            break
+        yield TraceEvent(*fields, payload=data[offset:offset + payload_len])
+        offset += payload_len
+        count -= 1
+
+
+def read_trace(path: str) -> List[TraceEvent]:
+    return list(iter_trace(path))
+
+
+def open_trace_file(path: str) -> Optional[TraceRecorder]:
+    if not path:
+        return None
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    return TraceRecorder(path)
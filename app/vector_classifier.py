@@ -0,0 +1,65 @@
+import importlib.util
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict
+
+from app.capture import BYTES_PER_PIXEL, PatchBuffer
+from app.config import ColorThresholds
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Offline analysis only (screenshots, recorded patches, ColorDetector.count_patch_colors): the poll path
+# classifies 3x3 patches through the LUT, where converting to an array costs more than it saves.
+# numpy is an optional extra; callers check HAS_NUMPY. It is imported on first use, not at startup.
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+_np = None
+
+
+@dataclass(frozen=True)
+class ClassifyResult:
+    masks: Dict[str, "np.ndarray"]
+    counts: Dict[str, int]
+
+
+def _require_numpy():
+    global _np
+    if _np is None:
+        if not HAS_NUMPY:
+            raise RuntimeError("vectorized classifier requires numpy (uv sync --extra fast)")
+        import numpy
+
+        _np = numpy
+    return _np
+
+
+def patch_to_rgb(patch: PatchBuffer) -> "np.ndarray":
+    np = _require_numpy()
+    bgra = np.frombuffer(patch.data, dtype=np.uint8).reshape(patch.height, patch.width, BYTES_PER_PIXEL)
+    return bgra[:, :, 2::-1]
+
+
+def color_masks(pixels: "np.ndarray", thresholds: ColorThresholds) -> Dict[str, "np.ndarray"]:
+    _require_numpy()
+    if pixels.ndim != 3 or pixels.shape[2] < 3:
+        raise ValueError(f"expected HxWx3 array, got shape {pixels.shape}")
+
+    r = pixels[:, :, 0]
+    g = pixels[:, :, 1]
+    b = pixels[:, :, 2]
+    t = thresholds
+    return {
+        "黄": (r >= t.yellow_min_r) & (g >= t.yellow_min_g) & (b <= t.yellow_max_b),
+        "蓝": (r <= t.blue_max_r) & (g <= t.blue_max_g) & (b >= t.blue_min_b),
+        "红": (r >= t.red_min_r) & (g <= t.red_max_g) & (b <= t.red_max_b),
+    }
+
+
+def classify_array(pixels: "np.ndarray", thresholds: ColorThresholds) -> ClassifyResult:
+    np = _require_numpy()
+    masks = color_masks(pixels, thresholds)
+    counts = {color: int(np.count_nonzero(mask)) for color, mask in masks.items()}
+    return ClassifyResult(masks=masks, counts=counts)
+
+
+def classify_patch(patch: PatchBuffer, thresholds: ColorThresholds) -> ClassifyResult:
+    return classify_array(patch_to_rgb(patch), thresholds)
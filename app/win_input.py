@@ -1,4 +1,5 @@
-from ctypes import POINTER, Structure, Union, byref, c_long, c_short, c_ulong, c_ushort, pointer, sizeof, windll
+import ctypes
+from ctypes import POINTER, Structure, Union, byref, c_long, c_short, c_ulong, c_ushort, pointer, sizeof
 
 PUL = POINTER(c_ulong)
 
@@ -42,13 +43,13 @@ class Point(Structure):
 
 def get_mouse_position():
     orig = Point()
-    windll.user32.GetCursorPos(byref(orig))
+    ctypes.windll.user32.GetCursorPos(byref(orig))
     return int(orig.x), int(orig.y)
 
 
 def set_mouse_position(pos):
     x, y = pos
-    windll.user32.SetCursorPos(x, y)
+    ctypes.windll.user32.SetCursorPos(x, y)
 
 
 def move_click(pos, move_back=False):
@@ -65,7 +66,7 @@ def move_click(pos, move_back=False):
     up.mi = MouseInput(0, 0, 0, 4, 0, pointer(extra))
 
     packet = inputs_type((0, down), (0, up))
-    windll.user32.SendInput(2, pointer(packet), sizeof(packet[0]))
+    ctypes.windll.user32.SendInput(2, pointer(packet), sizeof(packet[0]))
 
     if move_back:
         set_mouse_position((origx, origy))
@@ -86,4 +87,4 @@ def sendkey(scancode, pressed):
         key_input.ki.dwFlags |= 0x2
 
     packet = inputs_type((1, key_input))
-    windll.user32.SendInput(1, pointer(packet), sizeof(packet[0]))
+    ctypes.windll.user32.SendInput(1, pointer(packet), sizeof(packet[0]))
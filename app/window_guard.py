@@ -1,87 +1,116 @@
 import threading
 import time
-from typing import Optional
-
-import psutil
-import win32gui
-import win32process
+from typing import Callable, Optional
 
+from app.backends import create_backend, default_backend
 from app.config import AppConfig
+from app.focus import FocusSource, PollingFocusSource, find_window
+from app.process_cache import ProcessNameCache
 from app.state import SharedState
+from app.trace import TraceRecorder
 
 
 class WindowGuard:
-    def __init__(self, config: AppConfig, state: SharedState):
+    def __init__(
+        self,
+        config: AppConfig,
+        state: SharedState,
+        source: Optional[FocusSource] = None,
+        process_names: Optional[ProcessNameCache] = None,
+        clock: Callable[[], float] = time.perf_counter,
+        trace: Optional[TraceRecorder] = None,
+        log: Callable[[str], None] = print,
+    ):
         self._config = config
         self._state = state
+        self._log = log
+        self._source = source or self._default_source()
+        if process_names is None:
+            process_names = ProcessNameCache(config.timing.process_cache_size)
+        self._process_names = process_names
+        self._clock = clock
+        self._trace = trace
         self._active_event = threading.Event()
-        self._stop_event = threading.Event()
-        self._thread: Optional[threading.Thread] = None
-        self._last_pid: Optional[int] = None
-        self._last_name: str = ""
-        self._last_check_ts: float = 0.0
-
-    def _get_process_name_cached(self, pid: int, now: float) -> str:
-        if (
-            self._last_pid == pid
-            and (now - self._last_check_ts) <= self._config.timing.window_pid_cache_ttl
-        ):
-            return self._last_name
+        self._lock = threading.Lock()
 
-        try:
-            name = psutil.Process(pid).name()
-        except psutil.NoSuchProcess:
-            name = ""
+    def _default_source(self) -> FocusSource:
+        name = self._config.focus_backend or default_backend("focus")
+        if name == "polling" or (name == "winevent" and not self._config.timing.window_focus_hook):
+            return self._polling_source()
+        if name == "winevent":
+            return create_backend("focus", name, log=self._log)
+        return create_backend("focus", name)
+
+    def _polling_source(self) -> FocusSource:
+        timing = self._config.timing
+        return PollingFocusSource(timing.window_poll_active_interval, timing.window_poll_inactive_interval)
+
+    @property
+    def source(self) -> FocusSource:
+        return self._source
 
-        self._last_pid = pid
-        self._last_name = name
-        self._last_check_ts = now
-        return name
+    @property
+    def process_names(self) -> ProcessNameCache:
+        return self._process_names
+
+    @property
+    def active(self) -> bool:
+        return self._active_event.is_set()
 
     def start(self):
-        self._thread = threading.Thread(target=self._loop, daemon=True)
-        self._thread.start()
+        try:
+            self._source.start(self._on_foreground_change)
+        except OSError as exc:
+            self._log(f"前台窗口事件不可用（{exc}），改为轮询检测")
+            self._source = self._polling_source()
+            self._source.start(self._on_foreground_change)
 
     def stop(self):
-        self._stop_event.set()
-        if self._thread is not None:
-            self._thread.join(timeout=0.5)
+        self._source.stop()
 
-    def refresh_active_window_state(self) -> bool:
-        is_active = False
-        now = time.perf_counter()
-        hwnd = win32gui.GetForegroundWindow()
-        if hwnd:
-            _, pid = win32process.GetWindowThreadProcessId(hwnd)
-            process_name = self._get_process_name_cached(pid, now)
-            is_active = process_name.lower() == self._config.target_process_name.lower()
+    def _on_foreground_change(self, pid: Optional[int], hwnd: Optional[int] = None) -> bool:
+        with self._lock:
+            now = self._clock()
+            is_active = False
+            if pid:
+                process_name = self._process_names.lookup(pid, hwnd)
+                is_active = process_name.lower() == self._config.target_process_name.lower()
 
-        self._state.update_window_activity(is_active, now)
+            self._state.update_window_activity(is_active, now)
+            if self._trace is not None:
+                self._trace.focus(now, is_active)
 
-        if is_active:
-            self._active_event.set()
-        else:
-            self._active_event.clear()
+            if is_active:
+                self._active_event.set()
+            else:
+                self._active_event.clear()
 
-        return is_active
+            return is_active
+
+    def find_target_window(self, find: Callable = find_window):
+        target = self._config.target_process_name.lower()
+        try:
+            return find(lambda pid, hwnd: self._process_names.lookup(pid, hwnd).lower() == target)
+        except ImportError:
+            return None
+
+    def prewarm(self) -> bool:
+        # Resolves the current foreground process so the first draw finds its name already cached.
+        return self.refresh_active_window_state()
+
+    def refresh_active_window_state(self) -> bool:
+        return self._on_foreground_change(*self._source.current_window())
 
     def is_allowed(self) -> bool:
         if self._active_event.is_set():
             return True
+        if self._source.event_driven:
+            return False
 
-        now = time.perf_counter()
+        # Polling can lag a focus switch by one interval; re-check right after the target lost focus.
+        now = self._clock()
         last_true_ts = self._state.last_active_true_ts()
         if now - last_true_ts <= self._config.timing.focus_recovery_window:
             return self.refresh_active_window_state()
 
         return False
-
-    def _loop(self):
-        while not self._stop_event.is_set():
-            is_active = self.refresh_active_window_state()
-            interval = (
-                self._config.timing.window_poll_active_interval
-                if is_active
-                else self._config.timing.window_poll_inactive_interval
-            )
-            self._stop_event.wait(interval)
@@ -0,0 +1,73 @@
+import argparse
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.capture import SyntheticFrameSource  # noqa: E402
+from app.color_detector import ColorDetector  # noqa: E402
+from app.config import ColorThresholds  # noqa: E402
+
+
+def _per_pixel_hits(detector: ColorDetector, px: int, py: int, radius: int, target_color: str) -> int:
+    hits = 0
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            r, g, b = detector.get_rgb(px + dx, py + dy)
+            if detector.color_matches_target(r, g, b, target_color):
+                hits += 1
+    return hits
+
+
+def _time_per_call(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-poll sampling cost: per-pixel reads vs batched patch grab")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--radius", type=int, default=1)
+    parser.add_argument("--source", choices=("auto", "gdi", "synthetic"), default="auto")
+    args = parser.parse_args()
+
+    source_name = args.source
+    if source_name == "auto":
+        source_name = "gdi" if platform.system().lower().startswith("win") else "synthetic"
+
+    if source_name == "gdi":
+        from app.capture import GdiFrameSource
+
+        source = GdiFrameSource()
+        px, py = 827, 975
+    else:
+        source = SyntheticFrameSource(fill=(30, 30, 30))
+        px, py = 100, 100
+
+    # min_hits above the patch size disables early exit so both paths touch every pixel.
+    side = 2 * args.radius + 1
+    detector = ColorDetector(
+        ColorThresholds(),
+        0.0,
+        sample_radius_px=args.radius,
+        sample_min_hits=side * side + 1,
+        frame_source=source,
+    )
+
+    per_pixel_us = _time_per_call(lambda: _per_pixel_hits(detector, px, py, args.radius, "黄"), args.iterations)
+    batched_us = _time_per_call(lambda: detector._match_hits_fast(px, py, "黄"), args.iterations)
+
+    print(f"source={source_name} radius={args.radius} patch={side}x{side} iterations={args.iterations}")
+    print(f"per_pixel={per_pixel_us:.2f}us/poll batched={batched_us:.2f}us/poll speedup={per_pixel_us / batched_us:.1f}x")
+    if source_name != "gdi":
+        # A synthetic pixel read is a bytearray index, not a GetPixel round trip per pixel, so the
+        # comparison above only covers the Python-side work; the capture gain needs --source gdi on Windows.
+        print("note: synthetic source has no per-pixel capture cost; run with --source gdi on Windows for the capture speedup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import json
+import os
+import sys
+from dataclasses import replace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import AppConfig  # noqa: E402
+from app.perf import StageTimers  # noqa: E402
+from app.simulation import CardCycleConfig, CardCycleSimulator  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless W card-cycle benchmark for the selector")
+    parser.add_argument("--draws", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--card-period", type=float, default=CardCycleConfig.card_period)
+    parser.add_argument("--jitter", type=float, default=CardCycleConfig.period_jitter)
+    parser.add_argument("--transition-frames", type=int, default=CardCycleConfig.transition_frames)
+    parser.add_argument("--noise", type=float, default=CardCycleConfig.color_noise)
+    parser.add_argument("--lock-delay", type=float, default=CardCycleConfig.lock_delay)
+    parser.add_argument("--vfx-rate", type=float, default=CardCycleConfig.vfx_rate, help="per-frame chance of a particle effect")
+    parser.add_argument("--poll-strategy", choices=("sleep", "hybrid", "spin"), default=None)
+    parser.add_argument("--phase-tracking", action="store_true", help="predict the card phase and poll around it")
+    parser.add_argument("--multi-roi", action="store_true", help="sample and vote across several icon regions")
+    parser.add_argument("--stages", action="store_true", help="time each poll-loop stage (wall clock)")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    cycle = CardCycleConfig(
+        card_period=args.card_period,
+        period_jitter=args.jitter,
+        transition_frames=args.transition_frames,
+        color_noise=args.noise,
+        lock_delay=args.lock_delay,
+        vfx_rate=args.vfx_rate,
+    )
+    app_config = AppConfig()
+    if args.poll_strategy:
+        app_config = replace(app_config, timing=replace(app_config.timing, poll_strategy=args.poll_strategy))
+    if args.phase_tracking:
+        app_config = replace(app_config, timing=replace(app_config.timing, phase_tracking_enabled=True))
+    if args.multi_roi:
+        app_config = replace(app_config, timing=replace(app_config.timing, multi_roi_enabled=True))
+
+    stages = StageTimers() if args.stages else None
+    report = CardCycleSimulator(app_config=app_config, cycle=cycle, seed=args.seed, stages=stages).run(args.draws)
+    if args.json:
+        print(json.dumps(report.summary(), ensure_ascii=False, sort_keys=True))
+    else:
+        print(report.format())
+        if stages is not None:
+            print(f"stages: {stages.format_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+import time
+from dataclasses import replace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.capture import SyntheticFrameSource  # noqa: E402
+from app.change_gate import ChangeGate  # noqa: E402
+from app.color_detector import ColorDetector  # noqa: E402
+from app.color_lut import build_lut  # noqa: E402
+from app.config import AppConfig  # noqa: E402
+from app.simulation import CardCycleConfig, CardCycleSimulator  # noqa: E402
+
+
+def measure_static(polls: int, radius: int, gated: bool):
+    config = AppConfig()
+    slept = []
+    # Virtual time: polls are a fast poll interval apart, and the confirmation sleep advances the clock.
+    now = [0.0]
+
+    def sleep(seconds):
+        slept.append(seconds)
+        now[0] += seconds
+
+    detector = ColorDetector(
+        config.colors,
+        config.timing.double_sample_gap,
+        sample_radius_px=radius,
+        frame_source=SyntheticFrameSource(fill=(222, 188, 62)),
+        lut=build_lut(config.colors),
+        sleep=sleep,
+        change_gate=ChangeGate() if gated else None,
+        clock=lambda: now[0],
+    )
+    interval = config.timing.card_poll_fast_interval
+    t0 = time.perf_counter()
+    for _ in range(polls):
+        now[0] += interval
+        detector.match_target_fast(827, 975, "黄")
+    per_poll_us = (time.perf_counter() - t0) / polls * 1_000_000
+    return per_poll_us, sum(slept) / polls * 1000, detector.change_gate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-poll cost with and without the frame-difference change gate")
+    parser.add_argument("--polls", type=int, default=20000)
+    parser.add_argument("--radius", type=int, default=3)
+    parser.add_argument("--draws", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for gated in (False, True):
+        per_poll_us, slept_ms, gate = measure_static(args.polls, args.radius, gated)
+        stats = gate.format_stats() if gate is not None else "gate=off"
+        print(f"static {'gated' if gated else 'plain'}: {per_poll_us:.2f}us/poll sleep={slept_ms:.3f}ms/poll {stats}")
+
+    cycle = CardCycleConfig(static_frames=True)
+    base = AppConfig()
+    for gated in (False, True):
+        app_config = replace(base, timing=replace(base.timing, change_gate_enabled=gated))
+        sim = CardCycleSimulator(app_config=app_config, cycle=cycle, seed=args.seed)
+        report = sim.run(args.draws)
+        gate = sim.color_detector.change_gate
+        stats = gate.format_stats() if gate is not None else "gate=off"
+        print(f"cycle  {'gated' if gated else 'plain'}: {report.format()} {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.log_sink import DROP_NEWEST, DROP_POLICIES, LogSink  # noqa: E402
+from app.perf import LatencyHistogram  # noqa: E402
+
+
+class SlowStream:
+    # Stands in for a Windows console that blocks while the window is selected or scrolled.
+    def __init__(self, write_cost: float):
+        self.write_cost = write_cost
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        time.sleep(self.write_cost)
+        self.writes += 1
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+def measure(log, draws: int, draw_interval: float) -> LatencyHistogram:
+    # Mimics the selector: one result line per draw, timing only how long the log call blocks.
+    blocked = LatencyHistogram()
+    perf = time.perf_counter
+    for i in range(draws):
+        t0 = perf()
+        log(f"抽牌成功 color=黄 req={i} first_match=41ms lock=96ms")
+        blocked.record(round((perf() - t0) * 1_000_000))
+        time.sleep(draw_interval)
+    return blocked
+
+
+def describe(name: str, blocked: LatencyHistogram) -> str:
+    p50, p99 = blocked.percentiles((0.5, 0.99))
+    return f"{name}: blocked p50={p50}us p99={p99}us max={blocked.max_value}us total={blocked.total / 1000:.1f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the selector spends blocked on a slow console")
+    parser.add_argument("--draws", type=int, default=200)
+    parser.add_argument("--draw-interval", type=float, default=0.002)
+    parser.add_argument("--write-ms", type=float, default=5.0)
+    parser.add_argument("--capacity", type=int, default=64)
+    parser.add_argument("--policy", choices=DROP_POLICIES, default=DROP_NEWEST)
+    args = parser.parse_args()
+
+    stream = SlowStream(args.write_ms / 1000)
+    print(describe("sync  ", measure(lambda line: print(line, file=stream), args.draws, args.draw_interval)))
+
+    stream = SlowStream(args.write_ms / 1000)
+    sink = LogSink(args.capacity, args.policy, stream=stream)
+    sink.start()
+    blocked = measure(sink, args.draws, args.draw_interval)
+    sink.close()
+    print(f"{describe('async ', blocked)} writes={stream.writes} {sink.format_stats()}")
+
+    # A burst far larger than the queue: the producer still never waits, the overflow is counted.
+    stream = SlowStream(args.write_ms / 1000)
+    sink = LogSink(args.capacity, args.policy, stream=stream)
+    sink.start()
+    blocked = measure(sink, args.capacity * 10, 0.0)
+    sink.close()
+    print(f"{describe('burst ', blocked)} writes={stream.writes} {sink.format_stats()}")
+
+
+if __name__ == "__main__":
+    main()
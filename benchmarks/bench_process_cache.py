@@ -0,0 +1,102 @@
+import argparse
+import os
+import random
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.process_cache import ProcessNameCache  # noqa: E402
+
+
+class SingleEntryCache:
+    # Reproduces the previous behaviour: one (pid, name) pair with a TTL.
+    def __init__(self, psutil_module, ttl: float = 0.2):
+        self._psutil = psutil_module
+        self._ttl = ttl
+        self._last_pid = None
+        self._last_name = ""
+        self._last_check_ts = 0.0
+
+    def lookup(self, pid: int, hwnd=None) -> str:
+        now = time.perf_counter()
+        if self._last_pid == pid and now - self._last_check_ts <= self._ttl:
+            return self._last_name
+        try:
+            name = self._psutil.Process(pid).name()
+        except self._psutil.Error:
+            name = ""
+        self._last_pid = pid
+        self._last_name = name
+        self._last_check_ts = now
+        return name
+
+
+def _simulated_psutil(name_cost: float, create_time_cost: float):
+    def busy(duration):
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            pass
+
+    class Process:
+        # psutil.Process(pid) opens the process and reads its create time to fix its identity, so
+        # every construction pays that cost, hit or miss; create_time() then returns the stored value.
+        def __init__(self, pid):
+            busy(create_time_cost)
+            self._pid = pid
+
+        def create_time(self):
+            return float(self._pid)
+
+        def name(self):
+            busy(name_cost)
+            return f"proc{self._pid}.exe"
+
+    return types.SimpleNamespace(Process=Process, Error=Exception)
+
+
+def _focus_sequence(pids, switches, seed):
+    rng = random.Random(seed)
+    return [rng.choice(pids) for _ in range(switches)]
+
+
+def _run(cache, sequence):
+    t0 = time.perf_counter()
+    for pid in sequence:
+        # One window per process, as when alt-tabbing between applications.
+        cache.lookup(pid, pid * 10)
+    return (time.perf_counter() - t0) / len(sequence) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pid -> process name lookup cost under frequent focus switching")
+    parser.add_argument("--switches", type=int, default=5000)
+    parser.add_argument("--windows", type=int, default=4, help="distinct processes the user alt-tabs between")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--real", action="store_true", help="use psutil against live processes instead of a cost model")
+    parser.add_argument("--name-cost-us", type=float, default=60.0)
+    parser.add_argument("--create-time-cost-us", type=float, default=8.0)
+    args = parser.parse_args()
+
+    if args.real:
+        import psutil
+
+        psutil_module = psutil
+        pids = psutil.pids()[: args.windows]
+    else:
+        psutil_module = _simulated_psutil(args.name_cost_us / 1e6, args.create_time_cost_us / 1e6)
+        pids = list(range(100, 100 + args.windows))
+
+    sequence = _focus_sequence(pids, args.switches, args.seed)
+    single_us = _run(SingleEntryCache(psutil_module), sequence)
+    lru = ProcessNameCache(psutil_module=psutil_module)
+    lru_us = _run(lru, sequence)
+
+    print(f"switches={len(sequence)} windows={len(pids)} source={'psutil' if args.real else 'model'}")
+    print(f"single_entry_ttl: {single_us:.1f}us/lookup")
+    print(f"lru(pid,create_time): {lru_us:.1f}us/lookup {lru.format_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+METRICS = ("import_ms", "ready_ms", "first_draw_ms", "steady_draw_ms")
+
+
+def child(cache_dir: str, prewarm: bool, polls: int) -> None:
+    # Runs in a fresh interpreter so module imports, DCs and caches all start cold.
+    t0 = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    import main  # noqa: F401
+
+    from app.color_detector import ColorDetector
+    from app.color_lut import load_or_build_lut
+    from app.config import AppConfig
+    from app.injection import W_SCANCODE, build_injector
+    from app.prewarm import pipeline_steps, run_prewarm
+    from app.state import SharedState
+    from app.window_guard import WindowGuard
+
+    imported = time.perf_counter()
+    config = AppConfig()
+    state = SharedState()
+    window_guard = WindowGuard(config, state)
+    window_guard.start()
+    color_detector = ColorDetector(
+        config.colors,
+        config.timing.double_sample_gap,
+        sample_radius_px=config.timing.sample_radius_px,
+        lut=load_or_build_lut(config.colors, cache_dir),
+        sleep=lambda _seconds: None,
+    )
+    # Never send real key presses from a benchmark.
+    injector = build_injector(backend="recording")
+    x, y = state.get_xy()
+    result = {}
+
+    def draw():
+        start = time.perf_counter()
+        window_guard.is_allowed()
+        color_detector.match_target_fast(x, y, "黄")
+        injector.tap(W_SCANCODE, start)
+        return (time.perf_counter() - start) * 1000
+
+    def worker():
+        # Same shape as the selector worker: warm up on this thread, signal ready, then draw.
+        if prewarm:
+            run_prewarm(pipeline_steps(color_detector, window_guard, injector, x, y))
+        result["ready_ms"] = (time.perf_counter() - t0) * 1000
+        result["first_draw_ms"] = draw()
+        result["steady_draw_ms"] = statistics.median(draw() for _ in range(polls))
+
+    thread = threading.Thread(target=worker, name="selector")
+    thread.start()
+    thread.join()
+    result["import_ms"] = (imported - t0) * 1000
+    print(json.dumps(result))
+
+
+def run_child(cache_dir: str, prewarm: bool, polls: int) -> dict:
+    command = [sys.executable, os.path.abspath(__file__), "--child", "--cache-dir", cache_dir, "--polls", str(polls)]
+    if prewarm:
+        command.append("--prewarm")
+    output = subprocess.run(command, check=True, capture_output=True, text=True, cwd=ROOT).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def median_of(runs, metric: str) -> float:
+    return statistics.median(run[metric] for run in runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time, time-to-ready and first-draw latency of a cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--polls", type=int, default=50)
+    parser.add_argument("--max-import-ms", type=float, default=150.0)
+    parser.add_argument("--max-ready-ms", type=float, default=500.0)
+    parser.add_argument("--max-first-draw-ms", type=float, default=5.0)
+    parser.add_argument("--baseline", help="JSON file of medians to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run's medians to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression vs the baseline")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--prewarm", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--cache-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.cache_dir, args.prewarm, args.polls)
+        return
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        run_child(cache_dir, True, 1)  # builds the LUT cache, as a previous launch would have
+        medians = {}
+        for prewarm in (False, True):
+            runs = [run_child(cache_dir, prewarm, args.polls) for _ in range(args.runs)]
+            mode = "prewarm" if prewarm else "cold"
+            medians[mode] = {metric: round(median_of(runs, metric), 3) for metric in METRICS}
+            print(f"{mode:8s}: " + " ".join(f"{metric}={value:.2f}" for metric, value in medians[mode].items()))
+
+    warm = medians["prewarm"]
+    failures = []
+    for metric, budget in (
+        ("import_ms", args.max_import_ms),
+        ("ready_ms", args.max_ready_ms),
+        ("first_draw_ms", args.max_first_draw_ms),
+    ):
+        if warm[metric] > budget:
+            failures.append(f"{metric}={warm[metric]:.2f} exceeds budget {budget:.2f}")
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(warm, f, indent=2)
+        print(f"baseline written to {args.baseline}")
+    elif args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for metric, value in baseline.items():
+            # 1 ms of slack keeps sub-millisecond metrics from failing on scheduler noise.
+            limit = value * (1 + args.tolerance) + 1.0
+            if warm.get(metric, 0.0) > limit:
+                failures.append(f"{metric}={warm[metric]:.2f} regressed from baseline {value:.2f}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.state import SharedState  # noqa: E402
+
+
+class LockedReadState(SharedState):
+    # Reproduces the previous behaviour: every hot-path read takes the shared lock.
+    def get_worker_snapshot_fast(self):
+        with self._lock:
+            return self._state.request_id, self._state.paused, self._state.x, self._state.y
+
+    def last_active_true_ts(self):
+        with self._lock:
+            return self._state.active_last_true_ts
+
+    def is_paused(self):
+        with self._lock:
+            return self._state.paused
+
+    def is_ctrl_pressed(self):
+        with self._lock:
+            return self._state.ctrl_press
+
+
+def _run(state: SharedState, duration: float):
+    stop = threading.Event()
+    reader_ops = [0]
+    reader_max = [0.0]
+    writer_ops = {"window": 0, "hook": 0}
+
+    def selector_reader():
+        perf = time.perf_counter
+        ops = 0
+        worst = 0.0
+        while not stop.is_set():
+            t0 = perf()
+            state.get_worker_snapshot_fast()
+            state.last_active_true_ts()
+            dt = perf() - t0
+            if dt > worst:
+                worst = dt
+            ops += 1
+        reader_ops[0] = ops
+        reader_max[0] = worst
+
+    def window_writer():
+        perf = time.perf_counter
+        while not stop.is_set():
+            state.update_window_activity(True, perf())
+            writer_ops["window"] += 1
+
+    def hook_writer():
+        pressed = False
+        while not stop.is_set():
+            state.is_paused()
+            state.is_ctrl_pressed()
+            pressed = not pressed
+            state.set_ctrl_pressed(pressed)
+            writer_ops["hook"] += 1
+
+    threads = [threading.Thread(target=fn) for fn in (selector_reader, window_writer, hook_writer)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return reader_ops[0] / duration, reader_max[0] * 1_000_000, writer_ops
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SharedState read contention across selector/window/hook threads")
+    parser.add_argument("--duration", type=float, default=2.0)
+    args = parser.parse_args()
+
+    for name, factory in (("locked", LockedReadState), ("snapshot", SharedState)):
+        rate, worst_us, writers = _run(factory(), args.duration)
+        print(
+            f"{name}: reader={rate:,.0f} reads/s reader_max={worst_us:.1f}us "
+            f"window_writes={writers['window']:,} hook_ops={writers['hook']:,}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,32 @@
+import atexit
 import time
-from typing import Optional
+from dataclasses import replace
+from typing import Callable, Iterable, Optional
 
+from app.adaptive import AdaptiveController, TuningParams
+from app.backends import create_backend, default_backend
+from app.change_gate import ChangeGate
 from app.color_detector import ColorDetector
+from app.color_lut import load_or_build_lut
 from app.config import load_config
-from app.input_backend import PynputBackend
+from app.dispatcher import InputDispatcher
+from app.injection import W_SCANCODE, build_injector
 from app.input_handlers import InputHandlers
+from app.log_sink import LogSink
+from app.perf import PerfCollector, StageTimers
+from app.point_calibration import PointCalibrator
+from app.prewarm import format_prewarm, pipeline_steps, run_prewarm
+from app.profiles import Profile, ProfileStore, detect_display_key
+from app.realtime import RealtimeMode
+from app.scheduler import PollScheduler
 from app.selector import Selector
 from app.state import SharedState
-from app.win_input import sendkey
+from app.telemetry import TelemetryExporter
+from app.trace import TracingFrameSource, open_trace_file
 from app.window_guard import WindowGuard
 
 
-def build_debug_logger(enabled: bool, throttle_sec: float):
+def build_debug_logger(enabled: bool, throttle_sec: float, log: Callable[[str], None] = print):
     last_ts = {}
 
     def debug_log(bucket: str, message: str):
@@ -19,80 +34,149 @@ def build_debug_logger(enabled: bool, throttle_sec: float):
             return
         now = time.time()
         if now - last_ts.get(bucket, 0.0) >= throttle_sec:
-            print(message)
+            log(message)
             last_ts[bucket] = now
 
     return debug_log
 
 
-def build_perf_collector(enabled: bool, report_every: int):
-    stats = {
-        "count": 0,
-        "success": 0,
-        "failures": {},
-        "lock_ms": [],
-    }
+def build_perf_collector(
+    enabled: bool,
+    report_every: int,
+    reporters: Iterable[Callable[[], str]] = (),
+    exporter: Optional[TelemetryExporter] = None,
+    log: Callable[[str], None] = print,
+):
+    collector = PerfCollector(last_n=report_every)
 
     def on_result(result: dict):
+        if exporter is not None:
+            exporter.submit(result)
         if not enabled:
             return
 
-        stats["count"] += 1
-        if result.get("success"):
-            stats["success"] += 1
-        else:
-            reason = result.get("fail_reason", "unknown")
-            stats["failures"][reason] = stats["failures"].get(reason, 0) + 1
-
-        lock_ms = result.get("lock_latency_ms")
-        if lock_ms is not None:
-            stats["lock_ms"].append(lock_ms)
-
-        if stats["count"] % report_every != 0:
+        collector.record(result)
+        if collector.total % report_every != 0:
             return
 
-        lock_sorted = sorted(stats["lock_ms"])
-        if lock_sorted:
-            p50 = lock_sorted[len(lock_sorted) // 2]
-            p95 = lock_sorted[int(len(lock_sorted) * 0.95)]
-            avg = int(sum(lock_sorted) / len(lock_sorted))
-        else:
-            p50 = p95 = avg = None
-
-        success_rate = (stats["success"] / stats["count"]) * 100.0
-        print(
-            "[perf] total={total} success_rate={rate:.1f}% lock_avg={avg}ms lock_p50={p50}ms lock_p95={p95}ms failures={failures}".format(
-                total=stats["count"],
-                rate=success_rate,
-                avg=avg,
-                p50=p50,
-                p95=p95,
-                failures=stats["failures"],
-            )
-        )
+        log(collector.format_report())
+        for reporter in reporters:
+            log(reporter())
 
     return on_result
 
 
 def main():
+    started = time.perf_counter()
     config = load_config()
+    log_sink = LogSink(config.log_queue_capacity, config.log_drop_policy, path=config.log_file)
+    log_sink.start()
+    atexit.register(log_sink.close)
+    realtime = None
+    if config.realtime_mode:
+        realtime = RealtimeMode.from_config(config, log=log_sink)
+        realtime.before = realtime.probe(config.realtime_probe_seconds)
+        realtime.enter()
+        atexit.register(realtime.restore)
     state = SharedState()
-    debug_log = build_debug_logger(config.debug_enabled, config.log_throttle_sec)
-    perf_collector = build_perf_collector(config.perf_stats_enabled, config.perf_stats_report_every)
+    debug_log = build_debug_logger(config.debug_enabled, config.log_throttle_sec, log_sink)
+    scheduler = PollScheduler.from_timing(config.timing)
+    injector = build_injector(threaded=config.threaded_injection, backend=config.injection_backend, log=log_sink)
+    trace = open_trace_file(config.trace_file)
+    if trace is not None:
+        atexit.register(trace.close)
+    window_guard = WindowGuard(config, state, trace=trace, log=log_sink)
+
+    profile_store = ProfileStore(config.profile_file, log=log_sink)
+    profile_store.load()
+    atexit.register(profile_store.stop)
+    display_key = detect_display_key(window_guard.find_target_window())
+    profile = profile_store.get(display_key)
+    colors = profile.colors if profile is not None else config.colors
+    sample_radius_px = profile.sample_radius_px if profile is not None else config.timing.sample_radius_px
+
+    reporters = [
+        lambda: f"[perf] poll {scheduler.format_stats()}",
+        lambda: f"[perf] inject {injector.format_stats()}",
+        lambda: f"[perf] process_names {window_guard.process_names.format_stats()}",
+        lambda: f"[perf] log {log_sink.format_stats()}",
+    ]
+    if realtime is not None:
+        reporters.append(lambda: f"[perf] realtime {realtime.format_stats()}")
+    stages = None
+    if config.stage_timing:
+        stages = StageTimers()
+        reporters.append(lambda: f"[perf] stages {stages.format_stats()}")
+    change_gate = None
+    if config.timing.change_gate_enabled:
+        change_gate = ChangeGate()
+        reporters.append(lambda: f"[perf] change_gate {change_gate.format_stats()}")
+    tuner = None
+    if config.adaptive_tuning:
+        tuner = AdaptiveController.from_dict(
+            profile.tuning if profile is not None else None,
+            TuningParams.from_timing(config.timing),
+            # Tuning changes are decided on the selector thread; the profile watcher does the write.
+            on_change=lambda controller: profile_store.schedule_update(
+                display_key,
+                Profile(*state.get_xy(), sample_radius_px=sample_radius_px, colors=colors),
+                tuning=controller.to_dict(),
+            ),
+        )
+        reporters.append(lambda: f"[perf] tuning {tuner.format_stats()}")
+    if trace is not None:
+        session_config = replace(
+            config, colors=colors, timing=replace(config.timing, sample_radius_px=sample_radius_px)
+        )
+        trace.config(time.perf_counter(), session_config, tuner.to_dict() if tuner is not None else None)
+    exporter = None
+    if config.telemetry_port > 0 or config.telemetry_file:
+        exporter = TelemetryExporter(
+            http_port=config.telemetry_port if config.telemetry_port > 0 else None,
+            jsonl_path=config.telemetry_file,
+            interval=config.telemetry_interval,
+            max_bytes=config.telemetry_max_bytes,
+            backups=config.telemetry_backups,
+            gauges={
+                "focus_active": lambda: window_guard.active,
+                "paused": state.is_paused,
+                "request_id": lambda: state.get_worker_snapshot_fast()[0],
+            },
+            log=log_sink,
+        )
+        reporters.append(lambda: f"[perf] telemetry {exporter.format_stats()}")
+    perf_collector = build_perf_collector(
+        config.perf_stats_enabled, config.perf_stats_report_every, reporters, exporter, log_sink
+    )
+
+    frame_source = create_backend("capture", config.capture_backend or None)
+    if trace is not None:
+        frame_source = TracingFrameSource(frame_source, trace)
 
     color_detector = ColorDetector(
-        config.colors,
+        colors,
         config.timing.double_sample_gap,
-        sample_radius_px=config.timing.sample_radius_px,
+        sample_radius_px=sample_radius_px,
         sample_min_hits=config.timing.sample_min_hits,
+        frame_source=frame_source,
+        lut=load_or_build_lut(colors, config.cache_dir, log=log_sink),
+        sleep=scheduler.sleep_for,
+        clock=scheduler.now,
+        regions=config.timing.roi_regions if config.timing.multi_roi_enabled else None,
+        change_gate=change_gate,
+        stages=stages,
     )
-    window_guard = WindowGuard(config, state)
 
     def click_w(is_lock_press: bool = False, request_id: Optional[int] = None):
-        sendkey(0x11, 1)
-        sendkey(0x11, 0)
-        if is_lock_press and request_id is not None:
-            state.update_key_send(request_id, time.perf_counter())
+        decision_ts = time.perf_counter()
+        if trace is not None:
+            trace.key(decision_ts, is_lock_press, request_id)
+        if not is_lock_press or request_id is None:
+            injector.tap(W_SCANCODE, decision_ts)
+            return
+
+        state.update_lock_decision(request_id, decision_ts)
+        injector.tap(W_SCANCODE, decision_ts, lambda sent_ts: state.update_key_send(request_id, sent_ts))
 
     selector = Selector(
         config=config,
@@ -102,34 +186,88 @@ def main():
         click_w=click_w,
         debug_log=debug_log,
         on_result=perf_collector,
+        scheduler=scheduler,
+        trace=trace,
+        tuner=tuner,
+        stages=stages,
+        log=log_sink,
     )
 
+    point_calibrator = PointCalibrator.from_timing(
+        config.timing, color_detector, lambda report: handlers.on_point_report(report)
+    )
+    point_calibrator.start()
     handlers = InputHandlers(
         config=config,
         state=state,
         selector=selector,
         window_guard=window_guard,
         color_detector=color_detector,
+        profile_store=profile_store,
+        display_key=display_key,
+        point_calibrator=point_calibrator,
+        log=log_sink,
     )
 
     handlers.load_coordinates()
+    profile_store.start_watching(handlers.on_profiles_changed)
     window_guard.start()
-    selector.start()
-
-    print("一切尽在卡牌中！光速抽牌，已经启动：E：黄牌，W：蓝牌，A：红牌，大招自动黄牌")
+    prewarm_timings = {}
     x, y = state.get_xy()
-    print("按下 鼠标中间滑轮按键 确定卡牌取色位置，当前位置：", x, y)
-    print("按下 回车键 可暂停/恢复 功能")
-    print(f'只有当进程名称为 "{config.target_process_name}" 时，功能才会激活')
-    print(f"输入后端: {config.input_backend}")
-
-    backend = PynputBackend(
-        on_key_down=handlers.on_key_down,
-        on_key_up=handlers.on_key_up,
-        on_middle_click=handlers.on_middle_click,
+    steps = pipeline_steps(color_detector, window_guard, injector, x, y)
+    selector.start(prewarm=lambda: prewarm_timings.update(run_prewarm(steps, log=log_sink)))
+    if exporter is not None:
+        exporter.add_gauge("selector_alive", selector.worker_thread.is_alive)
+        try:
+            exporter.start()
+        except OSError as exc:
+            log_sink(f"遥测导出启动失败：{exc}")
+        else:
+            atexit.register(exporter.stop)
+            if exporter.server_address is not None:
+                host, port = exporter.server_address
+                log_sink(f"遥测端点: http://{host}:{port}/metrics")
+    if realtime is not None:
+        realtime.promote_thread(selector.worker_thread, pin=True)
+        realtime.promote_thread(window_guard.source.thread)
+        realtime.after = realtime.probe(config.realtime_probe_seconds, promote=True)
+
+    dispatcher = InputDispatcher(handlers.on_key_down, handlers.on_key_up, handlers.on_middle_click, log=log_sink)
+    dispatcher.start()
+    reporters.append(lambda: f"[perf] input {dispatcher.format_stats()}")
+    if realtime is not None:
+        realtime.promote_thread(dispatcher.thread)
+
+    def on_started(threads):
+        if realtime is not None:
+            realtime.promote_threads(threads)
+        log_sink(f"启动完成：{(time.perf_counter() - started) * 1000:.0f}ms（预热 {format_prewarm(prewarm_timings)}）")
+
+    # Built before the banner so the input library import is part of startup, not of the first key press.
+    backend = create_backend(
+        "input",
+        config.input_backend or None,
+        on_key_down=dispatcher.on_key_down,
+        on_key_up=dispatcher.on_key_up,
+        on_middle_click=dispatcher.on_middle_click,
         should_suppress_key=handlers.should_suppress_key,
         debug=config.debug_enabled,
+        on_started=on_started,
+        log=log_sink,
     )
+    if not selector.ready.wait(2.0):
+        log_sink("预热超时，首次抽牌可能较慢")
+
+    log_sink("一切尽在卡牌中！光速抽牌，已经启动：E：黄牌，W：蓝牌，A：红牌，大招自动黄牌")
+    log_sink(f"按下 鼠标中间滑轮按键 确定卡牌取色位置，当前位置： {x} {y}")
+    log_sink("按下 回车键 可暂停/恢复 功能")
+    log_sink(f'只有当进程名称为 "{config.target_process_name}" 时，功能才会激活')
+    log_sink(f"输入后端: {config.input_backend or default_backend('input')}")
+    log_sink(f"显示配置: {display_key}")
+    if config.calibration_mode:
+        log_sink("校准模式：E/W/A 采样 黄/蓝/红 牌颜色，回车 拟合并保存阈值")
+    if realtime is not None:
+        log_sink(f"实时模式：{realtime.format_stats()}")
     backend.start()
 
 
@@ -0,0 +1,210 @@
+import os
+import tempfile
+import unittest
+from dataclasses import replace
+
+from app.adaptive import AdaptiveController, TuningBounds, TuningParams
+from app.config import AppConfig
+from app.profiles import DisplayKey, Profile, ProfileStore
+from app.simulation import BenchmarkReport, CardCycleConfig, CardCycleSimulator
+
+DEFAULTS = TuningParams.from_timing(AppConfig().timing)
+SUCCESS = {"success": True, "fail_reason": "", "lock_latency_us": 200_000, "first_match_latency_us": 196_000}
+NO_CONFIRM = {"success": False, "fail_reason": "timeout_no_confirm"}
+
+
+class AdaptiveControllerTests(unittest.TestCase):
+    def _success(self, controller, gap_us=1500):
+        # Confirmation waits one fast interval per extra frame, then the double-sample gap.
+        params = controller.params
+        delay_us = int((params.match_confirm_frames - 1) * params.card_poll_fast_interval * 1_000_000) + gap_us
+        return dict(SUCCESS, first_match_latency_us=SUCCESS["lock_latency_us"] - delay_us)
+
+    def test_steps_that_shorten_confirmation_are_kept(self):
+        controller = AdaptiveController(DEFAULTS, window=5, confirm_floor=1)
+        for _ in range(10):
+            controller.observe(self._success(controller))
+        self.assertEqual(controller.params.match_confirm_frames, 1)
+        self.assertLess(controller.params.card_poll_interval, DEFAULTS.card_poll_interval)
+        self.assertEqual(controller.rejected_steps, 0)
+
+    def test_steps_without_latency_gain_are_rolled_back(self):
+        controller = AdaptiveController(DEFAULTS, window=5, probe_hold_windows=2, confirm_floor=1)
+        for _ in range(10):
+            controller.observe(self._success(controller))
+        kept = controller.params
+
+        # At one confirm frame only the fixed gap is left, so faster polling gains nothing.
+        for _ in range(10):
+            controller.observe(self._success(controller))
+        self.assertEqual(controller.params, kept)
+        self.assertEqual(controller.rejected_steps, 1)
+
+        # Each rejection doubles the wait before the next probe: 2 windows, then 4.
+        for _ in range(5 * 4):
+            controller.observe(self._success(controller))
+        self.assertEqual(controller.rejected_steps, 2)
+        for _ in range(5 * 4):
+            controller.observe(self._success(controller))
+        self.assertEqual(controller.rejected_steps, 2)
+        self.assertEqual(controller.params, kept)
+
+    def test_tightening_stops_at_bounds(self):
+        bounds = TuningBounds()
+        controller = AdaptiveController(DEFAULTS, window=5, min_gain_us=0, confirm_floor=bounds.min_confirm_frames)
+        for _ in range(100):
+            controller.observe(SUCCESS)
+        self.assertEqual(controller.params.match_confirm_frames, bounds.min_confirm_frames)
+        self.assertEqual(controller.params.card_poll_fast_interval, bounds.min_fast_interval)
+        self.assertEqual(controller.params.card_poll_interval, bounds.min_poll_interval)
+
+    def test_confirm_frames_stay_at_initial_value_by_default(self):
+        controller = AdaptiveController(DEFAULTS, window=5, min_gain_us=0)
+        for _ in range(100):
+            controller.observe(SUCCESS)
+        self.assertEqual(controller.confirm_floor, DEFAULTS.match_confirm_frames)
+        self.assertEqual(controller.params.match_confirm_frames, DEFAULTS.match_confirm_frames)
+        self.assertLess(controller.params.card_poll_interval, DEFAULTS.card_poll_interval)
+
+    def test_stored_floor_below_configured_frames_is_raised(self):
+        data = dict(vars(DEFAULTS), match_confirm_frames=1, confirm_floor=1)
+        restored = AdaptiveController.from_dict(data, DEFAULTS)
+        self.assertEqual(restored.confirm_floor, DEFAULTS.match_confirm_frames)
+        self.assertEqual(restored.params.match_confirm_frames, DEFAULTS.match_confirm_frames)
+
+    def test_wrong_lock_backs_off_immediately_and_pins_floor(self):
+        controller = AdaptiveController(DEFAULTS, window=5, confirm_floor=1)
+        for _ in range(5):
+            controller.observe(SUCCESS)
+        self.assertEqual(controller.params.match_confirm_frames, 1)
+
+        controller.observe(SUCCESS, wrong_lock=True)
+        self.assertEqual(controller.params.match_confirm_frames, 2)
+        for _ in range(100):
+            controller.observe(SUCCESS)
+        self.assertEqual(controller.params.match_confirm_frames, 2)
+        self.assertEqual(controller.confirm_floor, 2)
+
+    def test_missed_confirmations_extend_grace(self):
+        controller = AdaptiveController(DEFAULTS, window=4)
+        for _ in range(4):
+            controller.observe(NO_CONFIRM)
+        self.assertGreater(controller.params.partial_match_grace, DEFAULTS.partial_match_grace)
+        self.assertLess(controller.params.card_poll_fast_interval, DEFAULTS.card_poll_fast_interval)
+
+    def test_late_confirmations_hold_poll_rate(self):
+        controller = AdaptiveController(DEFAULTS, window=4)
+        late = dict(SUCCESS, first_match_latency_us=SUCCESS["lock_latency_us"] - 30_000)
+        for _ in range(8):
+            controller.observe(late)
+        self.assertEqual(controller.params, DEFAULTS)
+
+    def test_learned_values_persist_in_profile(self):
+        changes = []
+        controller = AdaptiveController(DEFAULTS, window=2, on_change=changes.append)
+        controller.observe(SUCCESS)
+        controller.observe(SUCCESS)
+        controller.observe(SUCCESS, wrong_lock=True)
+        self.assertEqual(len(changes), controller.adjustments)
+
+        key = DisplayKey(1920, 1080)
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ProfileStore(os.path.join(tmp, "profiles.json"))
+            store.save_profile(key, Profile(1, 2, tuning=controller.to_dict()))
+            reloaded = ProfileStore(store.path)
+            reloaded.load()
+            restored = AdaptiveController.from_dict(reloaded.get(key).tuning, DEFAULTS)
+
+        self.assertEqual(restored.params, controller.params)
+        self.assertEqual(restored.confirm_floor, controller.confirm_floor)
+
+
+class AdaptiveSimulationTests(unittest.TestCase):
+    def _converged(self, report, draws):
+        return BenchmarkReport(report.outcomes[draws // 2:])
+
+    def test_clean_cycle_keeps_confirm_frames_and_p95(self):
+        draws = 400
+        tuner = AdaptiveController(DEFAULTS)
+        static = self._converged(CardCycleSimulator(seed=1).run(draws), draws)
+        adaptive = self._converged(CardCycleSimulator(seed=1, tuner=tuner).run(draws), draws)
+
+        # Faster polling alone buys no earlier confirmation here, so the probes are rolled back.
+        self.assertEqual(tuner.params.match_confirm_frames, DEFAULTS.match_confirm_frames)
+        self.assertLessEqual(adaptive.summary()["lock_p95_ms"], static.summary()["lock_p95_ms"] + 1000 / 60)
+        self.assertLessEqual(adaptive.wrong_card_rate(), static.wrong_card_rate())
+        self.assertEqual(adaptive.success_rate(), 1.0)
+
+    def test_converges_to_lower_p95_from_conservative_timing(self):
+        # Sparse polling and an extra confirm frame, as a profile for a slow machine would set them.
+        draws = 400
+        config = AppConfig()
+        config = replace(
+            config,
+            timing=replace(config.timing, card_poll_interval=0.016, card_poll_fast_interval=0.008, match_confirm_frames=3),
+        )
+        start = TuningParams.from_timing(config.timing)
+        for seed in (0, 1):
+            tuner = AdaptiveController(start)
+            static = self._converged(CardCycleSimulator(config, seed=seed).run(draws), draws)
+            adaptive = self._converged(CardCycleSimulator(config, seed=seed, tuner=tuner).run(draws), draws)
+
+            self.assertLess(tuner.params.card_poll_fast_interval, start.card_poll_fast_interval, seed)
+            self.assertEqual(tuner.params.match_confirm_frames, start.match_confirm_frames, seed)
+            self.assertLess(adaptive.summary()["lock_p95_ms"], static.summary()["lock_p95_ms"], seed)
+            self.assertLessEqual(adaptive.wrong_card_rate(), static.wrong_card_rate(), seed)
+            self.assertEqual(adaptive.success_rate(), 1.0, seed)
+
+    def test_noisy_transitions_raise_confirm_frames(self):
+        draws = 400
+        cycle = CardCycleConfig(color_noise=25.0, transition_frames=4)
+        tuner = AdaptiveController(DEFAULTS)
+        static = CardCycleSimulator(cycle=cycle, seed=1).run(draws)
+        adaptive = CardCycleSimulator(cycle=cycle, seed=1, tuner=tuner).run(draws)
+
+        self.assertGreater(tuner.params.match_confirm_frames, DEFAULTS.match_confirm_frames)
+        self.assertLessEqual(adaptive.wrong_card_rate(), static.wrong_card_rate())
+        self.assertLessEqual(
+            self._converged(adaptive, draws).wrong_card_rate(), self._converged(static, draws).wrong_card_rate()
+        )
+
+
+class _RecordingTuner(AdaptiveController):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.verdicts = []
+
+    def observe(self, result, wrong_lock=None):
+        self.verdicts.append(wrong_lock)
+        super().observe(result, wrong_lock)
+
+
+class LockVerifyTests(unittest.TestCase):
+    def test_late_check_does_not_hold_the_worker(self):
+        tuner = _RecordingTuner(DEFAULTS)
+        sim = CardCycleSimulator(seed=3, tuner=tuner)
+        sim.model.open_cycle(sim.clock.now())
+        sim.selector.submit("黄", open_cycle=False)
+        sim.selector.run_pending()
+        locked_at = sim.clock.now()
+
+        self.assertEqual(tuner.verdicts, [])
+        self.assertFalse(sim.selector.verify_pending())
+        self.assertTrue(sim.selector.verify_pending(wait=True))
+        self.assertAlmostEqual(sim.clock.now() - locked_at, AppConfig().timing.lock_verify_delay, places=2)
+        self.assertIn(tuner.verdicts[0], (True, False))
+        self.assertFalse(sim.selector.verify_pending(wait=True))
+
+    def test_new_request_resolves_pending_check_as_unknown(self):
+        tuner = _RecordingTuner(DEFAULTS)
+        sim = CardCycleSimulator(seed=3, tuner=tuner)
+        for _ in range(2):
+            sim.model.open_cycle(sim.clock.now())
+            sim.selector.submit("黄", open_cycle=False)
+            sim.selector.run_pending()
+            sim.model.close_cycle()
+        self.assertEqual(tuner.verdicts, [None])
+
+
+if __name__ == "__main__":
+    unittest.main()
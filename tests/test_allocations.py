@@ -0,0 +1,146 @@
+import tracemalloc
+import unittest
+
+from app.config import AppConfig
+from app.dispatcher import InputDispatcher
+from app.input_backend import InputEvent, ScriptedInputBackend, key_event
+from app.input_handlers import InputHandlers
+from app.selector import Selector
+from app.state import DrawResult, LastLatency, RuntimeState, SharedState
+
+# Bytes still held per item after the loop. A queued keystroke is the dispatcher's (handler, event, ts)
+# tuple plus its float stamp; a kept draw result is one DrawResult and its latency ints.
+QUEUED_KEY_BUDGET = 120
+KEPT_RESULT_BUDGET = 260
+# Total growth allowed for loops that keep nothing, independent of the iteration count.
+STEADY_BUDGET = 2048
+ITERATIONS = 2000
+
+
+class _WindowGuard:
+    def is_allowed(self):
+        return True
+
+
+def _measure(fn, iterations: int):
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for i in range(iterations):
+            fn(i)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return current - start, peak - start
+
+
+class KeystrokeAllocationTests(unittest.TestCase):
+    def _pipeline(self):
+        state = SharedState()
+        selector = Selector(
+            config=AppConfig(),
+            state=state,
+            color_detector=object(),
+            window_guard=_WindowGuard(),
+            click_w=lambda *_args: None,
+            debug_log=lambda *_args: None,
+            on_result=None,
+        )
+        handlers = InputHandlers(
+            config=AppConfig(),
+            state=state,
+            selector=selector,
+            window_guard=_WindowGuard(),
+            color_detector=object(),
+        )
+        dispatcher = InputDispatcher(handlers.on_key_down, handlers.on_key_up, handlers.on_middle_click)
+        backend = ScriptedInputBackend(dispatcher.on_key_down, dispatcher.on_key_up, dispatcher.on_middle_click)
+        return state, dispatcher, backend
+
+    def test_keystroke_events_are_interned_and_slotted(self):
+        self.assertIs(key_event("key_down", "E"), key_event("key_down", "E"))
+        self.assertIsNot(key_event("key_down", "W"), key_event("key_down", "W", True))
+        self.assertTrue(key_event("key_up", "W").is_injected is False)
+        self.assertFalse(hasattr(InputEvent("key_down"), "__dict__"))
+        for cls in (RuntimeState, LastLatency, DrawResult):
+            self.assertFalse(hasattr(cls.__new__(cls), "__dict__"), cls.__name__)
+
+    def test_queued_keystroke_budget(self):
+        _, dispatcher, backend = self._pipeline()
+
+        def keystroke(_i):
+            backend.press("W")
+            backend.release("W")
+
+        for i in range(100):
+            keystroke(i)
+        dispatcher.run_pending()
+        retained, _ = _measure(keystroke, ITERATIONS)
+        self.assertLessEqual(retained / (2 * ITERATIONS), QUEUED_KEY_BUDGET)
+        self.assertEqual(dispatcher.run_pending(), 2 * ITERATIONS)
+
+    def test_dispatched_keystrokes_do_not_accumulate(self):
+        state, dispatcher, backend = self._pipeline()
+
+        def keystroke(_i):
+            backend.press("W")
+            backend.release("W")
+            dispatcher.run_pending()
+
+        for i in range(100):
+            keystroke(i)
+        retained, peak = _measure(keystroke, ITERATIONS)
+        self.assertLessEqual(retained, STEADY_BUDGET)
+        self.assertLessEqual(peak, STEADY_BUDGET)
+        self.assertEqual(state.get_request_snapshot()[0], 100 + ITERATIONS)
+
+
+class DrawAllocationTests(unittest.TestCase):
+    def _draw(self, state: SharedState, keep):
+        def draw(i):
+            rid = state.register_request("黄", float(i))
+            state.update_first_match(rid, i + 0.041)
+            state.update_lock_decision(rid, i + 0.096)
+            state.update_key_send(rid, i + 0.0961)
+            keep(state.record_result(rid, i % 10 != 0, "" if i % 10 else "timeout_no_match"))
+
+        return draw
+
+    def test_kept_result_budget(self):
+        state = SharedState()
+        results = []
+        draw = self._draw(state, results.append)
+        for i in range(100):
+            draw(i)
+        results.clear()
+        retained, _ = _measure(draw, ITERATIONS)
+        self.assertEqual(len(results), ITERATIONS)
+        self.assertLessEqual(retained / ITERATIONS, KEPT_RESULT_BUDGET)
+
+    def test_draw_bookkeeping_does_not_accumulate(self):
+        state = SharedState()
+        draw = self._draw(state, lambda _result: None)
+        for i in range(100):
+            draw(i)
+        retained, peak = _measure(draw, ITERATIONS)
+        self.assertLessEqual(retained, STEADY_BUDGET)
+        self.assertLessEqual(peak, STEADY_BUDGET)
+
+    def test_draw_result_reads_like_the_old_dict(self):
+        state = SharedState()
+        rid = state.register_request("蓝", 1.0)
+        state.update_lock_decision(rid, 1.1)
+        result = state.record_result(rid, True)
+        self.assertEqual(result["req_color"], "蓝")
+        self.assertEqual(result.get("lock_latency_ms"), 100)
+        self.assertIsNone(result.get("phase_confidence"))
+        self.assertEqual(result.get("missing", "x"), "x")
+        with self.assertRaises(KeyError):
+            result["missing"]
+        result["phase_confidence"] = 0.5
+        self.assertEqual(result.to_dict()["phase_confidence"], 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
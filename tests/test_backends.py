@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from app.backends import backend_names, create_backend, default_backend, load_backend, register_backend
+from app.capture import PatchBuffer, SyntheticFrameSource
+from app.config import AppConfig
+from app.focus import PollingFocusSource, ScriptedFocusSource
+from app.injection import RecordingInjector, build_injector
+from app.input_backend import ScriptedInputBackend
+from app.state import SharedState
+from app.window_guard import WindowGuard
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class BackendRegistryTests(unittest.TestCase):
+    def test_platform_defaults(self):
+        self.assertEqual(default_backend("capture", "win32"), "gdi")
+        self.assertEqual(default_backend("input", "win32"), "pynput")
+        self.assertEqual(default_backend("focus", "linux"), "scripted")
+        self.assertIn("synthetic", backend_names("capture"))
+
+    def test_fake_backends_work_headless(self):
+        source = create_backend("capture", "synthetic", fill=(1, 2, 3))
+        self.assertIsInstance(source, SyntheticFrameSource)
+        patch = PatchBuffer(1, 1)
+        source.grab(patch)
+        self.assertEqual(bytes(patch.data[:3]), bytes((3, 2, 1)))
+        self.assertIsInstance(build_injector(backend="recording"), RecordingInjector)
+
+        events = []
+        backend = create_backend(
+            "input", "scripted", on_key_down=events.append, on_key_up=events.append, on_middle_click=events.append
+        )
+        self.assertIsInstance(backend, ScriptedInputBackend)
+        backend.press("E")
+        backend.click(3, 4)
+        self.assertEqual([(e.type, e.Key, e.Position) for e in events], [("key_down", "E", None), ("mouse_middle_down", None, (3, 4))])
+
+    def test_unknown_backend_lists_alternatives(self):
+        with self.assertRaisesRegex(ValueError, "gdi, synthetic"):
+            load_backend("capture", "dxgi")
+
+    def test_registered_backend_is_loaded_lazily(self):
+        register_backend("capture", "test-only", "app.capture:SyntheticFrameSource")
+        self.assertIs(load_backend("capture", "test-only"), SyntheticFrameSource)
+        with self.assertRaises(ValueError):
+            register_backend("capture", "bad", "app.capture.SyntheticFrameSource")
+
+    def test_window_guard_picks_focus_backend_from_config(self):
+        guard = WindowGuard(AppConfig(focus_backend="scripted"), SharedState())
+        self.assertIsInstance(guard.source, ScriptedFocusSource)
+        guard = WindowGuard(AppConfig(focus_backend="polling"), SharedState())
+        self.assertIsInstance(guard.source, PollingFocusSource)
+
+    def test_core_imports_no_platform_modules(self):
+        code = (
+            "import sys, app.selector, app.window_guard, app.color_detector, app.input_handlers, app.input_backend;"
+            "print(','.join(m for m in ('pynput', 'psutil', 'win32gui', 'win32process') if m in sys.modules))"
+        )
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+import unittest
+
+from app.capture import SyntheticFrameSource
+from app.change_gate import ChangeGate
+from app.color_detector import ColorDetector
+from app.config import AppConfig, ColorThresholds
+from app.simulation import CardCycleConfig, CardCycleSimulator
+
+YELLOW = (222, 188, 62)
+BLUE = (52, 112, 228)
+BLACK = (0, 0, 0)
+
+
+class _GlitchSource(SyntheticFrameSource):
+    # Shows black on the listed grab numbers only, like a single torn frame.
+    def __init__(self, fill, black_on):
+        super().__init__(fill=fill)
+        self._fill_rgb = fill
+        self._black_on = set(black_on)
+
+    def grab(self, patch):
+        self.set_fill(BLACK if self.grab_count + 1 in self._black_on else self._fill_rgb)
+        return super().grab(patch)
+
+
+class _HookSource(SyntheticFrameSource):
+    on_grab = None
+
+    def grab(self, patch):
+        result = super().grab(patch)
+        if self.on_grab is not None:
+            self.on_grab()
+        return result
+
+
+class _Clock:
+    # Each reading is a poll interval later unless a test pins the step.
+    def __init__(self, step=0.004):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+def _detector(source, slept, clock=None):
+    config = AppConfig()
+    return ColorDetector(
+        config.colors,
+        0.0015,
+        frame_source=source,
+        sleep=slept.append,
+        change_gate=ChangeGate(),
+        clock=clock or _Clock(),
+    )
+
+
+class ChangeGateTests(unittest.TestCase):
+    def test_static_patch_pairs_with_last_confirmation_instead_of_sleeping(self):
+        slept = []
+        source = SyntheticFrameSource(fill=YELLOW)
+        detector = _detector(source, slept)
+        self.assertTrue(detector.match_target_fast(10, 10, "黄"))
+        self.assertEqual((len(slept), source.grab_count), (1, 2))
+
+        for _ in range(5):
+            self.assertTrue(detector.match_target_fast(10, 10, "黄"))
+        self.assertEqual((len(slept), source.grab_count), (1, 7))
+        self.assertEqual((detector.change_gate.hits, detector.change_gate.misses), (5, 1))
+
+    def test_polls_closer_than_the_gap_still_confirm(self):
+        slept = []
+        source = SyntheticFrameSource(fill=YELLOW)
+        detector = _detector(source, slept, clock=_Clock(step=0.0005))
+        for _ in range(3):
+            self.assertTrue(detector.match_target_fast(10, 10, "黄"))
+        self.assertEqual(len(slept), 3)
+
+    def test_failed_confirmation_is_not_cached(self):
+        source = _GlitchSource(YELLOW, black_on=(2,))
+        detector = _detector(source, [])
+        polls = [detector.match_target_fast(10, 10, "黄") for _ in range(6)]
+        self.assertEqual(polls, [False, True, True, True, True, True])
+
+    def test_changed_pixels_reclassify(self):
+        slept = []
+        source = SyntheticFrameSource(fill=YELLOW)
+        detector = _detector(source, slept)
+        self.assertTrue(detector.match_target_fast(10, 10, "黄"))
+        source.set_fill(BLUE)
+        self.assertFalse(detector.match_target_fast(10, 10, "黄"))
+        self.assertFalse(detector.match_target_fast(10, 11, "黄"))
+        self.assertEqual(detector.change_gate.hits, 0)
+
+    def test_observed_match_reports_the_first_sample_colour(self):
+        slept = []
+        source = _GlitchSource(BLUE, black_on=(2,))
+        detector = _detector(source, slept)
+        self.assertEqual(detector.match_target_observed(10, 10, "蓝"), (False, "蓝"))
+        self.assertEqual(detector.match_target_observed(10, 10, "黄"), (False, "蓝"))
+        self.assertEqual(detector.match_target_observed(10, 10, "蓝"), (True, "蓝"))
+        self.assertEqual(detector.sample_card_hits(10, 10)[1], "蓝")
+        self.assertEqual(len(slept), 2)
+
+    def test_observed_match_agrees_with_match_target_fast_without_gate(self):
+        for fill, target in ((BLUE, "蓝"), (BLUE, "黄"), (BLACK, "蓝")):
+            plain, observed = (
+                ColorDetector(ColorThresholds(), 0.0, frame_source=SyntheticFrameSource(fill=fill), sleep=lambda _s: None)
+                for _ in range(2)
+            )
+            matched, colour = observed.match_target_observed(10, 10, target)
+            self.assertEqual(matched, plain.match_target_fast(10, 10, target))
+            self.assertEqual(colour, None if fill == BLACK else "蓝")
+
+    def test_profile_change_clears_cached_decisions(self):
+        slept = []
+        detector = _detector(SyntheticFrameSource(fill=YELLOW), slept)
+        detector.match_target_fast(10, 10, "黄")
+        detector.apply_profile(detector.thresholds, 2)
+        detector.match_target_fast(10, 10, "黄")
+        self.assertEqual(detector.change_gate.hits, 0)
+        self.assertEqual(len(slept), 2)
+
+    def test_profile_swapped_mid_poll_does_not_leak_old_decision(self):
+        # The profile watcher applies new thresholds while the selector is between grab and gate.put.
+        source = _HookSource(fill=YELLOW)
+        detector = _detector(source, [])
+        source.on_grab = lambda: detector.apply_profile(ColorThresholds(yellow_min_r=250), 1)
+        first = detector.sample_card_hits(10, 10)
+        source.on_grab = None
+
+        self.assertEqual(first[1], "黄")
+        self.assertEqual(detector.params.generation, 1)
+        self.assertIsNone(detector.sample_card_hits(10, 10)[1])
+        self.assertEqual(detector.change_gate.hits, 0)
+
+    def test_profile_publishes_all_params_at_once(self):
+        detector = _detector(SyntheticFrameSource(fill=YELLOW), [])
+        before = detector.params
+        thresholds = ColorThresholds(yellow_min_r=190)
+        detector.apply_profile(thresholds, 2)
+        after = detector.params
+        self.assertIsNot(after, before)
+        self.assertEqual((after.thresholds, after.radius, after.patch.width), (thresholds, 2, 5))
+        self.assertEqual(after.lut.thresholds, thresholds)
+        self.assertEqual((before.radius, before.patch.width), (1, 3))
+
+    def test_gate_hits_on_static_frames(self):
+        sim = CardCycleSimulator(cycle=CardCycleConfig(static_frames=True), seed=2)
+        report = sim.run(40)
+        self.assertEqual(report.success_rate(), 1.0)
+        self.assertGreater(sim.color_detector.change_gate.hit_rate(), 0.3)
+
+
+if __name__ == "__main__":
+    unittest.main()
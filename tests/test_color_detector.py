@@ -0,0 +1,80 @@
+import unittest
+
+from app.capture import PatchBuffer, SyntheticFrameSource
+from app.color_detector import ColorDetector
+from app.config import ColorThresholds
+
+YELLOW = (200, 180, 40)
+BLUE = (40, 90, 220)
+RED = (210, 60, 50)
+GRAY = (90, 92, 95)
+
+
+def _build_detector(source, radius=1, min_hits=2):
+    return ColorDetector(
+        ColorThresholds(),
+        0.0,
+        sample_radius_px=radius,
+        sample_min_hits=min_hits,
+        frame_source=source,
+    )
+
+
+class SyntheticFrameSourceTests(unittest.TestCase):
+    def test_grab_copies_region_as_bgra(self):
+        source = SyntheticFrameSource(fill=GRAY)
+        source.set_pixel(11, 21, RED)
+        patch = PatchBuffer(3, 3)
+        patch.move_to(10, 20)
+
+        self.assertTrue(source.grab(patch))
+        self.assertEqual(patch.rgb_at(1, 1), RED)
+        self.assertEqual(patch.rgb_at(0, 0), GRAY)
+        self.assertEqual(bytes(patch.data[16:20]), bytes((50, 60, 210, 0)))
+
+
+class ColorDetectorPatchTests(unittest.TestCase):
+    def test_patch_is_grabbed_once_per_sample(self):
+        source = SyntheticFrameSource(fill=YELLOW)
+        detector = _build_detector(source)
+
+        self.assertTrue(detector.match_target_fast(100, 100, "黄"))
+        self.assertEqual(source.grab_count, 2)
+
+    def test_miss_skips_second_sample(self):
+        source = SyntheticFrameSource(fill=BLUE)
+        detector = _build_detector(source)
+
+        self.assertFalse(detector.match_target_fast(100, 100, "黄"))
+        self.assertEqual(source.grab_count, 1)
+
+    def test_hits_follow_neighborhood_pixels(self):
+        source = SyntheticFrameSource(fill=GRAY)
+        source.set_pixel(50, 50, RED)
+        detector = _build_detector(source, radius=1, min_hits=2)
+        self.assertEqual(detector._match_hits_fast(50, 50, "红"), 1)
+        self.assertFalse(detector.match_target_fast(50, 50, "红"))
+
+        source.set_pixel(49, 51, RED)
+        self.assertTrue(detector.match_target_fast(50, 50, "红"))
+        self.assertFalse(detector.match_target_fast(50, 50, "蓝"))
+
+    def test_patch_matches_scalar_classification(self):
+        source = SyntheticFrameSource(fill=GRAY)
+        detector = _build_detector(source, radius=2, min_hits=25)
+        colors = [YELLOW, BLUE, RED, GRAY, (160, 145, 120), (130, 170, 145), (155, 130, 130)]
+        for i, y in enumerate(range(8, 13)):
+            for j, x in enumerate(range(8, 13)):
+                source.set_pixel(x, y, colors[(i * 5 + j) % len(colors)])
+
+        for target in ("黄", "蓝", "红"):
+            expected = 0
+            for y in range(8, 13):
+                for x in range(8, 13):
+                    if detector.color_matches_target(*source.get_pixel(x, y), target):
+                        expected += 1
+            self.assertEqual(detector._match_hits_fast(10, 10, target), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import itertools
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+from app.color_lut import (
+    LUT_HEADER,
+    NAME_BY_MASK,
+    build_lut,
+    encode_lut_file,
+    exact_mask,
+    load_or_build_lut,
+    lut_cache_path,
+    thresholds_key,
+)
+from app.config import ColorThresholds
+
+
+def _reference_name(t: ColorThresholds, r: int, g: int, b: int) -> str:
+    if r >= t.yellow_min_r and g >= t.yellow_min_g and b <= t.yellow_max_b:
+        return "黄"
+    if r <= t.blue_max_r and g <= t.blue_max_g and b >= t.blue_min_b:
+        return "蓝"
+    if r >= t.red_min_r and g <= t.red_max_g and b <= t.red_max_b:
+        return "红"
+    if abs(r - g) <= 12 and abs(g - b) <= 12:
+        return "灰"
+    return "未知"
+
+
+def _probe_values(t: ColorThresholds):
+    values = {0, 255}
+    for value in vars(t).values():
+        values.update((value - 1, value, value + 1))
+    for base in range(0, 256, 32):
+        values.update((base + 11, base + 12, base + 13))
+    return sorted(v for v in values if 0 <= v <= 255)
+
+
+class ColorLutTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.thresholds = ColorThresholds()
+        cls.lut = build_lut(cls.thresholds)
+
+    def _assert_pixel(self, r, g, b):
+        self.assertEqual(self.lut.mask(r, g, b), exact_mask(self.thresholds, r, g, b), (r, g, b))
+        self.assertEqual(self.lut.color_name(r, g, b), _reference_name(self.thresholds, r, g, b), (r, g, b))
+
+    def test_threshold_edges_match_exact_classifier(self):
+        for r, g, b in itertools.product(_probe_values(self.thresholds), repeat=3):
+            self._assert_pixel(r, g, b)
+
+    def test_random_pixels_match_exact_classifier(self):
+        rng = random.Random(7)
+        for _ in range(20000):
+            self._assert_pixel(rng.randrange(256), rng.randrange(256), rng.randrange(256))
+
+    def test_most_cells_resolve_without_fallback(self):
+        self.assertLess(self.lut.ambiguous_ratio(), 0.15)
+
+    def test_name_table_priority(self):
+        self.assertEqual(NAME_BY_MASK[0x01 | 0x08], "黄")
+        self.assertEqual(NAME_BY_MASK[0x08], "灰")
+        self.assertEqual(NAME_BY_MASK[0], "未知")
+
+
+class ColorLutCacheTests(unittest.TestCase):
+    def test_cache_is_written_once_and_keyed_by_thresholds(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            thresholds = ColorThresholds()
+            lut = load_or_build_lut(thresholds, cache_dir)
+            path = lut_cache_path(cache_dir, thresholds)
+            self.assertTrue(os.path.exists(path))
+            mtime = os.stat(path).st_mtime_ns
+
+            cached = load_or_build_lut(thresholds, cache_dir)
+            self.assertEqual(cached.table, lut.table)
+            self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+
+            other = ColorThresholds(yellow_min_r=170)
+            self.assertNotEqual(lut_cache_path(cache_dir, other), path)
+
+    def test_corrupt_cache_is_rebuilt(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            thresholds = ColorThresholds()
+            path = lut_cache_path(cache_dir, thresholds)
+            with open(path, "wb") as f:
+                f.write(b"broken")
+
+            lut = load_or_build_lut(thresholds, cache_dir)
+            self.assertEqual(lut.table, build_lut(thresholds).table)
+
+    def test_right_sized_table_with_bad_contents_is_rebuilt(self):
+        # Same length as a valid file, e.g. truncated and regrown, so only the checksum catches it.
+        with tempfile.TemporaryDirectory() as cache_dir:
+            thresholds = ColorThresholds()
+            path = lut_cache_path(cache_dir, thresholds)
+            data = bytearray(encode_lut_file(build_lut(thresholds)))
+            data[LUT_HEADER.size :] = bytes(len(data) - LUT_HEADER.size)
+            with open(path, "wb") as f:
+                f.write(data)
+
+            lut = load_or_build_lut(thresholds, cache_dir)
+            self.assertEqual(lut.table, build_lut(thresholds).table)
+
+    def test_table_for_other_thresholds_is_not_trusted(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            thresholds = ColorThresholds()
+            other = ColorThresholds(yellow_min_r=120, blue_min_b=100)
+            with open(lut_cache_path(cache_dir, thresholds), "wb") as f:
+                f.write(encode_lut_file(build_lut(other)))
+
+            lut = load_or_build_lut(thresholds, cache_dir)
+            self.assertEqual(lut.table, build_lut(thresholds).table)
+
+    def test_classifier_version_is_part_of_the_key(self):
+        thresholds = ColorThresholds()
+        key = thresholds_key(thresholds)
+        with mock.patch("app.color_lut.CLASSIFIER_VERSION", -1):
+            self.assertNotEqual(thresholds_key(thresholds), key)
+
+    def test_write_failure_goes_to_the_callers_log(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            blocker = os.path.join(tmp, "not-a-dir")
+            with open(blocker, "w") as f:
+                f.write("")
+            logged = []
+            lut = load_or_build_lut(ColorThresholds(), blocker, log=logged.append)
+            self.assertEqual(lut.table, build_lut(ColorThresholds()).table)
+            self.assertEqual(len(logged), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import threading
+import unittest
+from types import SimpleNamespace
+
+from app.dispatcher import InputDispatcher
+from app.input_backend import key_event
+
+
+def _event(key):
+    return SimpleNamespace(Key=key, is_injected=False)
+
+
+class InputDispatcherTests(unittest.TestCase):
+    def test_handlers_run_on_dispatcher_thread_with_hook_timestamp(self):
+        seen = []
+        done = threading.Event()
+
+        def on_key_down(event, ts):
+            seen.append((event.Key, ts, threading.current_thread().name))
+            done.set()
+
+        dispatcher = InputDispatcher(on_key_down, lambda _e, _ts: None, lambda _e, _ts: None, clock=lambda: 42.0)
+        dispatcher.start()
+        self.assertTrue(dispatcher.on_key_down(_event("E")))
+        self.assertTrue(done.wait(1.0))
+        dispatcher.stop()
+        self.assertEqual(seen, [("E", 42.0, "input-dispatch")])
+
+    def test_hook_side_stays_fast_while_handlers_are_slow(self):
+        gate = threading.Event()
+        dispatcher = InputDispatcher(lambda _e, _ts: gate.wait(1.0), lambda _e, _ts: None, lambda _e, _ts: None)
+        dispatcher.start()
+        for i in range(5000):
+            dispatcher.on_key_down(_event("E"))
+            dispatcher.on_key_up(_event("E"))
+        gate.set()
+        dispatcher.stop()
+
+        hook = dispatcher.hook_latency()
+        self.assertEqual(hook.count, 10000)
+        self.assertLess(hook.percentile(0.99), 100)
+        self.assertIn("hook p50=", dispatcher.format_stats())
+
+    def test_handler_errors_are_counted_not_raised(self):
+        lines = []
+
+        def broken(_event, _ts):
+            raise RuntimeError("boom")
+
+        dispatcher = InputDispatcher(broken, lambda _e, _ts: None, lambda _e, _ts: None, log=lines.append)
+        dispatcher.on_key_down(_event("A"))
+        dispatcher.on_middle_click(SimpleNamespace(Position=(1, 2)))
+        self.assertEqual(dispatcher.run_pending(), 2)
+        self.assertEqual((dispatcher.errors, dispatcher.dispatched), (1, 2))
+        self.assertEqual(dispatcher.mouse_hook_latency.count, 1)
+        self.assertEqual(len(lines), 1)
+
+    def test_dispatch_delay_is_measured_from_the_hook(self):
+        now = [1.0]
+        dispatcher = InputDispatcher(lambda _e, _ts: None, lambda _e, _ts: None, lambda _e, _ts: None, clock=lambda: now[0])
+        dispatcher.on_key_down(_event("W"))
+        now[0] += 0.002
+        dispatcher.run_pending()
+        self.assertEqual(dispatcher.dispatch_delay.max_value, 2000)
+
+    def test_shared_event_is_not_stamped(self):
+        seen = []
+        now = [1.0]
+        event = key_event("key_down", "E")
+        dispatcher = InputDispatcher(
+            lambda e, ts: seen.append((e, ts)), lambda _e, _ts: None, lambda _e, _ts: None, clock=lambda: now[0]
+        )
+        dispatcher.on_key_down(event)
+        now[0] = 2.0
+        dispatcher.on_key_down(event)
+        dispatcher.run_pending()
+        self.assertEqual(seen, [(event, 1.0), (event, 2.0)])
+        with self.assertRaises(AttributeError):
+            event.key = "W"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import threading
+import unittest
+
+from app.injection import W_SCANCODE, RecordingInjector, ThreadedInjector
+from app.state import SharedState
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 10.0
+
+    def __call__(self):
+        self.now += 0.0001
+        return self.now
+
+
+class InjectionTests(unittest.TestCase):
+    def test_recording_injector_reports_decision_to_send(self):
+        clock = _FakeClock()
+        injector = RecordingInjector(clock)
+        sent = []
+        injector.tap(W_SCANCODE, decision_ts=clock.now, on_sent=sent.append)
+
+        self.assertEqual(len(injector.taps), 1)
+        self.assertEqual(injector.taps[0][0], W_SCANCODE)
+        self.assertEqual(sent, [injector.taps[0][1]])
+        self.assertEqual(injector.latency.count, 1)
+        self.assertEqual(injector.latency.percentile(0.5), 100)
+
+    def test_threaded_injector_sends_in_order_off_thread(self):
+        inner = RecordingInjector()
+        injector = ThreadedInjector(inner)
+        done = threading.Event()
+        threads = []
+
+        def on_sent(_ts):
+            threads.append(threading.current_thread().name)
+            if len(threads) == 3:
+                done.set()
+
+        for scancode in (1, 2, 3):
+            injector.tap(scancode, on_sent=on_sent)
+        self.assertTrue(done.wait(1.0))
+        injector.close()
+
+        self.assertEqual([scancode for scancode, _ in inner.taps], [1, 2, 3])
+        self.assertEqual(set(threads), {"key-injector"})
+
+    def test_threaded_injector_reports_send_failures_to_its_log(self):
+        class _Failing(RecordingInjector):
+            def _send_tap(self, scancode):
+                raise OSError("SendInput failed")
+
+        logged = []
+        injector = ThreadedInjector(_Failing(), log=logged.append)
+        injector.tap(W_SCANCODE)
+        injector.close()
+        self.assertEqual(len(logged), 1)
+        self.assertIn("SendInput failed", logged[0])
+
+    def test_lock_latency_falls_back_to_decision_time(self):
+        state = SharedState()
+        rid = state.register_request("黄", 1.0)
+        state.update_lock_decision(rid, 1.1)
+        result = state.record_result(rid, True)
+        self.assertEqual(result["lock_latency_ms"], 100)
+        self.assertIsNone(result["inject_latency_us"])
+
+    def test_inject_latency_is_reported_when_sent(self):
+        state = SharedState()
+        rid = state.register_request("黄", 1.0)
+        state.update_lock_decision(rid, 1.1)
+        state.update_key_send(rid, 1.1002)
+        result = state.record_result(rid, True)
+        self.assertEqual(result["inject_latency_us"], 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
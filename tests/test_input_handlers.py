@@ -1,62 +1,27 @@
-import importlib
-import sys
-import types
+import contextlib
+import io
+import os
+import tempfile
 import unittest
-
-from app.config import AppConfig
+from dataclasses import replace
+from types import SimpleNamespace
+
+from app.config import AppConfig, ColorThresholds
+from app.dispatcher import InputDispatcher
+from app.input_handlers import InputHandlers
+from app.point_calibration import analyze_burst
+from app.profiles import DisplayKey, Profile, ProfileStore
 from app.state import SharedState
 
 
-def _import_input_handlers_with_stubs():
-    stub_color_detector = types.ModuleType("app.color_detector")
-    stub_selector = types.ModuleType("app.selector")
-    stub_window_guard = types.ModuleType("app.window_guard")
-
-    class _ColorDetector:
-        def get_rgb(self, _x, _y):
-            return 0, 0, 0
-
-        def get_color_name(self, _r, _g, _b):
-            return "未知"
-
-    class _Selector:
-        pass
-
-    class _WindowGuard:
-        def is_allowed(self):
-            return True
-
-    stub_color_detector.ColorDetector = _ColorDetector
-    stub_selector.Selector = _Selector
-    stub_window_guard.WindowGuard = _WindowGuard
-
-    original_modules = {
-        "app.color_detector": sys.modules.get("app.color_detector"),
-        "app.selector": sys.modules.get("app.selector"),
-        "app.window_guard": sys.modules.get("app.window_guard"),
-        "app.input_handlers": sys.modules.get("app.input_handlers"),
-    }
-
-    try:
-        sys.modules["app.color_detector"] = stub_color_detector
-        sys.modules["app.selector"] = stub_selector
-        sys.modules["app.window_guard"] = stub_window_guard
-        sys.modules.pop("app.input_handlers", None)
-        return importlib.import_module("app.input_handlers")
-    finally:
-        for name, module in original_modules.items():
-            if module is None:
-                sys.modules.pop(name, None)
-            else:
-                sys.modules[name] = module
-
-
 class _FakeSelector:
     def __init__(self):
         self.calls = []
+        self.timestamps = []
 
-    def submit(self, color, open_cycle=True):
+    def submit(self, color, open_cycle=True, ts=None):
         self.calls.append((color, open_cycle))
+        self.timestamps.append(ts)
         return len(self.calls)
 
 
@@ -66,12 +31,26 @@ class _FakeWindowGuard:
 
 
 class _FakeColorDetector:
+    thresholds = ColorThresholds()
+    sample_radius_px = 1
+
     def get_rgb(self, _x, _y):
         return 0, 0, 0
 
     def get_color_name(self, _r, _g, _b):
         return "未知"
 
+    def apply_profile(self, colors, sample_radius_px, lut=None):
+        self.lut = lut
+
+
+class _FakePointCalibrator:
+    def __init__(self):
+        self.points = []
+
+    def submit(self, x, y):
+        self.points.append((x, y))
+
 
 class _Event:
     def __init__(self, key, is_injected=False):
@@ -80,17 +59,14 @@ class _Event:
 
 
 class InputHandlersTests(unittest.TestCase):
-    @classmethod
-    def setUpClass(cls):
-        cls._module = _import_input_handlers_with_stubs()
-
-    def _build_handlers(self):
-        return self._module.InputHandlers(
-            config=AppConfig(),
+    def _build_handlers(self, config=AppConfig(), **kwargs):
+        return InputHandlers(
+            config=config,
             state=SharedState(),
             selector=_FakeSelector(),
             window_guard=_FakeWindowGuard(),
             color_detector=_FakeColorDetector(),
+            **kwargs,
         )
 
     def test_physical_w_submits_blue_without_open_cycle(self):
@@ -114,6 +90,74 @@ class InputHandlersTests(unittest.TestCase):
             [("黄", True), ("红", True), ("黄", True)],
         )
 
+    def test_dispatched_keys_keep_hook_timestamp(self):
+        handlers = self._build_handlers()
+        dispatcher = InputDispatcher(
+            handlers.on_key_down, handlers.on_key_up, handlers.on_middle_click, clock=lambda: 7.5
+        )
+        dispatcher.on_key_down(_Event("E"))
+        self.assertEqual(handlers._selector.calls, [])
+        dispatcher.run_pending()
+        self.assertEqual(handlers._selector.calls, [("黄", True)])
+        self.assertEqual(handlers._selector.timestamps, [7.5])
+
+    def test_middle_click_hands_off_to_point_calibrator(self):
+        calibrator = _FakePointCalibrator()
+        handlers = self._build_handlers(point_calibrator=calibrator)
+        self.assertTrue(handlers.on_middle_click(SimpleNamespace(Position=(300, 400))))
+        self.assertEqual(calibrator.points, [(300, 400)])
+        self.assertEqual(handlers._state.get_xy(), (300, 400))
+
+    def test_point_report_is_persisted_unless_superseded(self):
+        key = DisplayKey(1920, 1080, 100)
+        report = analyze_burst([[1] * 9], 3, 300, 400, sample_radius=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ProfileStore(os.path.join(tmp, "profiles.json"))
+            handlers = self._build_handlers(profile_store=store, display_key=key)
+            handlers._state.set_xy(1, 1)
+            with contextlib.redirect_stdout(io.StringIO()):
+                handlers.on_point_report(report)
+                self.assertIsNone(store.get(key))
+
+                handlers._state.set_xy(300, 400)
+                handlers.on_point_report(report)
+            saved = store.get(key)
+            self.assertEqual((saved.x, saved.y), (300, 400))
+            self.assertEqual(saved.calibration["dominant"], "黄")
+            self.assertEqual(os.listdir(tmp), ["profiles.json"])
+
+    def test_coordinates_round_trip_through_profile_store(self):
+        key = DisplayKey(1920, 1080, 100)
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ProfileStore(os.path.join(tmp, "profiles.json"))
+            store.save_profile(DisplayKey(2560, 1440, 100), Profile(9, 9))
+
+            handlers = self._build_handlers(profile_store=store, display_key=key)
+            handlers._state.set_xy(123, 456)
+            handlers.save_coordinates()
+
+            reloaded = ProfileStore(store.path)
+            reloaded.load()
+            self.assertEqual(reloaded.get(key), Profile(123, 456))
+            self.assertEqual(reloaded.get(DisplayKey(2560, 1440, 100)), Profile(9, 9))
+
+            other = self._build_handlers(profile_store=reloaded, display_key=key)
+            other.load_coordinates()
+            self.assertEqual(other._state.get_xy(), (123, 456))
+
+    def test_profile_lut_errors_go_to_the_handlers_log(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            blocker = os.path.join(tmp, "not-a-dir")
+            with open(blocker, "w") as f:
+                f.write("")
+            logged = []
+            handlers = self._build_handlers(config=replace(AppConfig(), cache_dir=blocker), log=logged.append)
+            with contextlib.redirect_stdout(io.StringIO()) as stdout:
+                handlers.apply_profile(Profile(1, 2))
+            self.assertIsNotNone(handlers._color_detector.lut)
+            self.assertEqual(len(logged), 1)
+            self.assertEqual(stdout.getvalue(), "")
+
 
 if __name__ == "__main__":
     unittest.main()
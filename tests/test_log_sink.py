@@ -0,0 +1,105 @@
+import io
+import os
+import tempfile
+import threading
+import unittest
+
+from app.log_sink import DROP_OLDEST, LogSink
+
+
+class BlockingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def write(self, text):
+        self.entered.set()
+        self.release.wait(2.0)
+        return super().write(text)
+
+
+class LogSinkTests(unittest.TestCase):
+    def test_flush_batches_queued_lines(self):
+        stream = io.StringIO()
+        sink = LogSink(stream=stream)
+        sink("a")
+        sink("b")
+        self.assertEqual(stream.getvalue(), "")
+        self.assertEqual(sink.flush(), 2)
+        self.assertEqual(stream.getvalue(), "a\nb\n")
+        self.assertEqual((sink.batches, sink.written), (1, 2))
+        self.assertEqual(sink.flush(), 0)
+
+    def test_drop_newest_keeps_oldest_and_reports_drops(self):
+        stream = io.StringIO()
+        sink = LogSink(capacity=2, stream=stream)
+        for line in ("a", "b", "c", "d"):
+            sink(line)
+        sink.flush()
+        self.assertEqual(sink.dropped, 2)
+        self.assertEqual(stream.getvalue(), "a\nb\n[log] 日志队列已满，丢弃 2 条\n")
+        sink.flush()
+        self.assertEqual(stream.getvalue().count("丢弃"), 1)
+
+    def test_drop_oldest_keeps_latest(self):
+        stream = io.StringIO()
+        sink = LogSink(capacity=2, policy=DROP_OLDEST, stream=stream)
+        for line in ("a", "b", "c", "d"):
+            sink(line)
+        sink.flush()
+        self.assertEqual(sink.dropped, 2)
+        self.assertTrue(stream.getvalue().startswith("c\nd\n"))
+
+    def test_concurrent_producers_never_overshoot_or_lose_drops(self):
+        for policy in ("drop_newest", DROP_OLDEST):
+            sink = LogSink(capacity=64, policy=policy, stream=io.StringIO())
+            start = threading.Barrier(4)
+
+            def produce(name):
+                start.wait()
+                for i in range(2000):
+                    sink(f"{name} {i}")
+
+            threads = [threading.Thread(target=produce, args=(n,)) for n in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(len(sink._pending), 64, policy)
+            self.assertEqual(sink.dropped, 4 * 2000 - 64, policy)
+
+    def test_unknown_policy_is_rejected(self):
+        with self.assertRaises(ValueError):
+            LogSink(policy="block")
+
+    def test_producer_does_not_wait_for_a_blocked_writer(self):
+        stream = BlockingStream()
+        sink = LogSink(capacity=8, stream=stream, flush_interval=0.001)
+        sink.start()
+        try:
+            sink("first")
+            self.assertTrue(stream.entered.wait(2.0))
+            # The writer thread is now stuck inside write(); logging must still return immediately.
+            for i in range(20):
+                sink(f"line {i}")
+            self.assertEqual(sink.dropped, 12)
+        finally:
+            stream.release.set()
+            sink.close()
+        self.assertIn("line 7\n", stream.getvalue())
+        self.assertNotIn("line 8\n", stream.getvalue())
+
+    def test_file_lines_carry_timestamps(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tf.log")
+            sink = LogSink(stream=io.StringIO(), path=path, wall_clock=lambda: 0.25)
+            sink("抽牌成功")
+            sink.close()
+            with open(path, encoding="utf-8") as f:
+                line = f.read()
+            self.assertTrue(line.endswith(".250 抽牌成功\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
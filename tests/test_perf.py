@@ -0,0 +1,84 @@
+import random
+import unittest
+
+from app.perf import LastNWindow, LatencyHistogram, PerfCollector, TimeWindow
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class LatencyHistogramTests(unittest.TestCase):
+    def test_percentiles_within_bucket_precision(self):
+        rng = random.Random(11)
+        values = [rng.randint(1_000, 900_000) for _ in range(20000)]
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.record(value)
+        values.sort()
+
+        for fraction in (0.5, 0.95, 0.99):
+            exact = values[int(len(values) * fraction) - 1]
+            self.assertAlmostEqual(histogram.percentile(fraction), exact, delta=exact * 0.035)
+        self.assertEqual(histogram.count, len(values))
+
+    def test_small_values_are_exact(self):
+        histogram = LatencyHistogram()
+        for value in (1, 2, 3, 4, 40):
+            histogram.record(value)
+        self.assertEqual(histogram.percentiles((0.2, 0.6, 1.0)), [1, 3, 40])
+
+    def test_memory_does_not_grow_with_samples(self):
+        histogram = LatencyHistogram()
+        buckets = len(histogram.counts)
+        for value in range(0, 10_000_000, 997):
+            histogram.record(value)
+        self.assertEqual(len(histogram.counts), buckets)
+        self.assertIsNone(LatencyHistogram().percentile(0.5))
+
+
+class RollingWindowTests(unittest.TestCase):
+    def test_last_n_evicts_oldest(self):
+        window = LastNWindow(3, LatencyHistogram())
+        for value in (10, 20, 30, 40, 50):
+            window.record(value)
+        self.assertEqual(window.histogram.count, 3)
+        self.assertEqual(window.histogram.percentile(0.01), 30)
+
+    def test_time_window_drops_expired_slots(self):
+        clock = _FakeClock()
+        window = TimeWindow(300.0, 5, LatencyHistogram(), clock)
+        window.record(10)
+        clock.now = 200.0
+        window.record(20)
+        self.assertEqual(window.merged().count, 2)
+
+        clock.now = 330.0
+        merged = window.merged()
+        self.assertEqual(merged.count, 1)
+        self.assertEqual(merged.percentile(0.5), 20)
+
+
+class PerfCollectorTests(unittest.TestCase):
+    def test_splits_by_color_and_reason(self):
+        collector = PerfCollector(last_n=10, clock=_FakeClock())
+        collector.record({"req_color": "黄", "success": True, "lock_latency_us": 90_000, "first_match_latency_us": 60_000})
+        collector.record({"req_color": "蓝", "success": True, "lock_latency_us": 120_000, "first_match_latency_us": 80_000})
+        collector.record({"req_color": "蓝", "success": False, "fail_reason": "timeout_no_confirm", "first_match_latency_us": 70_000})
+
+        snap = collector.snapshot()
+        self.assertEqual(snap["total"], 3)
+        self.assertEqual(snap["failures"], {"timeout_no_confirm": 1})
+        self.assertEqual(snap["failures_by_color"], {"蓝": {"timeout_no_confirm": 1}})
+        self.assertEqual(snap["latency"]["lock"]["all"]["session"]["count"], 2)
+        self.assertEqual(snap["latency"]["lock"]["蓝"]["session"]["count"], 1)
+        self.assertEqual(snap["latency"]["first_match"]["蓝"]["session"]["count"], 2)
+        self.assertIn("[perf] lock[all]", collector.format_report())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+import unittest
+from dataclasses import replace
+
+from app.config import AppConfig
+from app.phase_tracker import CardPhaseTracker, PhasePrediction
+from app.selector import Selector
+from app.simulation import CardCycleConfig, CardCycleSimulator
+
+ORDER = ("蓝", "红", "黄")
+
+
+def _feed_cycle(tracker, start, period, cards, poll=0.004):
+    ts = start
+    end = start + period * cards
+    while ts < end:
+        index = int((ts - start) / period)
+        tracker.observe(ts, ORDER[index % len(ORDER)])
+        ts += poll
+    return ts
+
+
+class CardPhaseTrackerTests(unittest.TestCase):
+    def test_learns_period_and_order(self):
+        tracker = CardPhaseTracker(initial_period=0.1)
+        tracker.begin_cycle(0.0)
+        _feed_cycle(tracker, 0.0, 0.15, 9)
+
+        self.assertAlmostEqual(tracker.period, 0.15, delta=0.006)
+        self.assertEqual(tracker.next_color("蓝")[0], "红")
+        self.assertEqual(tracker.next_color("黄"), ("蓝", 1.0))
+        self.assertGreater(tracker.confidence(), 0.5)
+
+    def test_predicts_window_of_target_card(self):
+        tracker = CardPhaseTracker(initial_period=0.1)
+        tracker.begin_cycle(0.0)
+        now = _feed_cycle(tracker, 0.0, 0.15, 7)  # ends inside the 7th card (blue)
+
+        prediction = tracker.predict("黄", now)
+        self.assertEqual(tracker.current_color, "蓝")
+        self.assertEqual(prediction.steps, 2)
+        self.assertAlmostEqual(prediction.expected_start_ts, 0.15 * 8, delta=0.03)
+        self.assertLess(prediction.window_start_ts, prediction.expected_start_ts)
+        self.assertGreater(prediction.window_end_ts, prediction.expected_start_ts + tracker.period)
+
+    def test_no_prediction_before_enough_samples(self):
+        tracker = CardPhaseTracker()
+        tracker.begin_cycle(0.0)
+        tracker.observe(0.01, "蓝")
+        self.assertIsNone(tracker.predict("黄", 0.02))
+        self.assertEqual(tracker.confidence(), 0.0)
+
+    def test_sparse_transitions_do_not_train_period(self):
+        tracker = CardPhaseTracker(initial_period=0.1)
+        tracker.begin_cycle(0.0)
+        for i, ts in enumerate((0.0, 0.05, 0.2, 0.4)):
+            tracker.observe(ts, ORDER[i % 3])
+        self.assertEqual(tracker.sample_count, 0)
+
+
+class _PreemptCountingSelector(Selector):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.preempts = 0
+
+    def _should_preempt(self, prediction, now):
+        fired = super()._should_preempt(prediction, now)
+        self.preempts += fired
+        return fired
+
+
+class SelectorPhaseTrackingTests(unittest.TestCase):
+    def _config(self, **timing):
+        config = AppConfig()
+        return replace(config, timing=replace(config.timing, **timing))
+
+    def test_tracking_reduces_polls_without_hurting_accuracy(self):
+        baseline = CardCycleSimulator(app_config=self._config(phase_tracking_enabled=False), seed=4).run(150)
+        tracked = CardCycleSimulator(app_config=self._config(phase_tracking_enabled=True), seed=4).run(150)
+
+        self.assertEqual(tracked.success_rate(), baseline.success_rate())
+        self.assertEqual(tracked.wrong_card_rate(), 0.0)
+        self.assertLess(tracked.polls_per_draw(), baseline.polls_per_draw())
+
+    def test_tracking_never_adds_wrong_cards_under_noise(self):
+        # Noisy blends between cards make single frames match the wrong colour; tracking may change when
+        # the selector polls, but must not lock more of those frames than the plain poll loop does.
+        cycle = CardCycleConfig(color_noise=25.0, transition_frames=4)
+        for seed in (1, 5):
+            baseline = CardCycleSimulator(
+                app_config=self._config(phase_tracking_enabled=False), cycle=cycle, seed=seed
+            ).run(400)
+            tracked = CardCycleSimulator(
+                app_config=self._config(phase_tracking_enabled=True), cycle=cycle, seed=seed
+            ).run(400)
+
+            self.assertLessEqual(tracked.wrong_card_rate(), baseline.wrong_card_rate(), seed)
+            converged = slice(200, None)
+            self.assertLessEqual(
+                sum(o.wrong_card for o in tracked.outcomes[converged]),
+                sum(o.wrong_card for o in baseline.outcomes[converged]),
+                seed,
+            )
+            self.assertLess(tracked.polls_per_draw(), baseline.polls_per_draw(), seed)
+
+    def test_preempt_lands_inside_the_predicted_card(self):
+        sim = CardCycleSimulator(app_config=self._config(phase_lock_lead=0.012))
+        # Target due at 1.0 give or take 20ms, for one 160ms period.
+        prediction = PhasePrediction(1.0, 0.98, 1.18, steps=1, confidence=0.7)
+        self.assertFalse(sim.selector._should_preempt(prediction, 1.0))
+        self.assertTrue(sim.selector._should_preempt(prediction, 1.008))
+        self.assertFalse(sim.selector._should_preempt(prediction, 1.13))
+        self.assertFalse(sim.selector._should_preempt(replace(prediction, steps=2), 1.008))
+
+        # A lead beyond one frame is capped, so it cannot pull the lock ahead of the window.
+        sim = CardCycleSimulator(app_config=self._config(phase_lock_lead=0.05))
+        self.assertFalse(sim.selector._should_preempt(prediction, 1.0))
+        self.assertTrue(sim.selector._should_preempt(prediction, 1.005))
+
+    def test_preempt_fires_without_adding_wrong_cards(self):
+        # The simulated game locks 15ms after the press, so a 15ms lead is the largest safe one.
+        cycle = CardCycleConfig(color_noise=25.0, transition_frames=4)
+        for seed in (1, 2):
+            baseline = CardCycleSimulator(
+                app_config=self._config(phase_tracking_enabled=True), cycle=cycle, seed=seed
+            ).run(400)
+            sim = CardCycleSimulator(
+                app_config=self._config(phase_tracking_enabled=True, phase_lock_lead=cycle.lock_delay),
+                cycle=cycle,
+                seed=seed,
+                selector_factory=_PreemptCountingSelector,
+            )
+            preempted = sim.run(400)
+
+            self.assertGreater(sim.selector.preempts, 0, seed)
+            self.assertLessEqual(preempted.wrong_card_rate(), baseline.wrong_card_rate(), seed)
+            self.assertLess(preempted.summary()["lock_p50_ms"], baseline.summary()["lock_p50_ms"], seed)
+
+    def test_no_window_for_a_target_seen_before_any_transition(self):
+        tracker = CardPhaseTracker(initial_period=0.1)
+        tracker.begin_cycle(0.0)
+        now = _feed_cycle(tracker, 0.0, 0.15, 7)
+        tracker.begin_cycle(now + 1.0)
+        tracker.observe(now + 1.004, "红")
+        self.assertIsNone(tracker.predict("红", now + 1.008))
+        self.assertIsNotNone(tracker.predict("黄", now + 1.008))
+
+    def test_results_report_phase_confidence(self):
+        report = CardCycleSimulator(app_config=self._config(phase_tracking_enabled=True), seed=4).run(30)
+        self.assertTrue(any(o.phase_confidence for o in report.outcomes))
+
+    def test_tracking_is_opt_in(self):
+        report = CardCycleSimulator(seed=4).run(5)
+        self.assertTrue(all(o.phase_confidence is None for o in report.outcomes))
+
+
+if __name__ == "__main__":
+    unittest.main()
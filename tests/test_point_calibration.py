@@ -0,0 +1,63 @@
+import unittest
+
+from app.capture import SyntheticFrameSource
+from app.color_detector import ColorDetector
+from app.config import AppConfig
+from app.point_calibration import PointCalibrator, analyze_burst
+
+YELLOW = (222, 188, 62)
+BACKGROUND = (40, 40, 40)
+
+
+def _detector(source):
+    return ColorDetector(AppConfig().colors, 0.0, frame_source=source)
+
+
+class AnalyzeBurstTests(unittest.TestCase):
+    def test_best_point_moves_into_the_stable_area(self):
+        source = SyntheticFrameSource(fill=BACKGROUND)
+        source.fill_rect(101, 90, 12, 20, YELLOW)
+        reports = []
+        calibrator = PointCalibrator(_detector(source), reports.append, frames=4, radius=4, sleep=lambda _s: None)
+        calibrator.submit(100, 100)
+        report = calibrator.run_pending()
+
+        self.assertEqual(reports, [report])
+        self.assertEqual(report.frames, 4)
+        self.assertEqual(report.dominant, "黄")
+        self.assertAlmostEqual(report.center_ratio, 3 / 9)
+        self.assertEqual(report.best, (102, 100))
+        self.assertEqual(report.best_ratio, 1.0)
+        self.assertAlmostEqual(report.hit_ratios["黄"], 4 * 9 / 81)
+        self.assertEqual(source.grab_count, 4)
+        self.assertIn("建议取色点 (102, 100)", report.format())
+
+    def test_flicker_lowers_the_ratio(self):
+        # Frame masks for a 3x3 patch: the centre pixel is yellow in only half of the frames.
+        yellow = 1
+        steady = [yellow] * 9
+        flicker = [yellow] * 4 + [0] + [yellow] * 4
+        report = analyze_burst([steady, flicker], 3, 10, 10, sample_radius=0)
+        self.assertEqual(report.center_ratio, 0.5)
+        self.assertEqual(report.best_ratio, 1.0)
+        self.assertEqual(report.best, (10, 9))
+
+    def test_no_card_color_nearby(self):
+        calibrator = PointCalibrator(_detector(SyntheticFrameSource(fill=BACKGROUND)), lambda _r: None, frames=2)
+        calibrator.submit(5, 5)
+        report = calibrator.run_pending()
+        self.assertIsNone(report.dominant)
+        self.assertEqual(report.best, (5, 5))
+
+    def test_newer_click_supersedes_pending_one(self):
+        reports = []
+        calibrator = PointCalibrator(_detector(SyntheticFrameSource()), reports.append, frames=1)
+        calibrator.submit(1, 1)
+        calibrator.submit(2, 2)
+        calibrator.run_pending()
+        self.assertIsNone(calibrator.run_pending())
+        self.assertEqual([(r.x, r.y) for r in reports], [(2, 2)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import subprocess
+import sys
+import threading
+import unittest
+
+from app.capture import SyntheticFrameSource
+from app.change_gate import ChangeGate
+from app.color_detector import ColorDetector
+from app.config import AppConfig
+from app.perf import StageTimers
+from app.prewarm import run_prewarm
+from app.selector import Selector
+from app.state import SharedState
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _RecordingSource(SyntheticFrameSource):
+    def __init__(self):
+        super().__init__(fill=(222, 188, 62))
+        self.threads = []
+
+    def grab(self, patch):
+        self.threads.append(threading.current_thread().name)
+        return super().grab(patch)
+
+
+class RunPrewarmTests(unittest.TestCase):
+    def test_times_each_step_and_survives_failures(self):
+        calls = []
+        logged = []
+
+        def broken():
+            raise OSError("no display")
+
+        ticks = iter([0.0, 0.002, 0.002, 0.005])
+        timings = run_prewarm(
+            [("capture", lambda: calls.append("capture")), ("focus", broken)],
+            clock=lambda: next(ticks),
+            log=logged.append,
+        )
+        self.assertEqual(calls, ["capture"])
+        self.assertEqual(list(timings), ["capture", "focus"])
+        self.assertAlmostEqual(timings["capture"], 2.0)
+        self.assertAlmostEqual(timings["focus"], 3.0)
+        self.assertEqual(len(logged), 1)
+
+
+class ColorDetectorPrewarmTests(unittest.TestCase):
+    def test_prewarm_grabs_without_touching_gate_or_stages(self):
+        config = AppConfig()
+        source = _RecordingSource()
+        gate = ChangeGate()
+        stages = StageTimers()
+        detector = ColorDetector(
+            config.colors,
+            0.0,
+            sample_radius_px=2,
+            frame_source=source,
+            regions=config.timing.roi_regions,
+            change_gate=gate,
+            stages=stages,
+        )
+        detector.prewarm(10, 10)
+        self.assertEqual(len(source.threads), 2)  # the sample patch and the ROI patch
+        self.assertEqual((gate.hits, gate.misses), (0, 0))
+        self.assertTrue(all(h.count == 0 for h in stages.histograms.values()))
+
+
+class SelectorPrewarmTests(unittest.TestCase):
+    def test_prewarm_runs_on_worker_before_ready(self):
+        seen = []
+        selector = Selector(
+            config=AppConfig(),
+            state=SharedState(),
+            color_detector=object(),
+            window_guard=object(),
+            click_w=lambda *_args: None,
+            debug_log=lambda *_args: None,
+            on_result=None,
+        )
+        self.assertFalse(selector.ready.is_set())
+        selector.start(prewarm=lambda: seen.append(threading.current_thread().name))
+        self.assertTrue(selector.ready.wait(1.0))
+        self.assertEqual(seen, ["selector"])
+
+
+class LazyImportTests(unittest.TestCase):
+    def test_main_does_not_import_optional_heavy_modules(self):
+        code = "import sys, main; print(sorted(m for m in ('numpy', 'http.server', 'psutil', 'pynput') if m in sys.modules))"
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.strip(), "[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
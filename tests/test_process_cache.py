@@ -0,0 +1,151 @@
+import types
+import unittest
+
+from app.process_cache import ProcessNameCache
+
+
+class _NoSuchProcess(Exception):
+    pass
+
+
+class _FakeOS:
+    def __init__(self):
+        self.processes = {}
+        self.name_calls = 0
+        self.opens = 0
+
+    def spawn(self, pid, name, create_time):
+        self.processes[pid] = (name, create_time)
+
+    def module(self):
+        fake_os = self
+
+        class Process:
+            def __init__(self, pid):
+                fake_os.opens += 1
+                if pid not in fake_os.processes:
+                    raise _NoSuchProcess(pid)
+                self._pid = pid
+                self._create_time = fake_os.processes[pid][1]
+
+            def create_time(self):
+                return self._create_time
+
+            def name(self):
+                fake_os.name_calls += 1
+                return fake_os.processes[self._pid][0]
+
+        return types.SimpleNamespace(Process=Process, Error=_NoSuchProcess)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _hwnd(pid, window=0):
+    return pid * 1000 + window
+
+
+class ProcessNameCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        self.os = _FakeOS()
+        self.os.spawn(1, "League of Legends.exe", 100.0)
+        self.os.spawn(2, "LeagueClientUx.exe", 50.0)
+        self.os.spawn(3, "chrome.exe", 10.0)
+
+    def test_alt_tab_between_processes_hits_after_first_lookup(self):
+        cache = ProcessNameCache(capacity=8, psutil_module=self.os.module())
+        for _ in range(10):
+            for pid in (1, 2, 3):
+                cache.lookup(pid, _hwnd(pid))
+        self.assertEqual(self.os.name_calls, 3)
+        self.assertEqual(self.os.opens, 3)
+        self.assertEqual((cache.hits, cache.misses), (27, 3))
+        self.assertAlmostEqual(cache.hit_rate(), 0.9)
+
+    def _cache(self, **kwargs):
+        return ProcessNameCache(psutil_module=self.os.module(), max_age=5.0, clock=self.clock, **kwargs)
+
+    def test_reused_pid_is_not_confused_with_old_process(self):
+        cache = self._cache()
+        self.assertEqual(cache.lookup(3, _hwnd(3)), "chrome.exe")
+        self.os.spawn(3, "League of Legends.exe", 200.0)
+        self.clock.now = 5.0
+        self.assertEqual(cache.lookup(3, _hwnd(3, 1)), "League of Legends.exe")
+        self.assertEqual(len(cache), 1)
+        self.assertEqual((cache.reused, cache.exited), (1, 0))
+
+    def test_pid_reused_within_max_age_is_caught_by_its_new_window(self):
+        cache = self._cache()
+        self.assertEqual(cache.lookup(3, _hwnd(3)), "chrome.exe")
+        self.os.spawn(3, "League of Legends.exe", 200.0)
+        self.clock.now = 0.5
+        self.assertEqual(cache.lookup(3, _hwnd(3, 1)), "League of Legends.exe")
+        self.assertEqual(cache.reused, 1)
+
+    def test_second_window_of_same_process_is_revalidated_once(self):
+        cache = self._cache()
+        cache.lookup(1, _hwnd(1))
+        for _ in range(3):
+            self.assertEqual(cache.lookup(1, _hwnd(1, 1)), "League of Legends.exe")
+            self.assertEqual(cache.lookup(1, _hwnd(1)), "League of Legends.exe")
+        self.assertEqual((self.os.opens, self.os.name_calls), (2, 1))
+        self.assertEqual((cache.hits, cache.revalidated, cache.reused), (6, 1, 0))
+
+    def test_lookup_without_window_always_checks_create_time(self):
+        cache = self._cache()
+        cache.lookup(1, _hwnd(1))
+        self.assertEqual(cache.lookup(1), "League of Legends.exe")
+        self.assertEqual((self.os.opens, self.os.name_calls), (2, 1))
+
+    def test_old_entry_is_revalidated_without_reading_the_name(self):
+        cache = self._cache()
+        cache.lookup(1, _hwnd(1))
+        self.clock.now = 6.0
+        self.assertEqual(cache.lookup(1, _hwnd(1)), "League of Legends.exe")
+        self.assertEqual((self.os.opens, self.os.name_calls), (2, 1))
+        self.assertEqual((cache.hits, cache.revalidated), (1, 1))
+
+        self.clock.now = 10.0
+        cache.lookup(1, _hwnd(1))
+        self.assertEqual(self.os.opens, 2)
+
+    def test_exited_process_is_counted_apart_from_reuse(self):
+        cache = self._cache()
+        cache.lookup(3)
+        del self.os.processes[3]
+        self.clock.now = 5.0
+        self.assertEqual(cache.lookup(3), "")
+        self.assertEqual(len(cache), 0)
+        self.assertEqual((cache.reused, cache.exited), (0, 1))
+
+    def test_capacity_evicts_least_recently_used(self):
+        cache = ProcessNameCache(capacity=2, psutil_module=self.os.module())
+        cache.lookup(1)
+        cache.lookup(2)
+        cache.lookup(1)
+        cache.lookup(3)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+
+        calls = self.os.name_calls
+        cache.lookup(1)
+        self.assertEqual(self.os.name_calls, calls)
+        cache.lookup(2)
+        self.assertEqual(self.os.name_calls, calls + 1)
+
+    def test_format_stats(self):
+        cache = ProcessNameCache(psutil_module=self.os.module())
+        self.assertIn("hit_rate=n/a", cache.format_stats())
+        cache.lookup(1)
+        cache.lookup(1)
+        self.assertIn("hits=1 misses=1 hit_rate=50.0%", cache.format_stats())
+
+
+if __name__ == "__main__":
+    unittest.main()
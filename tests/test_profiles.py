@@ -0,0 +1,188 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from app.capture import PatchBuffer
+from app.color_lut import build_lut
+from app.config import ColorThresholds
+from app.profiles import (
+    MONITORINFOF_PRIMARY,
+    DisplayKey,
+    Profile,
+    ProfileStore,
+    ThresholdCalibrator,
+    detect_display_key,
+    patch_pixels,
+)
+from app.simulation import CARD_RGB
+
+KEY_1080 = DisplayKey(1920, 1080, 100)
+KEY_1440 = DisplayKey(2560, 1440, 125)
+
+
+class ProfileStoreTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "profiles.json")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_profiles_round_trip_per_display(self):
+        store = ProfileStore(self.path)
+        store.save_profile(KEY_1080, Profile(100, 200))
+        store.save_profile(KEY_1440, Profile(300, 400, sample_radius_px=2, colors=ColorThresholds(yellow_min_r=190)))
+
+        reloaded = ProfileStore(self.path)
+        self.assertTrue(reloaded.load())
+        self.assertEqual(reloaded.keys(), sorted([str(KEY_1080), str(KEY_1440)]))
+        self.assertEqual(reloaded.get(KEY_1080), Profile(100, 200))
+        self.assertEqual(reloaded.get(KEY_1440).colors.yellow_min_r, 190)
+        self.assertEqual(reloaded.get(KEY_1440).sample_radius_px, 2)
+        self.assertEqual(os.listdir(self._tmp.name), ["profiles.json"])
+
+    def test_update_profile_keeps_unchanged_fields(self):
+        store = ProfileStore(self.path)
+        store.save_profile(KEY_1080, Profile(1, 2, sample_radius_px=3))
+        updated = store.update_profile(KEY_1080, Profile(0, 0), x=10, y=20)
+        self.assertEqual(updated, Profile(10, 20, sample_radius_px=3))
+
+    def test_scheduled_updates_merge_and_write_on_flush(self):
+        store = ProfileStore(self.path)
+        store.save_profile(KEY_1080, Profile(1, 2))
+        store.schedule_update(KEY_1080, Profile(0, 0), tuning={"window": 1})
+        store.schedule_update(KEY_1080, Profile(0, 0), tuning={"window": 2}, sample_radius_px=3)
+        store.schedule_update(KEY_1440, Profile(5, 6), tuning={"window": 3})
+        self.assertIsNone(store.get(KEY_1080).tuning)
+
+        self.assertEqual(store.flush_pending(), 2)
+        reloaded = ProfileStore(self.path)
+        reloaded.load()
+        self.assertEqual(reloaded.get(KEY_1080), Profile(1, 2, sample_radius_px=3, tuning={"window": 2}))
+        self.assertEqual(reloaded.get(KEY_1440), Profile(5, 6, tuning={"window": 3}))
+        self.assertEqual(store.flush_pending(), 0)
+
+    def test_stop_writes_pending_updates(self):
+        store = ProfileStore(self.path)
+        store.start_watching(lambda _store: None, interval=60.0)
+        store.schedule_update(KEY_1080, Profile(7, 8), tuning={"window": 4})
+        store.stop()
+        reloaded = ProfileStore(self.path)
+        reloaded.load()
+        self.assertEqual(reloaded.get(KEY_1080).tuning, {"window": 4})
+
+    def test_reload_if_changed_picks_up_external_edits(self):
+        store = ProfileStore(self.path)
+        store.save_profile(KEY_1080, Profile(1, 2))
+        self.assertFalse(store.reload_if_changed())
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        payload["profiles"][str(KEY_1080)]["x"] = 42
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        self.assertTrue(store.reload_if_changed())
+        self.assertEqual(store.get(KEY_1080).x, 42)
+
+    def test_corrupt_file_keeps_current_profiles(self):
+        store = ProfileStore(self.path)
+        store.save_profile(KEY_1080, Profile(1, 2))
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("{not json")
+
+        self.assertFalse(store.load())
+        self.assertEqual(store.get(KEY_1080), Profile(1, 2))
+
+    def test_missing_file_is_not_an_error(self):
+        store = ProfileStore(self.path)
+        self.assertFalse(store.load())
+        self.assertIsNone(store.get(KEY_1080))
+
+
+class ThresholdCalibratorTests(unittest.TestCase):
+    def _noisy(self, rng, rgb, noise=10):
+        return [tuple(min(255, max(0, int(c + rng.gauss(0, noise)))) for c in rgb) for _ in range(200)]
+
+    def test_fit_classifies_sampled_cards(self):
+        rng = random.Random(3)
+        # Dimmer cards than the defaults expect, e.g. a different brightness setting.
+        dim = {color: tuple(int(c * 0.75) for c in rgb) for color, rgb in CARD_RGB.items()}
+        calibrator = ThresholdCalibrator()
+        for color, rgb in dim.items():
+            calibrator.add_pixels(color, self._noisy(rng, rgb))
+
+        lut = build_lut(calibrator.fit())
+        for color, rgb in dim.items():
+            samples = self._noisy(rng, rgb)
+            hits = sum(1 for r, g, b in samples if lut.color_name(r, g, b) == color)
+            self.assertGreaterEqual(hits / len(samples), 0.95, color)
+
+    def test_fit_without_samples_keeps_base(self):
+        base = ColorThresholds(red_min_r=170)
+        self.assertEqual(ThresholdCalibrator().fit(base), base)
+
+    def test_patch_pixels_reads_rgb(self):
+        patch = PatchBuffer(2, 1)
+        patch.data[0:8] = bytes((3, 2, 1, 0, 30, 20, 10, 0))
+        self.assertEqual(patch_pixels(patch), [(1, 2, 3), (10, 20, 30)])
+
+
+class _FakeUser32:
+    # Two monitors: the primary 1920x1080 at the origin and a 2560x1440 one to its right.
+    MONITORS = {
+        1: ((0, 0, 1920, 1080), MONITORINFOF_PRIMARY, "\\\\.\\DISPLAY1"),
+        2: ((1920, 0, 4480, 1440), 0, "\\\\.\\DISPLAY2"),
+    }
+
+    def __init__(self, window_monitor):
+        self._window_monitor = window_monitor
+
+    def MonitorFromWindow(self, _hwnd, _flags):
+        return self._window_monitor
+
+    def MonitorFromPoint(self, _point, _flags):
+        return 1
+
+    def GetMonitorInfoW(self, monitor, info_ref):
+        (left, top, right, bottom), flags, device = self.MONITORS[monitor]
+        info = info_ref._obj
+        info.rcMonitor.left, info.rcMonitor.top, info.rcMonitor.right, info.rcMonitor.bottom = left, top, right, bottom
+        info.dwFlags = flags
+        info.szDevice = device
+        return 1
+
+    def GetDpiForSystem(self):
+        return 96
+
+
+class _FakeShcore:
+    def __init__(self, dpi):
+        self._dpi = dpi
+
+    def GetDpiForMonitor(self, monitor, _kind, dpi_x_ref, dpi_y_ref):
+        dpi_x_ref._obj.value = dpi_y_ref._obj.value = self._dpi[monitor]
+        return 0
+
+
+class DetectDisplayKeyTests(unittest.TestCase):
+    def test_keys_by_the_game_window_monitor(self):
+        shcore = _FakeShcore({1: 96, 2: 144})
+        key = detect_display_key(hwnd=42, user32=_FakeUser32(2), shcore=shcore)
+        self.assertEqual(key, DisplayKey(2560, 1440, 150, "DISPLAY2"))
+
+    def test_primary_monitor_keeps_legacy_name(self):
+        key = detect_display_key(hwnd=42, user32=_FakeUser32(1), shcore=_FakeShcore({1: 120, 2: 96}))
+        self.assertEqual(key, DisplayKey(1920, 1080, 125, "0"))
+
+    def test_without_window_uses_primary_and_system_dpi(self):
+        key = detect_display_key(user32=_FakeUser32(2), shcore=None)
+        self.assertEqual(key, DisplayKey(1920, 1080, 100, "0"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,230 @@
+import ctypes
+import os
+import threading
+import unittest
+
+from app.config import AppConfig
+from app.realtime import PosixPriorityApi, PriorityApi, RealtimeMode, WindowsPriorityApi, measure_stalls
+
+
+class _FakeApi(PriorityApi):
+    process_levels = {"normal": 0, "high": 10}
+    thread_levels = {"normal": 0, "highest": 2}
+
+    def __init__(self, cpus=8, deny_process=False):
+        self.process = 0
+        self.threads = {}
+        self.affinity = {}
+        self.timer = []
+        self._cpus = cpus
+        self._deny_process = deny_process
+
+    def process_priority(self):
+        return self.process
+
+    def set_process_priority(self, value):
+        if self._deny_process:
+            raise PermissionError("denied")
+        self.process = value
+
+    def thread_priority(self, thread_id):
+        return self.threads.get(thread_id, 0)
+
+    def set_thread_priority(self, thread_id, value):
+        self.threads[thread_id] = value
+
+    def set_thread_affinity(self, thread_id, cpus):
+        previous = self.affinity.get(thread_id, tuple(range(self._cpus)))
+        self.affinity[thread_id] = tuple(cpus)
+        return previous
+
+    def begin_timer_resolution(self, ms):
+        self.timer.append(ms)
+        return True
+
+    def end_timer_resolution(self, ms):
+        self.timer.remove(ms)
+
+    def cpu_count(self):
+        return self._cpus
+
+
+class RealtimeModeTests(unittest.TestCase):
+    def test_enter_and_restore_round_trip(self):
+        api = _FakeApi()
+        mode = RealtimeMode(api, log=lambda _line: None)
+        mode.enter()
+        thread = threading.current_thread()
+        mode.promote_thread(thread, pin=True)
+        self.assertEqual(api.process, 10)
+        self.assertEqual(api.timer, [1])
+        self.assertEqual(api.threads[thread.native_id], 2)
+        self.assertEqual(api.affinity[thread.native_id], (7,))
+        self.assertEqual(len(mode.applied), 4)
+
+        mode.restore()
+        self.assertEqual((api.process, api.timer, api.threads[thread.native_id]), (0, [], 0))
+        self.assertEqual(api.affinity[thread.native_id], tuple(range(8)))
+        self.assertFalse(mode.active)
+
+    def test_failures_are_logged_and_skipped(self):
+        lines = []
+        api = _FakeApi(deny_process=True)
+        mode = RealtimeMode(api, log=lines.append)
+        mode.enter()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(mode.applied, ["计时器精度"])
+
+    def test_cpu_choice_is_clamped(self):
+        self.assertEqual(RealtimeMode(_FakeApi(cpus=4), cpu=-2).pinned_cpu, 2)
+        self.assertEqual(RealtimeMode(_FakeApi(cpus=4), cpu=9).pinned_cpu, 3)
+
+    def test_from_config(self):
+        mode = RealtimeMode.from_config(AppConfig(realtime_cpu=1), api=_FakeApi())
+        self.assertEqual(mode.pinned_cpu, 1)
+
+
+class StallProbeTests(unittest.TestCase):
+    def test_counts_overshooting_sleeps(self):
+        now = [0.0]
+        overshoots = iter([0.0, 0.004, 0.0, 0.010] * 10)
+
+        def sleep(duration):
+            now[0] += duration + next(overshoots)
+
+        stats = measure_stalls(0.018, clock=lambda: now[0], sleep=sleep)
+        self.assertEqual(stats.samples, 4)
+        self.assertEqual(stats.stalls, 2)
+        self.assertAlmostEqual(stats.max_overshoot, 0.010)
+        self.assertGreater(stats.stalls_per_second(), 0)
+
+
+PSEUDO_PROCESS = 0xFFFFFFFFFFFFFFFF
+
+
+class _Function:
+    # Converts arguments the way a ctypes foreign function does: through argtypes when declared,
+    # otherwise as a C int, which is where an undeclared 64-bit handle fails.
+    def __init__(self, impl):
+        self._impl = impl
+        self.argtypes = None
+        self.restype = ctypes.c_int
+
+    def __call__(self, *args):
+        if self.argtypes is None:
+            for arg in args:
+                if isinstance(arg, int) and not -(2**31) <= arg < 2**31:
+                    raise ctypes.ArgumentError("argument: int too long to convert")
+        else:
+            for argtype, arg in zip(self.argtypes, args):
+                argtype.from_param(arg)
+        return self._impl(*args)
+
+
+class _FakeKernel32:
+    def __init__(self):
+        self.priority_class = 0x20
+        self.thread_priorities = {}
+        self.masks = {}
+        self.open_handles = set()
+        self.GetCurrentProcess = _Function(lambda: PSEUDO_PROCESS)
+        self.OpenThread = _Function(self._open_thread)
+        self.CloseHandle = _Function(self._close_handle)
+        self.GetPriorityClass = _Function(self._get_class)
+        self.SetPriorityClass = _Function(self._set_class)
+        self.GetThreadPriority = _Function(lambda handle: self.thread_priorities.get(handle, 0))
+        self.SetThreadPriority = _Function(self._set_thread)
+        self.SetThreadAffinityMask = _Function(self._set_mask)
+
+    def _open_thread(self, access, inherit, thread_id):
+        handle = 0x1000 + thread_id % 0x1000
+        self.open_handles.add(handle)
+        return handle
+
+    def _close_handle(self, handle):
+        self.open_handles.remove(handle)
+        return 1
+
+    def _get_class(self, handle):
+        assert handle == PSEUDO_PROCESS
+        return self.priority_class
+
+    def _set_class(self, handle, value):
+        assert handle == PSEUDO_PROCESS
+        self.priority_class = value
+        return 1
+
+    def _set_thread(self, handle, value):
+        self.thread_priorities[handle] = value
+        return 1
+
+    def _set_mask(self, handle, mask):
+        previous = self.masks.get(handle, 0xFF)
+        self.masks[handle] = mask
+        return previous
+
+
+class _FakeWinmm:
+    def __init__(self):
+        self.periods = []
+        self.timeBeginPeriod = _Function(lambda ms: self.periods.append(ms) or 0)
+        self.timeEndPeriod = _Function(lambda ms: self.periods.remove(ms) or 0)
+
+
+class WindowsPriorityApiTests(unittest.TestCase):
+    def _mode(self, kernel32, logged):
+        api = WindowsPriorityApi(kernel32=kernel32, winmm=_FakeWinmm())
+        api.cpu_count = lambda: 8
+        return RealtimeMode(api=api, log=logged.append)
+
+    def test_round_trip_with_64_bit_pseudo_handle(self):
+        kernel32 = _FakeKernel32()
+        logged = []
+        mode = self._mode(kernel32, logged)
+        mode.enter()
+        mode.promote_thread(threading.current_thread(), pin=True)
+        self.assertEqual(logged, [])
+        self.assertEqual(kernel32.priority_class, 0x80)
+        self.assertEqual(list(kernel32.thread_priorities.values()), [2])
+        self.assertEqual(list(kernel32.masks.values()), [1 << 7])
+
+        mode.restore()
+        self.assertEqual(logged, [])
+        self.assertEqual(kernel32.priority_class, 0x20)
+        self.assertEqual(list(kernel32.thread_priorities.values()), [0])
+        self.assertEqual(list(kernel32.masks.values()), [0xFF])
+        self.assertEqual(kernel32.open_handles, set())
+
+    def test_argument_errors_are_logged_not_raised(self):
+        kernel32 = _FakeKernel32()
+        logged = []
+        mode = self._mode(kernel32, logged)
+        kernel32.GetPriorityClass.argtypes = None
+        mode.enter()
+        self.assertEqual(len(logged), 1)
+        self.assertEqual(kernel32.priority_class, 0x20)
+
+
+@unittest.skipUnless(hasattr(os, "sched_setaffinity"), "thread affinity needs sched_setaffinity")
+class PosixPriorityApiTests(unittest.TestCase):
+    def test_pins_and_restores_a_worker_thread(self):
+        api = PosixPriorityApi()
+        cpu = max(os.sched_getaffinity(0))
+        seen = []
+        release = threading.Event()
+
+        def worker():
+            release.wait(1.0)
+            seen.append(os.sched_getaffinity(0))
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        previous = api.set_thread_affinity(thread.native_id, (cpu,))
+        release.set()
+        thread.join()
+        self.assertEqual(seen, [{cpu}])
+        self.assertEqual(set(previous), os.sched_getaffinity(0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+from dataclasses import replace
+
+from app.capture import SyntheticFrameSource
+from app.color_detector import ColorDetector
+from app.config import AppConfig, _parse_roi_regions
+from app.roi import RoiLayout, SampleRegion
+from app.simulation import CardCycleConfig, CardCycleSimulator
+
+YELLOW = (222, 188, 62)
+BLUE = (62, 129, 233)
+REGIONS = AppConfig().timing.roi_regions
+
+
+def _detector(source, regions=REGIONS, sleep=lambda _gap: None):
+    config = AppConfig()
+    return ColorDetector(config.colors, 0.0, sample_radius_px=1, frame_source=source, regions=regions, sleep=sleep)
+
+
+class RoiLayoutTests(unittest.TestCase):
+    def test_bounding_patch_covers_every_region(self):
+        layout = RoiLayout([(0, 0, 2.0), (-8, -8), (8, 8)], radius=1)
+        patch = layout.move_to(100, 200)
+        self.assertEqual((patch.left, patch.top, patch.width, patch.height), (91, 191, 19, 19))
+        self.assertEqual(layout.total_weight, 4.0)
+        self.assertEqual([len(offsets) for offsets in layout.offsets], [9, 9, 9])
+        self.assertEqual(layout.offsets[1][0], 0)
+
+    def test_parse_regions(self):
+        self.assertEqual(_parse_roi_regions("0,0,2; -6,4"), ((0, 0, 2.0), (-6, 4, 1.0)))
+        self.assertEqual(SampleRegion.coerce((3, 4)), SampleRegion(3, 4, 1.0))
+        with self.assertRaises(ValueError):
+            _parse_roi_regions("1")
+
+
+class RoiVoteTests(unittest.TestCase):
+    def test_effect_over_centre_does_not_flip_decision(self):
+        source = SyntheticFrameSource(fill=BLUE)
+        source.fill_rect(99, 199, 3, 3, YELLOW)
+        vote = _detector(source).vote_regions(100, 200)
+        self.assertEqual(vote.color, "蓝")
+        self.assertAlmostEqual(vote.confidence, 4 / 6)
+        self.assertAlmostEqual(vote.scores["黄"], 2.0)
+        self.assertEqual(source.grab_count, 1)
+
+    def test_uniform_card_votes_with_full_confidence(self):
+        vote = _detector(SyntheticFrameSource(fill=YELLOW)).vote_regions(100, 200)
+        self.assertEqual(vote.color, "黄")
+        self.assertAlmostEqual(vote.confidence, 1.0)
+
+    def test_background_gives_no_vote(self):
+        vote = _detector(SyntheticFrameSource(fill=(30, 30, 30))).vote_regions(100, 200)
+        self.assertIsNone(vote.color)
+        self.assertEqual(vote.confidence, 0.0)
+
+    def test_confirmation_takes_a_second_vote_after_the_gap(self):
+        source = SyntheticFrameSource(fill=YELLOW)
+        detector = _detector(source)
+        self.assertTrue(detector.confirm_regions(100, 200, "黄", 0.5))
+        self.assertEqual(source.grab_count, 1)
+
+    def test_card_flipping_during_the_gap_fails_confirmation(self):
+        source = SyntheticFrameSource(fill=YELLOW)
+        detector = _detector(source, sleep=lambda _gap: source.fill_rect(0, 0, 400, 400, BLUE))
+        self.assertEqual(detector.vote_regions(100, 200).confidence, 1.0)
+        self.assertFalse(detector.confirm_regions(100, 200, "黄", 0.5))
+        self.assertEqual(source.grab_count, 2)
+
+
+class RoiSimulationTests(unittest.TestCase):
+    def test_multi_roi_rejects_particle_effects(self):
+        draws = 150
+        cycle = CardCycleConfig(vfx_rate=0.05)
+        config = AppConfig()
+        roi_config = replace(config, timing=replace(config.timing, multi_roi_enabled=True))
+        single = CardCycleSimulator(app_config=config, cycle=cycle, seed=1).run(draws)
+        voted = CardCycleSimulator(app_config=roi_config, cycle=cycle, seed=1).run(draws)
+
+        self.assertGreater(single.wrong_card_rate(), 0.0)
+        self.assertEqual(voted.wrong_card_rate(), 0.0)
+        self.assertEqual(voted.success_rate(), 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
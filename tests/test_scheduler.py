@@ -0,0 +1,84 @@
+import unittest
+
+from app.config import TimingConfig
+from app.scheduler import PollScheduler
+
+
+class _FakeClock:
+    def __init__(self, oversleep: float = 0.0):
+        self.now = 100.0
+        self.oversleep = oversleep
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, duration):
+        self.sleeps.append(duration)
+        self.now += duration + (self.oversleep if duration > 0 else 0.00001)
+
+
+def _scheduler(strategy, clock, **kwargs):
+    return PollScheduler(strategy=strategy, clock=clock.clock, sleep=clock.sleep, **kwargs)
+
+
+class PollSchedulerTests(unittest.TestCase):
+    def test_deadlines_absorb_work_time(self):
+        clock = _FakeClock()
+        scheduler = _scheduler("sleep", clock)
+        scheduler.reset()
+        start = clock.now
+        for tick in range(1, 6):
+            clock.now += 0.001  # simulated poll work
+            woke = scheduler.wait_next(0.004)
+            self.assertAlmostEqual(woke, start + tick * 0.004)
+        self.assertAlmostEqual(scheduler.stats.achieved_interval_ms(), 4.0)
+
+    def test_hybrid_sleeps_then_spins_to_deadline(self):
+        clock = _FakeClock(oversleep=0.0005)
+        scheduler = _scheduler("hybrid", clock, spin_threshold=0.0015)
+        woke = scheduler.wait_next(0.004)
+
+        self.assertAlmostEqual(clock.sleeps[0], 0.0025)
+        self.assertTrue(all(duration == 0 for duration in clock.sleeps[1:]))
+        self.assertGreaterEqual(woke, 100.004)
+        self.assertLess(woke - 100.004, 0.0001)
+
+    def test_sleep_strategy_reports_oversleep_as_jitter(self):
+        clock = _FakeClock(oversleep=0.004)
+        scheduler = _scheduler("sleep", clock)
+        for _ in range(4):
+            scheduler.wait_next(0.004)
+
+        self.assertEqual(scheduler.stats.ticks, 4)
+        self.assertGreater(scheduler.stats.mean_lateness_ms(), 1.0)
+        self.assertGreater(scheduler.stats.late_ticks, 0)
+
+    def test_spin_never_sleeps_for_positive_duration(self):
+        clock = _FakeClock()
+        scheduler = _scheduler("spin", clock)
+        scheduler.wait_next(0.001)
+        self.assertTrue(clock.sleeps)
+        self.assertTrue(all(duration == 0 for duration in clock.sleeps))
+
+    def test_overrun_resyncs_instead_of_bursting(self):
+        clock = _FakeClock()
+        scheduler = _scheduler("sleep", clock)
+        scheduler.wait_next(0.004)
+        clock.now += 0.05
+        woke = scheduler.wait_next(0.004)
+
+        self.assertEqual(scheduler.stats.missed_deadlines, 1)
+        self.assertAlmostEqual(scheduler.wait_next(0.004), woke + 0.004)
+
+    def test_rejects_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            PollScheduler(strategy="turbo")
+
+    def test_from_timing_uses_config(self):
+        scheduler = PollScheduler.from_timing(TimingConfig(poll_strategy="spin"))
+        self.assertEqual(scheduler.strategy, "spin")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,49 +1,11 @@
-import importlib
-import sys
-import types
 import unittest
 
 from app.config import AppConfig
+from app.selector import Selector
 from app.state import SharedState
 
 
-def _import_selector_with_stubs():
-    stub_color_detector = types.ModuleType("app.color_detector")
-    stub_window_guard = types.ModuleType("app.window_guard")
-
-    class _ColorDetector:
-        pass
-
-    class _WindowGuard:
-        pass
-
-    stub_color_detector.ColorDetector = _ColorDetector
-    stub_window_guard.WindowGuard = _WindowGuard
-
-    original_modules = {
-        "app.color_detector": sys.modules.get("app.color_detector"),
-        "app.window_guard": sys.modules.get("app.window_guard"),
-        "app.selector": sys.modules.get("app.selector"),
-    }
-
-    try:
-        sys.modules["app.color_detector"] = stub_color_detector
-        sys.modules["app.window_guard"] = stub_window_guard
-        sys.modules.pop("app.selector", None)
-        return importlib.import_module("app.selector")
-    finally:
-        for name, module in original_modules.items():
-            if module is None:
-                sys.modules.pop(name, None)
-            else:
-                sys.modules[name] = module
-
-
 class SelectorSubmitTests(unittest.TestCase):
-    @classmethod
-    def setUpClass(cls):
-        cls._module = _import_selector_with_stubs()
-
     def _build_selector(self, click_calls):
         def click_w(is_lock_press, request_id):
             click_calls.append((is_lock_press, request_id))
@@ -54,7 +16,7 @@ class SelectorSubmitTests(unittest.TestCase):
         class _WindowGuard:
             pass
 
-        return self._module.Selector(
+        return Selector(
             config=AppConfig(),
             state=SharedState(),
             color_detector=_ColorDetector(),
@@ -0,0 +1,54 @@
+import unittest
+
+from app.simulation import CardCycleConfig, CardCycleSimulator
+
+
+class CardCycleSimulatorTests(unittest.TestCase):
+    def test_same_seed_is_reproducible(self):
+        first = CardCycleSimulator(seed=3).run(40).summary()
+        second = CardCycleSimulator(seed=3).run(40).summary()
+        first.pop("cpu_ms_per_draw")
+        second.pop("cpu_ms_per_draw")
+        self.assertEqual(first, second)
+
+    def test_default_cycle_locks_the_requested_card(self):
+        report = CardCycleSimulator(seed=5).run(60)
+        self.assertEqual(report.success_rate(), 1.0)
+        self.assertEqual(report.wrong_card_rate(), 0.0)
+        self.assertTrue(all(o.lock_latency_ms > 0 for o in report.outcomes))
+
+    def test_late_lock_registers_wrong_cards(self):
+        cycle = CardCycleConfig(lock_delay=CardCycleConfig.card_period, period_jitter=0.0)
+        report = CardCycleSimulator(cycle=cycle, seed=5).run(30)
+        self.assertGreater(report.wrong_card_rate(), 0.5)
+
+    def test_lost_focus_fails_the_draw(self):
+        simulator = CardCycleSimulator(seed=1)
+        simulator.window_guard.allowed = False
+        outcome = simulator.run_draw("黄")
+        self.assertFalse(outcome.success)
+        self.assertEqual(outcome.fail_reason, "inactive_window")
+
+    def test_missing_target_color_times_out(self):
+        simulator = CardCycleSimulator(cycle=CardCycleConfig(order=("蓝", "红")), seed=2)
+        outcome = simulator.run_draw("黄")
+        self.assertFalse(outcome.success)
+        self.assertEqual(outcome.fail_reason, "timeout_no_match")
+
+    def test_cpu_time_excludes_rendering_the_simulated_screen(self):
+        cpu = [0.0]
+        simulator = CardCycleSimulator(seed=1, cpu_clock=lambda: cpu[0])
+        base_rgb_at = simulator.model.base_rgb_at
+
+        def expensive_base_rgb_at(ts):
+            cpu[0] += 1.0
+            return base_rgb_at(ts)
+
+        simulator.model.base_rgb_at = expensive_base_rgb_at
+        outcome = simulator.run_draw("黄")
+        self.assertGreater(simulator.screen.cpu_seconds, 0.0)
+        self.assertEqual(outcome.cpu_ms, 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
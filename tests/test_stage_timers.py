@@ -0,0 +1,40 @@
+import unittest
+
+from app.perf import StageTimers
+from app.simulation import CardCycleSimulator
+
+
+class StageTimersTests(unittest.TestCase):
+    def test_record_chains_timestamps(self):
+        now = [10.0]
+        timers = StageTimers(clock=lambda: now[0])
+        t = timers.clock()
+        now[0] += 0.000250
+        t = timers.record("state", t)
+        now[0] += 0.001
+        timers.record("detect", t)
+        timers.end_draw(0.5)
+
+        self.assertEqual(timers.histograms["state"].max_value, 250)
+        self.assertEqual(timers.histograms["detect"].max_value, 1000)
+        self.assertEqual(timers.polls_per_draw(), 1.0)
+        self.assertEqual(timers.poll_rate_hz(), 2.0)
+        self.assertIn("state(n=1 p50=250us", timers.format_stats())
+
+    def test_simulated_draws_fill_every_stage(self):
+        timers = StageTimers()
+        report = CardCycleSimulator(seed=3, stages=timers).run(20)
+        counts = {stage: histogram.count for stage, histogram in timers.histograms.items()}
+
+        self.assertEqual(timers.draws, 20)
+        self.assertEqual(counts["click"], sum(1 for o in report.outcomes if o.success))
+        self.assertEqual(counts["state"], counts["window"])
+        self.assertGreaterEqual(counts["window"], counts["detect"])
+        self.assertGreaterEqual(counts["capture"], counts["detect"])
+        self.assertGreater(counts["classify"], 0)
+        self.assertGreater(counts["wait"], 0)
+        self.assertIsNotNone(timers.poll_rate_hz())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import threading
+import unittest
+
+from app.state import SharedState
+
+
+class SharedStateSnapshotTests(unittest.TestCase):
+    def test_worker_snapshot_follows_writes(self):
+        state = SharedState()
+        state.set_xy(10, 20)
+        rid = state.register_request("黄", 1.0)
+        self.assertEqual(state.get_worker_snapshot_fast(), (rid, False, 10, 20))
+        self.assertEqual(state.get_request_snapshot(), (rid, "黄", 1.0))
+
+        state.toggle_paused()
+        self.assertEqual(state.get_worker_snapshot_fast(), (rid, True, 10, 20))
+        self.assertTrue(state.has_newer_request(rid - 1))
+        self.assertFalse(state.has_newer_request(rid))
+
+    def test_every_write_bumps_version(self):
+        state = SharedState()
+        version = state.version
+        state.set_xy(1, 2)
+        state.register_request("蓝", 2.0)
+        state.toggle_paused()
+        self.assertEqual(state.version, version + 3)
+
+    def test_hot_path_reads_do_not_wait_for_writers(self):
+        state = SharedState()
+        state.update_window_activity(True, 5.0)
+        results = []
+
+        def reader():
+            results.append(state.get_worker_snapshot_fast())
+            results.append(state.last_active_true_ts())
+            results.append(state.is_paused())
+            results.append(state.get_xy())
+
+        with state._lock:
+            thread = threading.Thread(target=reader, daemon=True)
+            thread.start()
+            thread.join(timeout=1.0)
+            self.assertFalse(thread.is_alive())
+        self.assertEqual(results[1], 5.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
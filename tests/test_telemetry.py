@@ -0,0 +1,196 @@
+import json
+import os
+import tempfile
+import unittest
+import urllib.request
+
+from app.telemetry import RotatingJsonl, TelemetryExporter, render_prometheus
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _result(i: int) -> dict:
+    color = ("黄", "蓝", "红")[i % 3]
+    if i % 10 == 0:
+        return {"req_color": color, "success": False, "fail_reason": "timeout_no_match"}
+    return {
+        "req_color": color,
+        "success": True,
+        "lock_latency_us": 40_000 + (i * 7919) % 150_000,
+        "first_match_latency_us": 20_000 + (i * 104_729) % 100_000,
+    }
+
+
+def _series(body: bytes):
+    # Metric names and labels, without values, so sessions of different length can be compared.
+    return [line.rsplit(" ", 1)[0] for line in body.decode("utf-8").splitlines() if not line.startswith("#")]
+
+
+class CountingCollector:
+    def __init__(self, inner):
+        self.inner = inner
+        self.snapshots = 0
+
+    def record(self, result):
+        self.inner.record(result)
+
+    def snapshot(self):
+        self.snapshots += 1
+        return self.inner.snapshot()
+
+
+class TelemetryExporterTests(unittest.TestCase):
+    def _exporter(self, clock, **kwargs):
+        exporter = TelemetryExporter(clock=clock, wall_clock=clock, log=lambda message: None, **kwargs)
+        exporter.collector = CountingCollector(exporter.collector)
+        return exporter
+
+    def _run_session(self, draws: int, seconds_per_draw: float):
+        clock = _FakeClock()
+        exporter = self._exporter(clock, gauges={"focus_active": lambda: True})
+        for i in range(draws):
+            clock.now += seconds_per_draw
+            exporter.record(_result(i))
+        exporter.publish()
+        return clock, exporter
+
+    def test_scrape_cost_does_not_grow_with_session_length(self):
+        _, short = self._run_session(300, 0.5)
+        clock, long = self._run_session(60_000, 2.0)  # about 33 hours of draws
+
+        before = long.collector.snapshots
+        for _ in range(100):
+            clock.now += 1.0
+            body = long.scrape()
+        # Scrapes never summarize the collector; they serve the last swapped-in snapshot.
+        self.assertEqual(long.collector.snapshots, before)
+        self.assertEqual(long.scrapes, 100)
+        self.assertEqual(_series(body), _series(short.scrape()))
+        self.assertLess(abs(len(body) - len(short.scrape())), 256)
+        self.assertIn(b"tf_snapshot_age_seconds 100.000", body)
+
+    def test_snapshot_carries_counters_failures_and_gauges(self):
+        clock, exporter = self._run_session(30, 1.0)
+        body = exporter.scrape().decode("utf-8")
+        self.assertIn("tf_draws_total 30\n", body)
+        self.assertIn("tf_draws_success_total 27\n", body)
+        self.assertIn('tf_draw_failures_total{reason="timeout_no_match"} 3\n', body)
+        self.assertIn('tf_draw_failures_by_color_total{reason="timeout_no_match",color="蓝"} 1\n', body)
+        self.assertIn('tf_latency_ms{metric="lock",color="all",window="session",quantile="0.99"}', body)
+        self.assertIn('tf_latency_ms_count{metric="lock",color="all",window="session"} 27\n', body)
+        self.assertNotIn('quantile="1"', body)
+        self.assertIn("tf_focus_active 1\n", body)
+        self.assertIn("tf_last_result_age_seconds 0.0\n", body)
+
+        snap = json.loads(exporter.latest_json())
+        self.assertEqual(snap["total"], 30)
+        self.assertEqual(snap["gauges"], {"focus_active": True})
+
+    def test_submit_is_ignored_until_started(self):
+        exporter = self._exporter(_FakeClock())
+        exporter.submit(_result(1))
+        self.assertEqual(exporter.run_pending(), 0)
+        exporter.running = True
+        exporter.submit(_result(1))
+        self.assertEqual(exporter.run_pending(), 1)
+        self.assertEqual(exporter.collector.inner.total, 1)
+
+    def test_failing_gauge_exports_nan(self):
+        def broken():
+            raise RuntimeError("gone")
+
+        exporter = self._exporter(_FakeClock(), gauges={"selector_alive": broken})
+        exporter.publish()
+        self.assertIn(b"tf_selector_alive NaN\n", exporter.scrape())
+
+    def test_http_endpoint_serves_metrics_and_jsonl(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "telemetry.jsonl")
+            exporter = TelemetryExporter(http_port=0, jsonl_path=path, interval=0.05, log=lambda message: None)
+            exporter.start()
+            try:
+                host, port = exporter.server_address
+                self.assertEqual(host, "127.0.0.1")
+                exporter.submit(_result(1))
+                with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=2) as response:
+                    self.assertIn("text/plain", response.headers["Content-Type"])
+                    self.assertIn(b"tf_draws_total", response.read())
+                with urllib.request.urlopen(f"http://{host}:{port}/snapshot", timeout=2) as response:
+                    self.assertIn("total", json.loads(response.read()))
+            finally:
+                exporter.stop()
+            with open(path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            self.assertGreaterEqual(len(lines), 1)
+            self.assertIn("total", json.loads(lines[0]))
+
+    def test_each_family_keeps_one_label_set(self):
+        _, exporter = self._run_session(30, 1.0)
+        label_sets = {}
+        for series in _series(exporter.scrape()):
+            name, _, labels = series.partition("{")
+            keys = tuple(pair.split("=")[0] for pair in labels.rstrip("}").split(",")) if labels else ()
+            label_sets.setdefault(name, set()).add(keys)
+        self.assertEqual({name: keys for name, keys in label_sets.items() if len(keys) > 1}, {})
+
+    def test_families_are_contiguous_and_typed(self):
+        _, exporter = self._run_session(30, 1.0)
+        types = {}
+        order = []
+        for line in exporter.scrape().decode("utf-8").splitlines():
+            if line.startswith("# TYPE "):
+                _, _, name, kind = line.split(" ")
+                self.assertNotIn(name, types)
+                types[name] = kind
+                order.append(name)
+                continue
+            name = line.split("{", 1)[0].split(" ", 1)[0]
+            family = order[-1]
+            if types[family] == "summary":
+                self.assertIn(name, (family, f"{family}_sum", f"{family}_count"))
+            else:
+                self.assertEqual(name, family)
+        self.assertEqual(types["tf_latency_ms"], "summary")
+        self.assertEqual(types["tf_latency_max_ms"], "gauge")
+
+
+class RotatingJsonlTests(unittest.TestCase):
+    def test_rotates_by_size_and_keeps_backups(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "t.jsonl")
+            sink = RotatingJsonl(path, max_bytes=100, backups=2)
+            for i in range(20):
+                sink.write(json.dumps({"i": i, "pad": "x" * 20}))
+            sink.close()
+            self.assertEqual(sorted(os.listdir(tmp)), ["t.jsonl", "t.jsonl.1", "t.jsonl.2"])
+            for name in os.listdir(tmp):
+                self.assertLessEqual(os.path.getsize(os.path.join(tmp, name)), 100)
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(json.loads(f.read().splitlines()[-1])["i"], 19)
+
+
+class RenderPrometheusTests(unittest.TestCase):
+    def test_escapes_label_values(self):
+        snapshot = {
+            "total": 1,
+            "success": 0,
+            "failures": {'bad"reason': 1},
+            "failures_by_color": {},
+            "recent_success_rate": None,
+            "latency": {},
+            "gauges": {},
+            "last_result_age_s": None,
+        }
+        body = render_prometheus(snapshot)
+        self.assertIn('tf_draw_failures_total{reason="bad\\"reason"} 1', body)
+        self.assertIn("tf_recent_success_ratio NaN", body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from dataclasses import replace
+
+from app.adaptive import AdaptiveController, TuningParams
+from app.capture import PatchBuffer
+from app.config import AppConfig
+from app.replay import replay_trace
+from app.simulation import CardCycleConfig, CardCycleSimulator
+from app.trace import (
+    EV_CONFIG,
+    EV_FOCUS,
+    EV_KEY,
+    EV_POLL,
+    EV_REQUEST,
+    EV_RESULT,
+    TraceRecorder,
+    TracingFrameSource,
+    decode_config,
+    read_trace,
+    untraced,
+)
+
+
+class _Source:
+    def grab(self, patch):
+        return True
+
+    def get_pixel(self, px, py):
+        return (1, 2, 3)
+
+
+class TraceRecorderTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "draws.trace")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_events_round_trip_and_file_grows(self):
+        recorder = TraceRecorder(self.path, initial_records=4, flush_interval=0.001)
+        recorder.request(1.0, 7, "黄", 827, 975)
+        for i in range(10):
+            recorder.poll(1.0 + i * 0.004, (222, 188, 62 + i))
+        recorder.key(1.05, True, 7)
+        recorder.focus(1.06, False)
+        recorder.result(1.07, 7, "黄", False, "inactive_window")
+        recorder.close()
+
+        events = read_trace(self.path)
+        self.assertEqual([e.kind for e in events], [EV_REQUEST] + [EV_POLL] * 10 + [EV_KEY, EV_FOCUS, EV_RESULT])
+        self.assertEqual((events[0].color_name, events[0].a, events[0].b), ("黄", 827, 975))
+        self.assertEqual(events[10].rgb, (222, 188, 71))
+        self.assertEqual(events[-1].fail_reason, "inactive_window")
+        self.assertEqual(os.path.getsize(self.path), 32 + 26 * len(events))
+
+    def test_unflushed_tail_is_ignored_by_reader(self):
+        recorder = TraceRecorder(self.path, flush_interval=60.0)
+        recorder.poll(1.0, (1, 2, 3))
+        recorder.flush()
+        recorder.poll(2.0, (4, 5, 6))
+        self.assertEqual(len(read_trace(self.path)), 1)
+        recorder.close()
+        self.assertEqual(len(read_trace(self.path)), 2)
+
+    def test_record_costs_microseconds(self):
+        recorder = TraceRecorder(self.path, flush_interval=0.001)
+        n = 20000
+        t0 = time.perf_counter()
+        for i in range(n):
+            recorder.poll(float(i), (10, 20, 30))
+        per_record_us = (time.perf_counter() - t0) / n * 1_000_000
+        recorder.close()
+        self.assertLess(per_record_us, 20.0)
+        self.assertEqual(recorder.count + recorder.dropped, n)
+
+    def test_concurrent_producers_respect_capacity(self):
+        recorder = TraceRecorder(self.path, ring_capacity=500, flush_interval=60.0)
+        barrier = threading.Barrier(4)
+
+        def produce():
+            barrier.wait()
+            for i in range(1000):
+                recorder.poll(float(i), (1, 2, 3))
+
+        threads = [threading.Thread(target=produce) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        recorder.close()
+        self.assertEqual(recorder.count, 500)
+        self.assertEqual(recorder.dropped, 3500)
+
+    def test_config_round_trips(self):
+        config = AppConfig(adaptive_tuning=True)
+        config = replace(
+            config,
+            colors=replace(config.colors, yellow_min_r=171),
+            timing=replace(config.timing, multi_roi_enabled=True, roi_regions=((0, 0, 1.0), (4, -4, 0.5))),
+        )
+        recorder = TraceRecorder(self.path)
+        recorder.config(1.0, config, {"match_confirm_frames": 1})
+        recorder.close()
+
+        (event,) = read_trace(self.path)
+        self.assertEqual(event.kind, EV_CONFIG)
+        decoded, tuning = decode_config(event.payload)
+        self.assertEqual(decoded.colors, config.colors)
+        self.assertEqual(decoded.timing, config.timing)
+        self.assertTrue(decoded.adaptive_tuning)
+        self.assertEqual(tuning, {"match_confirm_frames": 1})
+
+    def test_untraced_grabs_are_not_recorded(self):
+        recorder = TraceRecorder(self.path)
+        source = TracingFrameSource(_Source(), recorder)
+        patch = PatchBuffer(3, 3)
+        with untraced():
+            source.grab(patch)
+            source.get_pixel(0, 0)
+        other = threading.Thread(target=lambda: source.grab(patch))
+        with untraced():
+            other.start()
+            other.join()
+        source.grab(patch)
+        recorder.close()
+        self.assertEqual([e.kind for e in read_trace(self.path)], [EV_POLL, EV_POLL])
+
+
+class TraceReplayTests(unittest.TestCase):
+    def _record(self, path, draws=12, app_config=None, tuner=None):
+        recorder = TraceRecorder(path)
+        sim = CardCycleSimulator(app_config=app_config, seed=4, trace=recorder, tuner=tuner)
+        report = sim.run(draws)
+        recorder.close()
+        return sim, report
+
+    def test_replay_reproduces_simulated_draws(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sim.trace")
+            sim, report = self._record(path)
+            replayed = replay_trace(read_trace(path), capture_cost=CardCycleConfig().capture_cost)
+
+        self.assertEqual(len(replayed.draws), report.draws)
+        self.assertEqual(replayed.mismatches(), [], replayed.format())
+
+    def test_replay_rebuilds_the_recorded_config(self):
+        config = AppConfig(adaptive_tuning=True)
+        # A blue threshold nothing on screen reaches: the defaults would replay those draws as successes.
+        config = replace(
+            config,
+            colors=replace(config.colors, blue_min_b=250),
+            timing=replace(config.timing, multi_roi_enabled=True, change_gate_enabled=False),
+        )
+        tuner = AdaptiveController(TuningParams.from_timing(config.timing))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sim.trace")
+            _, report = self._record(path, app_config=config, tuner=tuner)
+            events = read_trace(path)
+        cost = CardCycleConfig().capture_cost
+        replayed = replay_trace(events, capture_cost=cost)
+        defaults = replay_trace(events, app_config=AppConfig(), capture_cost=cost)
+
+        self.assertEqual(len(replayed.draws), report.draws)
+        self.assertEqual(replayed.mismatches(), [], replayed.format())
+        self.assertTrue(defaults.mismatches())
+
+    def test_replay_flags_threshold_regression(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sim.trace")
+            self._record(path)
+            config = AppConfig()
+            broken = replace(config, colors=replace(config.colors, yellow_min_r=250, blue_min_b=250, red_min_r=250))
+            replayed = replay_trace(read_trace(path), app_config=broken, capture_cost=CardCycleConfig().capture_cost)
+
+        self.assertTrue(replayed.mismatches())
+        self.assertIn("mismatches=", replayed.format())
+
+
+if __name__ == "__main__":
+    unittest.main()
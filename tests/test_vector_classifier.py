@@ -0,0 +1,81 @@
+import random
+import unittest
+
+from app.capture import PatchBuffer, SyntheticFrameSource
+from app.color_detector import ColorDetector
+from app.color_lut import CARD_COLORS
+from app.config import ColorThresholds
+from app.vector_classifier import HAS_NUMPY
+
+if HAS_NUMPY:
+    import numpy as np
+
+    from app.vector_classifier import classify_array, classify_patch
+
+
+def _edge_values(thresholds: ColorThresholds):
+    values = {0, 255}
+    for value in vars(thresholds).values():
+        values.update((value - 1, value, value + 1))
+    return sorted(v for v in values if 0 <= v <= 255)
+
+
+@unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+class VectorClassifierPropertyTests(unittest.TestCase):
+    def setUp(self):
+        self.thresholds = ColorThresholds()
+        self.detector = ColorDetector(self.thresholds, 0.0, frame_source=SyntheticFrameSource())
+
+    def _assert_matches_scalar(self, pixels):
+        result = classify_array(pixels, self.thresholds)
+        height, width, _ = pixels.shape
+        for color in CARD_COLORS:
+            expected = np.zeros((height, width), dtype=bool)
+            for y in range(height):
+                for x in range(width):
+                    r, g, b = (int(v) for v in pixels[y, x])
+                    expected[y, x] = self.detector.color_matches_target(r, g, b, color)
+            np.testing.assert_array_equal(result.masks[color], expected)
+            self.assertEqual(result.counts[color], int(expected.sum()))
+
+    def test_random_frames_match_scalar_path(self):
+        rng = np.random.default_rng(1234)
+        for _ in range(20):
+            height, width = rng.integers(1, 12, size=2)
+            pixels = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+            self._assert_matches_scalar(pixels)
+
+    def test_threshold_edges_match_scalar_path(self):
+        edges = _edge_values(self.thresholds)
+        rng = random.Random(99)
+        pixels = np.array(
+            [[[rng.choice(edges) for _ in range(3)] for _ in range(32)] for _ in range(32)],
+            dtype=np.uint8,
+        )
+        self._assert_matches_scalar(pixels)
+
+    def test_patch_view_is_rgb(self):
+        source = SyntheticFrameSource(fill=(200, 180, 40))
+        source.set_pixel(1, 0, (40, 90, 220))
+        patch = PatchBuffer(3, 2)
+        source.grab(patch)
+
+        result = classify_patch(patch, self.thresholds)
+        self.assertEqual(result.counts, {"黄": 5, "蓝": 1, "红": 0})
+        self.assertTrue(result.masks["蓝"][0, 1])
+
+    def test_rejects_non_rgb_array(self):
+        with self.assertRaises(ValueError):
+            classify_array(np.zeros((4, 4), dtype=np.uint8), self.thresholds)
+
+
+class CountPatchColorsTests(unittest.TestCase):
+    def test_counts_every_card_color(self):
+        source = SyntheticFrameSource(fill=(200, 60, 50))
+        source.set_pixel(10, 10, (200, 180, 40))
+        detector = ColorDetector(ColorThresholds(), 0.0, sample_radius_px=1, frame_source=source)
+        self.assertEqual(detector.count_patch_colors(10, 10), {"黄": 1, "蓝": 0, "红": 8})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import time
+import types
+import unittest
+
+from app.config import AppConfig
+from app.focus import PollingFocusSource, ScriptedFocusSource
+from app.process_cache import ProcessNameCache
+from app.state import SharedState
+from app.window_guard import WindowGuard
+
+GAME_PID = 100
+BROWSER_PID = 200
+NAMES = {GAME_PID: "League of Legends.exe", BROWSER_PID: "chrome.exe"}
+
+
+def _fake_psutil(lookups):
+    class Process:
+        def __init__(self, pid):
+            self._pid = pid
+
+        def create_time(self):
+            return 1.0
+
+        def name(self):
+            lookups.append(self._pid)
+            return NAMES[self._pid]
+
+    return types.SimpleNamespace(Process=Process, Error=KeyError)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 10.0
+
+    def __call__(self):
+        return self.now
+
+
+class WindowGuardEventTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        self.state = SharedState()
+        self.lookups = []
+        self.source = ScriptedFocusSource(BROWSER_PID, BROWSER_PID * 10)
+        self.guard = WindowGuard(
+            AppConfig(),
+            self.state,
+            source=self.source,
+            process_names=ProcessNameCache(psutil_module=_fake_psutil(self.lookups)),
+            clock=self.clock,
+        )
+
+    def test_start_reports_current_foreground(self):
+        self.guard.start()
+        self.assertFalse(self.guard.is_allowed())
+
+    def test_focus_change_updates_state_synchronously(self):
+        self.guard.start()
+        self.clock.now = 11.0
+        self.source.emit(GAME_PID)
+        self.assertTrue(self.guard.is_allowed())
+        self.assertEqual(self.state.last_active_true_ts(), 11.0)
+
+        self.source.emit(BROWSER_PID)
+        self.assertFalse(self.guard.is_allowed())
+        self.source.emit(None)
+        self.assertFalse(self.guard.is_allowed())
+
+    def test_event_driven_source_skips_recovery_recheck(self):
+        self.guard.start()
+        self.source.emit(GAME_PID)
+        self.source.emit(BROWSER_PID)
+        lookups = len(self.lookups)
+        for _ in range(100):
+            self.assertFalse(self.guard.is_allowed())
+        self.assertEqual(len(self.lookups), lookups)
+
+    def test_process_name_is_cached_per_pid(self):
+        self.guard.start()
+        for _ in range(3):
+            self.source.emit(GAME_PID, GAME_PID * 10)
+            self.source.emit(BROWSER_PID, BROWSER_PID * 10)
+        self.assertEqual(self.lookups, [BROWSER_PID, GAME_PID])
+        self.assertEqual(self.guard.process_names.hits, 5)
+
+
+class WindowGuardPollingTests(unittest.TestCase):
+    def test_polling_fallback_reports_changes(self):
+        pids = [BROWSER_PID]
+        source = PollingFocusSource(0.001, 0.001, get_window=lambda: (pids[0], pids[0] * 10))
+        names = ProcessNameCache(psutil_module=_fake_psutil([]))
+        guard = WindowGuard(AppConfig(), SharedState(), source=source, process_names=names)
+        guard.start()
+        try:
+            pids[0] = GAME_PID
+            deadline = time.monotonic() + 1.0
+            while not guard.is_allowed() and time.monotonic() < deadline:
+                time.sleep(0.001)
+            self.assertTrue(guard.is_allowed())
+        finally:
+            guard.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()